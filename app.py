@@ -1,5 +1,15 @@
+import hmac
+import io
 import json
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
+import logging
+import os
+import time
+
+# Время начала запуска приложения (для отчета о прогреве)
+STARTED_AT = time.perf_counter()
+
+import click
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, abort, send_file
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
@@ -9,17 +19,41 @@ from auth import (
     validate_recipe_title, validate_recipe_description, validate_recipe_steps,
     validate_cooking_time, validate_ingredients, validate_image_url,
     validate_category, validate_difficulty, validate_rating,
-    validate_recipe_data, login_required_html, admin_required_html,
+    validate_recipe_data, login_required_html, admin_required_html, admin_required_json,
     get_current_user, is_admin, verify_password, authenticate_user,
     login_user, logout_user, register_user
 )
 from config import Config
-from jsonrpc_handler import JSONRPCHandler, JSONRPCError
-from data_manager import load_users, load_recipes, save_users, save_recipes
+from jsonrpc_handler import JSONRPCHandler, JSONRPCError, reset_batch_executor, batch_queue_depth
+from data_manager import load_users, load_recipes
+from store import DataStore
+from changelog import ChangeLog
+from session_store import create_session_interface
+from http_cache import page_etag, not_modified, apply_validators
+from page_cache import create_page_cache, page_key, recipe_tags
+from template_cache import init_fragment_cache, init_bytecode_cache, warm_up
+from prefork import after_fork
+from import_export import FORMATS, MIMETYPES, guess_format, iter_export, iter_records, import_records
+from events import create_broadcaster, SubscribersLimitError
+import metrics
+from profiling import RequestProfiler
+from memory import TracemallocSession, structure_sizes, process_memory
+import logs
+import assets
+import compression
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# Журналы: JSON-строки с request_id, запись на диск в фоновом потоке
+logs.init_app(app)
+log = logging.getLogger('app')
+
+# Серверное хранилище сессий: в cookie передается только ID сессии
+session_interface = create_session_interface(app.config)
+if session_interface is not None:
+    app.session_interface = session_interface
+
 # Константы категорий и сложностей
 RECIPE_CATEGORIES = ['Завтрак', 'Обед', 'Ужин', 'Десерт', 'Закуска', 'Салат', 'Суп', 'Основное блюдо']
 RECIPE_DIFFICULTIES = ['Легкая', 'Средняя', 'Сложная']
@@ -29,23 +63,91 @@ STUDENT_INFO = {
     'group': Config.STUDENT_GROUP
 }
 
-# Функция для сохранения всех данных
-def save_all_data():
-    """Сохраняет все данные в файлы"""
-    save_users(users)
-    save_recipes(recipes)
-    print("✅ Данные сохранены в файлы")
+# Загружаем данные из файлов в общее хранилище: маршруты читают снимки
+# store.recipes / store.users, изменения выполняются через store.write()
+store = DataStore(load_recipes(), load_users())
 
-# Загружаем данные из файлов
-users = load_users()
-recipes = load_recipes()
+# Журнал изменений рецептов: каждое изменение получает номер для get_changes_since
+changelog = ChangeLog(app.config['CHANGELOG_PATH'])
+changelog.attach(store)
 
-# Добавляем данные в конфиг для доступа из других модулей
-app.config['USERS_LIST'] = users
-app.config['RECIPES_LIST'] = recipes
+# Аудит: кто изменил рецепты и пользователей (просмотры - выборочно)
+logs.attach_store(store)
 
 # Инициализация JSON-RPC обработчика
-jsonrpc_handler = JSONRPCHandler(recipes, users)
+jsonrpc_handler = JSONRPCHandler(store, app.config['JSON_FRAGMENT_CACHE_BYTES'], changelog)
+
+# Кэш страниц для анонимных посетителей, сбрасывается по тегам при изменениях
+page_cache = create_page_cache(app.config, jsonrpc_handler.index)
+
+# Кэш фрагментов шаблонов (карточки рецептов по версии рецепта)
+# и скомпилированных шаблонов на диске
+init_fragment_cache(app, jsonrpc_handler.index)
+init_bytecode_cache(app)
+
+# Статические файлы с хешем содержимого в имени: url_for('static', ...) ведет
+# на собранный файл, который кэшируется браузером навсегда
+static_assets = assets.init_app(app)
+
+# Сжатие ответов gzip/deflate; готовые сжатые варианты хранятся в кэшах рядом с телом
+compression.init_app(app)
+
+# Server-sent events: статистика и изменения каталога рассылаются подписчикам
+# один раз на изменение вместо пересчета в каждом запросе опроса
+broadcaster = create_broadcaster(app.config, jsonrpc_handler.index)
+
+# Метрики: длительность запросов по маршрутам, показатели кэшей, индексов и очередей
+metrics.init_app(app)
+
+def _cache_counter(attribute):
+    caches = {'page': page_cache, 'json_fragments': jsonrpc_handler.fragments,
+              'template_fragments': app.jinja_env.fragment_cache}
+    return lambda: {(name,): getattr(cache, attribute) for name, cache in caches.items()}
+
+metrics.counter_callback('cache_hits_total', 'Попадания в кэш', _cache_counter('hits'), ['cache'])
+metrics.counter_callback('cache_misses_total', 'Промахи кэша', _cache_counter('misses'), ['cache'])
+metrics.gauge_callback('cache_entries', 'Записей в кэше', lambda: {
+    ('page',): len(page_cache),
+    ('json_fragments',): len(jsonrpc_handler.fragments),
+    ('template_fragments',): len(app.jinja_env.fragment_cache),
+}, ['cache'])
+metrics.gauge_callback('index_entries', 'Размер индексов каталога', lambda: {
+    ('recipes',): len(jsonrpc_handler.index.recipes_by_id),
+    ('users',): len(jsonrpc_handler.index.users_by_id),
+    ('invalid_recipes',): len(jsonrpc_handler.index.invalid_ids),
+    ('authors',): len(jsonrpc_handler.index.author_counts),
+}, ['index'], aggregate='max')
+metrics.gauge_callback('queue_depth', 'Задач в очередях', lambda: {
+    ('jsonrpc_batch',): batch_queue_depth(),
+    ('log',): logs.PIPELINE.queue_depth,
+}, ['queue'])
+metrics.counter_callback('log_records_dropped_total', 'Записей журнала, отброшенных при переполнении очереди',
+                         lambda: logs.PIPELINE.dropped)
+metrics.gauge_callback('sse_subscribers', 'Подписчиков /api/events', lambda: broadcaster.subscribers)
+metrics.counter_callback('sse_events_total', 'Опубликовано событий /api/events', lambda: broadcaster.published)
+
+# Профилирование: cProfile по заголовку X-Profile от администратора
+# и сэмплер стеков, сохраняющий профили медленных запросов
+profiler = RequestProfiler(app)
+
+# Снимки tracemalloc для /admin/memory (в памяти воркера)
+tracemalloc_session = TracemallocSession(app.config['MEMORY_SNAPSHOTS'])
+
+@after_fork
+def reset_worker_state():
+    """Свое состояние воркера после fork от мастера с предзагруженными данными"""
+    logs.after_fork()
+    if session_interface is not None and hasattr(session_interface.store, 'after_fork'):
+        session_interface.store.after_fork()
+    reset_batch_executor()
+    metrics.REGISTRY.after_fork()
+    profiler.after_fork()
+    tracemalloc_session.after_fork()
+    changelog.after_fork()
+    broadcaster.after_fork()
+    # Счетчики попаданий кэшей считаются отдельно в каждом воркере
+    for cache in (page_cache, jsonrpc_handler.fragments, app.jinja_env.fragment_cache):
+        cache.hits = cache.misses = 0
 
 # ========== HTML МАРШРУТЫ ==========
 
@@ -63,28 +165,40 @@ def inject_stats():
 
 def get_current_stats():
     """Получение актуальной статистики"""
-    total_cooking_time = sum(recipe.get('cooking_time', 0) for recipe in recipes)
-    categories = set(recipe['category'] for recipe in recipes)
-    
-    return {
-        'recipes_count': len(recipes),
-        'users_count': len(users),
-        'total_cooking_time': total_cooking_time,
-        'categories_count': len(categories)
-    }
+    return jsonrpc_handler.index.stats()
+
+@app.template_global()
+def live_events_mode():
+    """Как страница получает живые счетчики: sse (поток /api/events), poll (опрос
+    /api/current_stats) или once (один запрос - гости, если не EVENTS_ANONYMOUS)"""
+    if not session.get('user_id') and not app.config['EVENTS_ANONYMOUS']:
+        return 'once'
+    return 'sse' if app.config['EVENTS_SSE'] else 'poll'
 
 @app.route('/')
 def index():
     """Главная страница"""
-    recent_recipes = recipes[:12]
-    popular_recipes = sorted(recipes, key=lambda x: x.get('views', 0), reverse=True)[:6]
+    catalog = jsonrpc_handler.index
+    etag = page_etag(catalog.generation, catalog.popular_version)
+    response = not_modified(etag, catalog.last_modified, policy='index')
+    if response:
+        return response
+    
+    key = page_key()
+    html = page_cache.get(key)
+    if html is not None:
+        return apply_validators(html, etag, catalog.last_modified, policy='index')
+    
+    started = time.time()
+    recent_recipes = list(store.recipes[:12])
+    popular_recipes = catalog.popular_recipes(6)
     
     stats = get_current_stats()
     
-    return render_template(
+    html = render_template(
         'index.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         recent_recipes=recent_recipes,
         popular_recipes=popular_recipes,
         recipes_count=stats['recipes_count'],
@@ -92,19 +206,35 @@ def index():
         total_cooking_time=stats['total_cooking_time'],
         categories_count=stats['categories_count']
     )
+    page_cache.set(key, html, ['stats', 'popular'] + recipe_tags(recent_recipes + popular_recipes), started)
+    return apply_validators(html, etag, catalog.last_modified, policy='index')
 
 @app.route('/search')
 def search_page():
     """Страница поиска"""
-    categories = list(set([r['category'] for r in recipes]))
-    difficulties = list(set([r['difficulty'] for r in recipes]))
+    catalog = jsonrpc_handler.index
+    etag = page_etag(catalog.generation)
+    response = not_modified(etag, catalog.last_modified, policy='search_page')
+    if response:
+        return response
+    
+    key = page_key()
+    html = page_cache.get(key)
+    if html is not None:
+        return apply_validators(html, etag, catalog.last_modified, policy='search_page')
+    
+    started = time.time()
+    # Сортировка делает страницу одинаковой во всех процессах (порядок set зависит от хэшей)
+    recipes = store.recipes
+    categories = sorted(set([r['category'] for r in recipes]))
+    difficulties = sorted(set([r['difficulty'] for r in recipes]))
     
     stats = get_current_stats()
     
-    return render_template(
+    html = render_template(
         'search.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         categories=categories,
         difficulties=difficulties,
         recipes_count=stats['recipes_count'],
@@ -112,23 +242,37 @@ def search_page():
         total_cooking_time=stats['total_cooking_time'],
         categories_count=stats['categories_count']
     )
+    page_cache.set(key, html, ['stats'], started)
+    return apply_validators(html, etag, catalog.last_modified, policy='search_page')
 
 @app.route('/recipes')
 def all_recipes():
     """Все рецепты"""
+    catalog = jsonrpc_handler.index
+    etag = page_etag(catalog.generation)
+    response = not_modified(etag, catalog.last_modified, policy='all_recipes')
+    if response:
+        return response
+    
+    key = page_key()
+    html = page_cache.get(key)
+    if html is not None:
+        return apply_validators(html, etag, catalog.last_modified, policy='all_recipes')
+    
+    started = time.time()
     page = request.args.get('page', 1, type=int)
     per_page = 12
     start = (page - 1) * per_page
     end = start + per_page
     
-    paginated_recipes = recipes[start:end]
+    paginated_recipes = store.recipes[start:end]
     
     stats = get_current_stats()
     
-    return render_template(
+    html = render_template(
         'all_recipes.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         recipes=paginated_recipes,
         page=page,
         total_pages=(stats['recipes_count'] + per_page - 1) // per_page,
@@ -137,11 +281,13 @@ def all_recipes():
         total_cooking_time=stats['total_cooking_time'],
         categories_count=stats['categories_count']
     )
+    page_cache.set(key, html, ['stats'] + recipe_tags(paginated_recipes), started)
+    return apply_validators(html, etag, catalog.last_modified, policy='all_recipes')
 
 @app.route('/recipe/<int:recipe_id>')
 def recipe_detail(recipe_id):
     """Страница рецепта"""
-    recipe = next((r for r in recipes if r['id'] == recipe_id), None)
+    recipe = store.record_view(recipe_id)
     
     if not recipe:
         flash('Рецепт не найден', 'danger')
@@ -150,26 +296,39 @@ def recipe_detail(recipe_id):
     if recipe.get('cooking_time', 0) <= 0:
         flash('Внимание: время приготовления указано некорректно', 'warning')
     
-    recipe['views'] = recipe.get('views', 0) + 1
-    save_all_data()
+    # Просмотр засчитывается и при ответе 304. Счетчик просмотров на странице
+    # может отставать от актуального, поэтому ETag слабый и зависит только от версии рецепта
+    catalog = jsonrpc_handler.index
+    etag = page_etag(catalog.generation, catalog.versions.get(recipe_id))
+    response = not_modified(etag, catalog.last_modified, weak=True, policy='recipe_detail')
+    if response:
+        return response
+    
+    key = page_key()
+    html = page_cache.get(key)
+    if html is not None:
+        return apply_validators(html, etag, catalog.last_modified, weak=True, policy='recipe_detail')
     
+    started = time.time()
     stats = get_current_stats()
     
-    return render_template(
+    html = render_template(
         'recipe_detail.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         recipe=recipe,
         recipes_count=stats['recipes_count'],
         users_count=stats['users_count'],
         total_cooking_time=stats['total_cooking_time'],
         categories_count=stats['categories_count']
     )
+    page_cache.set(key, html, ['stats', f'recipe:{recipe_id}'], started)
+    return apply_validators(html, etag, catalog.last_modified, weak=True, policy='recipe_detail')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """Страница входа"""
-    if get_current_user(users):
+    if get_current_user(store.users):
         return redirect(url_for('index'))
     
     stats = get_current_stats()
@@ -183,7 +342,7 @@ def login():
             flash(f'Ошибка валидации логина: {username_error}', 'danger')
             return render_template('login.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'])
         
         password_valid, password_error = validate_password(password)
@@ -191,23 +350,25 @@ def login():
             flash(f'Ошибка валидации пароля: {password_error}', 'danger')
             return render_template('login.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'])
 
-        user = authenticate_user(username, password, users)
+        user = authenticate_user(username, password, store.users)
         if user:
             login_user(user['id'], user['username'], user.get('is_admin', False))
+            logs.audit('auth.login', user_id=user['id'])
             flash('Вы успешно вошли в систему!', 'success')
             
             next_page = request.args.get('next')
             return redirect(next_page or url_for('index'))
         
+        logs.audit('auth.login_failed', level=logging.WARNING, username=username)
         flash('Неверное имя пользователя или пароль', 'danger')
     
     return render_template(
         'login.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         recipes_count=stats['recipes_count'],
         users_count=stats['users_count'],
         total_cooking_time=stats['total_cooking_time'],
@@ -217,7 +378,7 @@ def login():
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     """Страница регистрации"""
-    if get_current_user(users):
+    if get_current_user(store.users):
         return redirect(url_for('index'))
     
     stats = get_current_stats()
@@ -233,7 +394,7 @@ def register():
             flash(f'Ошибка валидации логина: {username_error}', 'danger')
             return render_template('register.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'])
         
         password_valid, password_error = validate_password(password)
@@ -241,14 +402,14 @@ def register():
             flash(f'Ошибка валидации пароля: {password_error}', 'danger')
             return render_template('register.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'])
         
         if password != confirm_password:
             flash('Пароли не совпадают', 'danger')
             return render_template('register.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'])
         
         email_valid, email_error = validate_email(email)
@@ -256,24 +417,23 @@ def register():
             flash(f'Ошибка валидации email: {email_error}', 'danger')
             return render_template('register.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'])
         
-        new_user, error = register_user(username, password, email, users)
+        # Проверка имени и выбор id - под блокировкой писателя,
+        # чтобы параллельные регистрации не получили одинаковые id
+        with store.write() as writer:
+            new_user, error = register_user(username, password, email, writer.users)
+            if not error:
+                new_user['created_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                writer.add_user(new_user)
         if error:
             flash(error, 'danger')
             return render_template('register.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'])
         
-        # Хешируем пароль
-        new_user['password_hash'] = generate_password_hash(password)
-        new_user['created_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        users.append(new_user)
-        save_all_data()
-        
         login_user(new_user['id'], new_user['username'], new_user['is_admin'])
         
         flash('Регистрация успешна! Добро пожаловать!', 'success')
@@ -281,7 +441,7 @@ def register():
     
     return render_template('register.html',
                          student_info=STUDENT_INFO,
-                         current_user=get_current_user(users),
+                         current_user=get_current_user(store.users),
                          recipes_count=stats['recipes_count'],
                          users_count=stats['users_count'],
                          total_cooking_time=stats['total_cooking_time'],
@@ -290,6 +450,8 @@ def register():
 @app.route('/logout')
 def logout():
     """Выход"""
+    if session.get('user_id') is not None:
+        logs.audit('auth.logout', user_id=session['user_id'])
     logout_user()
     flash('Вы вышли из системы', 'info')
     return redirect(url_for('index'))
@@ -297,35 +459,115 @@ def logout():
 @app.route('/admin')
 @admin_required_html
 def admin_panel():
-    """Админ-панель"""
+    """Админ-панель: оболочка страницы, таблицы загружаются через JSON-RPC по страницам"""
     stats = get_current_stats()
     
-    invalid_recipes = []
-    for recipe in recipes:
-        if recipe.get('cooking_time', 0) <= 0:
-            invalid_recipes.append(recipe)
-    
-    safe_users = []
-    for user in users:
-        safe_user = user.copy()
-        if 'password_hash' in safe_user:
-            safe_user.pop('password_hash')
-        safe_users.append(safe_user)
-    
-    # ИЗМЕНЕНО: показываем все рецепты, а не только первые 20
     return render_template(
         'admin.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
-        recipes=recipes,  # ← Вместо recipes[:20]
-        users=safe_users,
+        current_user=get_current_user(store.users),
         recipes_count=stats['recipes_count'],
         users_count=stats['users_count'],
         total_cooking_time=stats['total_cooking_time'],
         categories_count=stats['categories_count'],
-        invalid_recipes=invalid_recipes[:10]  # Можно оставить только 10 проблемных
+        invalid_count=len(jsonrpc_handler.index.invalid_ids),
+        categories=RECIPE_CATEGORIES
     )
     
+@app.route('/admin/profiles')
+@app.route('/admin/profiles/<profile_id>')
+@admin_required_html
+def admin_profiles(profile_id=None):
+    """Сохраненные профили запросов и сводка выбранного"""
+    selected = None
+    if profile_id is not None:
+        selected = profiler.store.get(profile_id)
+        if selected is None:
+            abort(404)
+    
+    return render_template(
+        'admin_profiles.html',
+        student_info=STUDENT_INFO,
+        current_user=get_current_user(store.users),
+        profiles=profiler.store.list(),
+        selected=selected,
+        slow_ms=app.config['PROFILE_SLOW_MS']
+    )
+
+@app.route('/admin/profiles/<profile_id>/download')
+@admin_required_html
+def download_profile(profile_id):
+    """Данные профиля: .prof (pstats, snakeviz) или .folded (flamegraph, speedscope)"""
+    meta = profiler.store.get(profile_id)
+    if meta is None:
+        abort(404)
+    path, filename = profiler.store.data_path(meta)
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=filename,
+                     mimetype='application/octet-stream')
+
+@app.route('/admin/memory')
+@admin_required_json
+def admin_memory():
+    """Память воркера: процесс, глубокие размеры данных, индексов и кэшей, tracemalloc"""
+    catalog = jsonrpc_handler.index
+    # Порядок важен: own каждой структуры - без объектов, учтенных выше
+    structures = [
+        ('store.recipes', store.recipes),
+        ('store.users', store.users),
+        ('index.recipes_by_id', catalog.recipes_by_id),
+        ('index.versions', catalog.versions),
+        ('index.summaries', catalog.summaries),
+        ('index.stat_entries', catalog._stat_entries),
+        ('index.author_counts', catalog.author_counts),
+        ('index.users_by_id', catalog.users_by_id),
+        ('index.usernames', catalog.usernames),
+        ('index.admin_usernames', catalog.admin_usernames),
+        ('index.regular_usernames', catalog.regular_usernames),
+        ('index.popular_ids', catalog.popular_ids),
+        ('index.invalid_ids', catalog.invalid_ids),
+        ('cache.page', page_cache),
+        ('cache.json_fragments', jsonrpc_handler.fragments),
+        ('cache.template_fragments', app.jinja_env.fragment_cache),
+        ('cache.admin_orders', jsonrpc_handler._admin_orders),
+        ('events.buffer', broadcaster._events),
+    ]
+    started = time.perf_counter()
+    sizes = structure_sizes(structures)
+    
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'process': process_memory(),
+        'structures': sizes,
+        'measure_ms': round((time.perf_counter() - started) * 1000, 1),
+        'tracemalloc': tracemalloc_session.status()
+    })
+
+@app.route('/admin/memory/tracemalloc/<action>', methods=['POST'])
+@admin_required_json
+def admin_tracemalloc(action):
+    """start (frames=N), stop, snapshot и diff (first, second, group_by, limit)"""
+    params = request.get_json(silent=True) or request.form
+    try:
+        if action == 'start':
+            result = tracemalloc_session.start(params.get('frames', 1))
+        elif action == 'stop':
+            result = tracemalloc_session.stop()
+        elif action == 'snapshot':
+            result = tracemalloc_session.snapshot()
+        elif action == 'diff':
+            result = tracemalloc_session.diff(
+                params.get('first'), params.get('second'),
+                group_by=params.get('group_by', 'lineno'), limit=params.get('limit', 20)
+            )
+        else:
+            abort(404)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # Снимки хранятся в памяти воркера, который их сделал
+    return jsonify({'success': True, 'pid': os.getpid(), **result})
+
 @app.route('/test-api')
 def test_api_page():
     """Тестирование API"""
@@ -334,7 +576,7 @@ def test_api_page():
     return render_template(
         'test_api.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         recipes_count=stats['recipes_count'],
         users_count=stats['users_count'],
         total_cooking_time=stats['total_cooking_time'],
@@ -344,23 +586,37 @@ def test_api_page():
 @app.route('/author')
 def author_page():
     """Страница об авторе"""
+    catalog = jsonrpc_handler.index
+    etag = page_etag(catalog.generation)
+    response = not_modified(etag, catalog.last_modified, policy='author_page')
+    if response:
+        return response
+    
+    key = page_key()
+    html = page_cache.get(key)
+    if html is not None:
+        return apply_validators(html, etag, catalog.last_modified, policy='author_page')
+    
+    started = time.time()
     stats = get_current_stats()
     
-    return render_template(
+    html = render_template(
         'author.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         recipes_count=stats['recipes_count'],
         users_count=stats['users_count'],
         total_cooking_time=stats['total_cooking_time'],
         categories_count=stats['categories_count']
     )
+    page_cache.set(key, html, ['stats'], started)
+    return apply_validators(html, etag, catalog.last_modified, policy='author_page')
 
 @app.route('/delete-account', methods=['POST'])
 @login_required_html
 def delete_account():
     """Удаление аккаунта пользователя"""
-    user = get_current_user(users)
+    user = get_current_user(store.users)
     
     if user['is_admin'] and user['username'] == 'admin':
         flash('Нельзя удалить администратора системы', 'danger')
@@ -370,7 +626,6 @@ def delete_account():
     response = jsonrpc_handler.delete_account()
     
     if response and isinstance(response, dict) and response.get('success'):
-        save_all_data()
         flash('Ваш аккаунт был успешно удален', 'info')
         return redirect(url_for('index'))
     else:
@@ -427,7 +682,7 @@ def validation_info():
     return render_template(
         'validation_info.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         validation_rules=validation_rules,
         recipes_count=stats['recipes_count'],
         users_count=stats['users_count'],
@@ -448,6 +703,7 @@ def security_info():
         'session_management': {
             'secure_cookies': True,
             'httponly': True,
+            'server_side_storage': Config.SESSION_TYPE != 'cookie',
             'session_timeout': 'при закрытии браузера'
         },
         'data_validation': {
@@ -467,7 +723,7 @@ def security_info():
     return render_template(
         'security_info.html',
         student_info=STUDENT_INFO,
-        current_user=get_current_user(users),
+        current_user=get_current_user(store.users),
         security_features=security_features,
         recipes_count=stats['recipes_count'],
         users_count=stats['users_count'],
@@ -479,7 +735,7 @@ def security_info():
 @admin_required_html
 def edit_recipe(recipe_id):
     """Редактирование рецепта администратором"""
-    recipe = next((r for r in recipes if r['id'] == recipe_id), None)
+    recipe = store.get_recipe(recipe_id)
     
     if not recipe:
         flash('Рецепт не найден', 'danger')
@@ -555,34 +811,36 @@ def edit_recipe(recipe_id):
                 flash(f'{field}: {error}', 'danger')
             return render_template('edit_recipe.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipe=recipe,
                                  recipes_count=stats['recipes_count'],
                                  categories=RECIPE_CATEGORIES,
                                  difficulties=RECIPE_DIFFICULTIES)
         
         # Обновляем рецепт
-        recipe['title'] = title
-        recipe['description'] = description
-        recipe['ingredients'] = ingredients_list
-        recipe['steps'] = steps
+        changes = {
+            'title': title,
+            'description': description,
+            'ingredients': ingredients_list,
+            'steps': steps,
+            'category': category,
+            'difficulty': difficulty,
+        }
         if image_url:
-            recipe['image_url'] = image_url
+            changes['image_url'] = image_url
         if cooking_time:
-            recipe['cooking_time'] = int(cooking_time)
-        recipe['category'] = category
-        recipe['difficulty'] = difficulty
+            changes['cooking_time'] = int(cooking_time)
         if rating:
-            recipe['rating'] = float(rating)
-        
-        save_all_data()
+            changes['rating'] = float(rating)
+        with store.write() as writer:
+            writer.update_recipe(recipe_id, changes)
         
         flash('Рецепт успешно обновлен!', 'success')
         return redirect(url_for('admin_panel'))
     
     return render_template('edit_recipe.html',
                          student_info=STUDENT_INFO,
-                         current_user=get_current_user(users),
+                         current_user=get_current_user(store.users),
                          recipe=recipe,
                          recipes_count=stats['recipes_count'],
                          categories=RECIPE_CATEGORIES,
@@ -592,13 +850,10 @@ def edit_recipe(recipe_id):
 @admin_required_html
 def delete_recipe_route(recipe_id):
     """Быстрое удаление рецепта из админ-панели"""
-    global recipes
-    initial_count = len(recipes)
-    
-    recipes = [r for r in recipes if r['id'] != recipe_id]
+    with store.write() as writer:
+        removed = writer.remove_recipes(lambda r: r['id'] == recipe_id)
     
-    if len(recipes) < initial_count:
-        save_all_data()
+    if removed:
         flash(f'Рецепт с ID {recipe_id} успешно удален', 'success')
     else:
         flash(f'Рецепт с ID {recipe_id} не найден', 'danger')
@@ -670,40 +925,39 @@ def create_recipe():
             
             return render_template('create_recipe.html',
                                  student_info=STUDENT_INFO,
-                                 current_user=get_current_user(users),
+                                 current_user=get_current_user(store.users),
                                  recipes_count=stats['recipes_count'],
                                  categories=RECIPE_CATEGORIES,
                                  difficulties=RECIPE_DIFFICULTIES,
                                  form_data=request.form)
         
-        new_id = max([r['id'] for r in recipes], default=0) + 1
-        current_user = get_current_user(users)
+        current_user = get_current_user(store.users)
         
-        new_recipe = {
-            'id': new_id,
-            'title': title,
-            'description': description,
-            'ingredients': ingredients_list,
-            'steps': steps,
-            'image_url': image_url if image_url else f'https://source.unsplash.com/300x200/?food,recipe&sig={new_id}',
-            'cooking_time': int(cooking_time),
-            'category': category,
-            'difficulty': difficulty,
-            'author': current_user['username'] if current_user else 'admin',
-            'rating': 4.0,
-            'views': 0,
-            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        recipes.append(new_recipe)
-        save_all_data()
+        with store.write() as writer:
+            new_id = writer.next_recipe_id()
+            new_recipe = {
+                'id': new_id,
+                'title': title,
+                'description': description,
+                'ingredients': ingredients_list,
+                'steps': steps,
+                'image_url': image_url if image_url else f'https://source.unsplash.com/300x200/?food,recipe&sig={new_id}',
+                'cooking_time': int(cooking_time),
+                'category': category,
+                'difficulty': difficulty,
+                'author': current_user['username'] if current_user else 'admin',
+                'rating': 4.0,
+                'views': 0,
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            writer.add_recipe(new_recipe)
         
         flash(f'Рецепт "{title}" успешно создан!', 'success')
         return redirect(url_for('admin_panel'))
     
     return render_template('create_recipe.html',
                          student_info=STUDENT_INFO,
-                         current_user=get_current_user(users),
+                         current_user=get_current_user(store.users),
                          recipes_count=stats['recipes_count'],
                          categories=RECIPE_CATEGORIES,
                          difficulties=RECIPE_DIFFICULTIES)
@@ -712,15 +966,15 @@ def create_recipe():
 @admin_required_html
 def fix_recipe(recipe_id):
     """Исправление проблемного рецепта"""
-    recipe = next((r for r in recipes if r['id'] == recipe_id), None)
+    recipe = store.get_recipe(recipe_id)
     
     if not recipe:
         flash('Рецепт не найден', 'danger')
         return redirect(url_for('admin_panel'))
     
     if recipe['cooking_time'] <= 0:
-        recipe['cooking_time'] = 30
-        save_all_data()
+        with store.write() as writer:
+            writer.update_recipe(recipe_id, {'cooking_time': 30})
         flash(f'Время приготовления рецепта "{recipe["title"]}" исправлено на 30 минут', 'success')
     else:
         flash('Рецепт не требует исправлений', 'info')
@@ -731,8 +985,6 @@ def fix_recipe(recipe_id):
 def init_database():
     """Инициализация тестовых данных"""
     try:
-        global users
-        
         # Добавляем тестовых пользователей
         test_users = [
             ('alice', 'password123', 'alice@example.com'),
@@ -742,28 +994,26 @@ def init_database():
             ('eve', 'password123', 'eve@example.com')
         ]
         
-        existing_usernames = [user['username'] for user in users]
         new_users_created = 0
         
-        for username, password, email in test_users:
-            if username not in existing_usernames:
-                new_user = {
-                    'id': max([u['id'] for u in users], default=0) + 1,
-                    'username': username,
-                    'password_hash': generate_password_hash(password),
-                    'is_admin': False,
-                    'email': email,
-                    'created_at': datetime.now().strftime('%Y-%m-%d')
-                }
-                users.append(new_user)
-                existing_usernames.append(username)
-                new_users_created += 1
-        
-        # Обновляем данные в конфиге
-        app.config['USERS_LIST'] = users
-        app.config['RECIPES_LIST'] = recipes
-        
-        save_all_data()
+        with store.write() as writer:
+            existing_usernames = [user['username'] for user in writer.users]
+            for username, password, email in test_users:
+                if username not in existing_usernames:
+                    new_user = {
+                        'id': writer.next_user_id(),
+                        'username': username,
+                        'password_hash': generate_password_hash(password),
+                        'is_admin': False,
+                        'email': email,
+                        'created_at': datetime.now().strftime('%Y-%m-%d')
+                    }
+                    writer.add_user(new_user)
+                    existing_usernames.append(username)
+                    new_users_created += 1
+        
+        users = store.users
+        recipes = store.recipes
         
         return f'''
             <!DOCTYPE html>
@@ -897,10 +1147,12 @@ def init_database():
 
 # ========== JSON-RPC API ==========
 
-@app.route('/api', methods=['POST'])
+@app.route('/api', methods=['GET', 'POST'])
 def api():
     """JSON-RPC endpoint"""
     try:
+        if request.method == 'GET':
+            return jsonrpc_handler.handle_get_request()
         return jsonrpc_handler.handle_request()
     except JSONRPCError as e:
         return jsonify({
@@ -910,18 +1162,117 @@ def api():
                 'message': e.message,
                 'data': e.data
             },
-            'id': request.json.get('id') if request.is_json else None
+            'id': _request_id()
         }), 500
     except Exception as e:
+        log.exception('Ошибка обработки запроса JSON-RPC')
         return jsonify({
             'jsonrpc': '2.0',
             'error': {
                 'code': -32603,
                 'message': f'Internal server error: {str(e)}'
             },
-            'id': request.json.get('id') if request.is_json else None
+            'id': _request_id()
         }), 500
 
+def _request_id():
+    """ID запроса JSON-RPC для ответа с ошибкой (для пакетов - None)"""
+    if request.method == 'GET':
+        return request.args.get('id')
+    data = request.get_json(silent=True) if request.is_json else None
+    return data.get('id') if isinstance(data, dict) else None
+
+# ========== ЭКСПОРТ И ИМПОРТ ==========
+
+def run_import(stream, fmt, author):
+    """Импорт рецептов из потока; файл рецептов записывается один раз в конце"""
+    with store.deferred_save():
+        return import_records(
+            iter_records(stream, fmt),
+            jsonrpc_handler.import_committer(author),
+            JSONRPCHandler.RECIPE_DEFAULTS,
+            batch_size=app.config['IMPORT_BATCH_SIZE'],
+            workers=app.config['IMPORT_WORKERS']
+        )
+
+@app.route('/admin/export/recipes.<fmt>')
+@admin_required_html
+def export_recipes(fmt):
+    """Потоковая выгрузка каталога в NDJSON или CSV"""
+    if fmt not in FORMATS:
+        abort(404)
+    return app.response_class(
+        iter_export(store.recipes, fmt),
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename=recipes.{fmt}'}
+    )
+
+@app.route('/admin/import/recipes', methods=['POST'])
+@admin_required_html
+def import_recipes():
+    """Загрузка рецептов из NDJSON или CSV (файл в поле file или тело запроса)"""
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = guess_format(upload.filename, upload.mimetype)
+    else:
+        stream = io.BufferedReader(request.stream)
+        fmt = guess_format(mimetype=request.mimetype)
+    fmt = request.args.get('format') or fmt
+    if fmt not in FORMATS:
+        return jsonify({
+            'success': False,
+            'error': f'Неизвестный формат, поддерживаются: {", ".join(FORMATS)}'
+        }), 400
+    
+    report = run_import(stream, fmt, session.get('username', 'admin'))
+    return jsonify({'success': True, **report})
+
+@app.cli.command('export-recipes')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='По умолчанию - по расширению файла')
+def export_recipes_command(path, fmt):
+    """Выгрузка каталога рецептов в файл NDJSON или CSV"""
+    fmt = fmt or guess_format(path) or 'ndjson'
+    started = time.perf_counter()
+    with open(path, 'wb') as f:
+        recipes = store.recipes
+        for chunk in iter_export(recipes, fmt):
+            f.write(chunk)
+    click.echo(f'Выгружено рецептов: {len(recipes)} за {time.perf_counter() - started:.2f} с')
+
+@app.cli.command('import-recipes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='По умолчанию - по расширению файла')
+@click.option('--author', default='admin', help='Автор для записей без поля author')
+def import_recipes_command(path, fmt, author):
+    """Загрузка рецептов из файла NDJSON или CSV"""
+    fmt = fmt or guess_format(path)
+    if fmt is None:
+        raise click.UsageError('Не удалось определить формат файла, укажите --format')
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        report = run_import(f, fmt, author)
+    click.echo(f'Добавлено: {report["imported"]}, отклонено: {report["rejected"]} '
+               f'за {time.perf_counter() - started:.2f} с')
+    for error in report['errors']:
+        click.echo(f'  строка {error["line"]}: {error["errors"]}')
+
+@app.cli.command('warmup')
+def warmup_command():
+    """Компиляция всех шаблонов (заполняет кэш байт-кода на диске) и прогрев кэшей"""
+    timings = warm_up(app)
+    click.echo(f'Шаблонов: {timings["templates"]} за {timings["compile_ms"]} мс, '
+               f'страниц: {timings["pages"]} за {timings["render_ms"]} мс')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Сборка статических файлов: минификация, хеш в имени, .gz-варианты"""
+    started = time.perf_counter()
+    manifest = static_assets.rebuild()
+    click.echo(f'Файлов: {len(manifest)} за {(time.perf_counter() - started) * 1000:.0f} мс '
+               f'-> {static_assets.build_dir}')
+
 # ========== ВСПОМОГАТЕЛЬНЫЕ МАРШРУТЫ ==========
 
 @app.route('/api/test', methods=['GET'])
@@ -931,8 +1282,9 @@ def api_test():
         'status': 'OK',
         'message': 'API работает корректно',
         'endpoints': {
-            '/api': 'JSON-RPC endpoint (POST)',
-            '/api/test': 'Тестовый endpoint (GET)'
+            '/api': 'JSON-RPC endpoint (POST; GET ?method=&params=&id= для методов чтения)',
+            '/api/test': 'Тестовый endpoint (GET)',
+            '/api/events': 'Server-sent events: статистика и изменения каталога (GET)'
         },
         'app_info': {
             'name': 'Кулинарные рецепты',
@@ -958,29 +1310,74 @@ def current_stats():
         'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     })
 
+@app.route('/api/events', methods=['GET'])
+def live_events():
+    """Поток server-sent events: stats (изменившиеся значения статистики) и recipe (created/updated/deleted)"""
+    if not app.config['EVENTS_SSE']:
+        # Воркер сервера (например, sync gunicorn) был бы занят потоком целиком
+        return jsonify({'success': False, 'error': 'Поток событий отключен, используйте /api/current_stats'}), 503
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    catalog = jsonrpc_handler.index
+    try:
+        stream = broadcaster.stream(last_event_id, snapshot=lambda: ('stats', catalog.stats()))
+    except SubscribersLimitError:
+        return jsonify({'success': False, 'error': 'Слишком много подписчиков'}), 503, {'Retry-After': '30'}
+    # direct_passthrough: сервер получает сам поток, и его close() прерывает ожидание
+    # событий сразу (обертка werkzeug сначала закрыла бы еще выполняющийся генератор)
+    return app.response_class(
+        stream,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        direct_passthrough=True
+    )
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Метрики всех воркеров в текстовом формате Prometheus.
+
+    Доступ: заголовок Authorization: Bearer METRICS_TOKEN или сессия администратора.
+    Адрес клиента не учитывается: за обратным прокси все запросы приходят с localhost
+    """
+    token = app.config['METRICS_TOKEN']
+    allowed = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', '').encode('utf-8'), f'Bearer {token}'.encode('utf-8')
+    )
+    if not allowed and not session.get('is_admin'):
+        abort(403)
+    return app.response_class(
+        metrics.render(metrics.REGISTRY.aggregate()),
+        content_type=metrics.CONTENT_TYPE,
+        headers={'Cache-Control': 'no-store'}
+    )
+
 @app.route('/api/ping')
 def ping():
     """Проверка работы API"""
     return jsonify({'status': 'ok', 'message': 'API работает'})
 
+# ========== ПРОГРЕВ ==========
+
+# Прогрев выполняется при импорте приложения, то есть до того,
+# как процесс (в том числе каждый воркер WSGI-сервера) начнет принимать запросы
+if app.config['TEMPLATE_WARMUP']:
+    timings = warm_up(app)
+    log.info(f"🔥 Прогрев: шаблонов {timings['templates']} за {timings['compile_ms']} мс, "
+             f"страниц {timings['pages']} за {timings['render_ms']} мс, "
+             f"запуск всего {(time.perf_counter() - STARTED_AT) * 1000:.0f} мс",
+             extra={'fields': dict(timings, startup_ms=round((time.perf_counter() - STARTED_AT) * 1000))})
+
 # ========== ЗАПУСК ==========
 
 if __name__ == '__main__':
-    print("\n" + "="*50)
-    print("🍳 КУЛИНАРНЫЙ САЙТ")
-    print("="*50)
-    print(f"👤 Пользователей в системе: {len(users)}")
-    print(f"📝 Рецептов в системе: {len(recipes)}")
-    print(f"🏷️ Категорий рецептов: {len(set([r['category'] for r in recipes]))}")
-    
-    # Проверяем наличие администратора
-    admin_exists = any(user['username'] == 'admin' for user in users)
-    if not admin_exists:
-        print("\n⚠️  Администратор не найден!")
-        print("📌 Перейдите по ссылке: http://localhost:5000/init")
-    else:
-        print("\n✅ Система готова к работе")
-    
-    print("💾 Данные загружены из файлов: data/users.json и data/recipes.json")
-    print("\n🚀 Запуск приложения на http://localhost:5000")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    host, port = '0.0.0.0', 5000
+    categories = len(set(r['category'] for r in store.recipes))
+    log.info(f"🍳 Кулинарный сайт: http://localhost:{port} (сервер разработки), "
+             f"пользователей {len(store.users)}, рецептов {len(store.recipes)}, категорий {categories}",
+             extra={'fields': {'host': host, 'port': port, 'mode': 'development',
+                               'users': len(store.users), 'recipes': len(store.recipes),
+                               'categories': categories}})
+    if not any(user['username'] == 'admin' for user in store.users):
+        log.warning(f"⚠️ Администратор не найден, создайте его: http://localhost:{port}/init")
+    # Сервер разработки многопоточный: поток событий не блокирует остальные запросы
+    app.config['EVENTS_SSE'] = True
+    app.run(debug=True, host=host, port=port)
@@ -0,0 +1,198 @@
+"""ASGI-вход приложения: uvicorn asgi:app (один процесс, как и gunicorn.conf.py:
+у каждого процесса было бы свое хранилище DataStore)
+
+Соединения, keep-alive, чтение тела запроса и отправка ответа медленному
+клиенту обслуживаются циклом событий сервера и не занимают потоков. Код Flask
+(JSON-RPC методы, поиск, хеширование паролей, рендеринг) выполняется в пуле
+потоков, поэтому один воркер держит тысячи соединений, а параллельно
+обрабатывается не больше ASGI_THREADS запросов.
+
+Порции потоковых ответов (server-sent events, выгрузка) читаются в отдельном
+пуле из ASGI_STREAM_THREADS потоков: подписчик /api/events, ждущий событий,
+не занимает поток обработки запросов. При отключении клиента (http.disconnect)
+поток ответа закрывается сразу, не дожидаясь следующей порции.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Поток событий ждет в отдельном пуле (ASGI_STREAM_THREADS), соединения держит цикл событий
+os.environ.setdefault('EVENTS_SSE', '1')
+
+from app import app as flask_app
+
+_DONE = object()
+
+
+class WSGIBridge:
+    """Выполняет WSGI-приложение в пуле потоков за ASGI-интерфейсом"""
+
+    def __init__(self, wsgi_app, threads=32, stream_threads=128, spool_bytes=1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.spool_bytes = spool_bytes
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-flask')
+        self.stream_executor = ThreadPoolExecutor(max_workers=stream_threads, thread_name_prefix='asgi-stream')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                self.stream_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, chunk, iterable = await loop.run_in_executor(
+                self.executor, self._start, self._environ(scope, body)
+            )
+        finally:
+            body.close()
+
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        pending = None
+        try:
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            while chunk is not _DONE:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                # Потоковые ответы читаются порциями в отдельном пуле, не занимая поток между ними
+                pending = loop.run_in_executor(self.stream_executor, next, iterable, _DONE)
+                await asyncio.wait((pending, disconnected), return_when=asyncio.FIRST_COMPLETED)
+                if not pending.done():
+                    return
+                chunk = pending.result()
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            if hasattr(iterable, 'close'):
+                await self._close(loop, iterable, pending)
+
+    async def _wait_disconnect(self, receive):
+        """Завершается, когда клиент отключился (тело запроса уже прочитано)"""
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _close(self, loop, iterable, pending):
+        """Закрывает поток ответа. Если next() еще выполняется (клиент отключился
+        во время ожидания порции), генератор закрывается после его возврата:
+        поток событий прерывает ожидание сам в close() (events._Stream).
+
+        close() выполняется в пуле запросов: пул потоковых ответов может быть
+        целиком занят ожидающими next(), и close() встал бы в очередь за ними"""
+        try:
+            await loop.run_in_executor(self.executor, iterable.close)
+        except ValueError:
+            await asyncio.wait((pending,))
+            await loop.run_in_executor(self.executor, iterable.close)
+
+    async def _read_body(self, receive):
+        """Тело запроса в файле (в памяти до spool_bytes); None - клиент отключился"""
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def _start(self, environ):
+        """Вызов приложения и первая порция ответа (выполняется в пуле потоков)"""
+        response = {}
+        written = []
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+            return written.append
+
+        result = self.wsgi_app(environ, start_response)
+        iterable = iter(result)
+        chunk = next(iterable, _DONE)
+        if written:
+            chunk = b''.join(written) + (b'' if chunk is _DONE else chunk)
+        if hasattr(result, 'close') and not hasattr(iterable, 'close'):
+            iterable = _Closing(iterable, result.close)
+        return response['status'], response['headers'], chunk, iterable
+
+    def _environ(self, scope, body):
+        """WSGI environ из ASGI scope (PEP 3333)"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for raw_name, raw_value in scope['headers']:
+            name = raw_name.decode('latin-1').upper().replace('-', '_')
+            value = raw_value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+                continue
+            if name == 'CONTENT_LENGTH':
+                continue
+            key = f'HTTP_{name}'
+            if key in environ:
+                value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+            environ[key] = value
+        # Длина тела - по фактически прочитанным данным
+        body.seek(0, 2)
+        environ['CONTENT_LENGTH'] = str(body.tell())
+        body.seek(0)
+        return environ
+
+
+class _Closing:
+    """Итератор ответа с close() исходного объекта"""
+
+    def __init__(self, iterator, close):
+        self._iterator = iterator
+        self.close = close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+
+app = WSGIBridge(
+    flask_app,
+    threads=flask_app.config['ASGI_THREADS'],
+    stream_threads=flask_app.config['ASGI_STREAM_THREADS'],
+    spool_bytes=flask_app.config['ASGI_SPOOL_BYTES'],
+)
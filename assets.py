@@ -0,0 +1,316 @@
+"""Статические файлы: имена с хешем содержимого, заранее сжатые варианты
+и долгое кэширование
+
+    flask build-assets
+
+Файлы static/ (кроме каталога сборки) копируются в static/dist/ под именами
+с хешем содержимого: css/style.css -> dist/css/style.1a2b3c4d5e.css. CSS и JS
+при этом минифицируются, а для текстовых файлов рядом кладется .gz.
+static/dist/manifest.json сопоставляет исходные имена собранным.
+
+url_for('static', filename='css/style.css') по манифесту возвращает адрес
+собранного файла. Собранные файлы отдаются с Cache-Control: immutable на год:
+измененный файл получит новое имя, а не устаревшую копию из кэша браузера.
+Клиенту с Accept-Encoding: gzip отдается готовый .gz без сжатия на лету.
+Без манифеста (сборка не выполнялась) url_for ведет на исходные файлы.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory
+
+MANIFEST = 'manifest.json'
+
+# Расширения, для которых имеет смысл .gz (картинки уже сжаты)
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+
+
+# ========== МИНИФИКАЦИЯ ==========
+
+_CSS_TOKENS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|\s+|[^"\'/\s]+|/', re.S)
+
+
+def minify_css(text):
+    """Без комментариев и лишних пробелов; строки не меняются"""
+    parts = []
+    plain = []
+    for token in _CSS_TOKENS.findall(text):
+        if token.startswith('/*'):
+            continue
+        if token[0] in '"\'':
+            parts.append(_squeeze_css(''.join(plain)))
+            parts.append(token)
+            plain = []
+        else:
+            plain.append(' ' if token.isspace() else token)
+    parts.append(_squeeze_css(''.join(plain)))
+    return ''.join(parts).strip()
+
+
+def _squeeze_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    # Пробел перед двоеточием значим (".a :hover"), после - нет
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}')
+
+
+# После этих символов и слов "/" начинает регулярное выражение, а не деление
+_REGEX_AFTER_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+                      'void', 'throw', 'yield', 'await'}
+
+
+def minify_js(text):
+    """Без комментариев, отступов и пустых строк.
+
+    Переводы строк сохраняются (автоматическая расстановка точек с запятой
+    работает как в исходнике), строки, шаблоны и регулярные выражения не меняются.
+    """
+    out = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in '"\'`':
+            j = _skip_string(text, i)
+            out.append(text[i:j])
+            i = j
+        elif text.startswith('//', i):
+            j = text.find('\n', i)
+            i = n if j < 0 else j
+        elif text.startswith('/*', i):
+            j = text.find('*/', i + 2)
+            i = n if j < 0 else j + 2
+            _append_space(out, ' ')
+        elif c == '/' and _regex_allowed(out):
+            j = _skip_regex(text, i)
+            out.append(text[i:j])
+            i = j
+        elif c.isspace():
+            j = i
+            while j < n and text[j].isspace():
+                j += 1
+            _append_space(out, '\n' if '\n' in text[i:j] else ' ')
+            i = j
+        else:
+            out.append(c)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def _append_space(out, space):
+    """Пробел или перевод строки; подряд идущие сливаются, перевод строки важнее"""
+    if not out or out[-1] == '\n':
+        return
+    if out[-1] == ' ':
+        if space == '\n':
+            out[-1] = '\n'
+        return
+    out.append(space)
+
+
+def _skip_string(text, i):
+    """Индекс после строки или шаблона, начинающихся в i"""
+    quote = text[i]
+    j = i + 1
+    while j < len(text):
+        c = text[j]
+        if c == '\\':
+            j += 2
+            continue
+        if c == quote:
+            return j + 1
+        if quote == '`' and text.startswith('${', j):
+            j = _skip_template_expression(text, j + 2)
+            continue
+        j += 1
+    return j
+
+
+def _skip_template_expression(text, j):
+    """Индекс после '}' выражения ${...} шаблона (с вложенными строками и скобками)"""
+    depth = 1
+    while j < len(text):
+        c = text[j]
+        if c in '"\'`':
+            j = _skip_string(text, j)
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return j + 1
+        j += 1
+    return j
+
+
+def _regex_allowed(out):
+    tail = ''.join(out[-20:]).rstrip()
+    if not tail:
+        return True
+    if tail[-1] in _REGEX_AFTER_CHARS:
+        return True
+    word = re.search(r'[A-Za-z_$][\w$]*$', tail)
+    return word is not None and word.group() in _REGEX_AFTER_WORDS
+
+
+def _skip_regex(text, i):
+    j = i + 1
+    in_class = False
+    while j < len(text):
+        c = text[j]
+        if c == '\\':
+            j += 2
+            continue
+        if c == '\n':
+            # Не регулярное выражение - только сам символ "/"
+            return i + 1
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            j += 1
+            while j < len(text) and text[j].isalpha():
+                j += 1
+            return j
+        j += 1
+    return i + 1
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+# ========== СБОРКА ==========
+
+def source_files(static_folder, build_dir):
+    """Исходные файлы static/ относительно static/ (с / в качестве разделителя)"""
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(build_dir):
+            dirs[:] = []
+            continue
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != build_dir]
+        for filename in files:
+            path = os.path.join(root, filename)
+            yield os.path.relpath(path, static_folder).replace(os.sep, '/')
+
+
+def build(static_folder, build_dir_name='dist'):
+    """Собирает static/ в static/<build_dir_name>/ и возвращает манифест
+    {исходное имя: имя собранного файла относительно static/}"""
+    build_dir = os.path.join(static_folder, build_dir_name)
+    previous = read_manifest(build_dir)
+    manifest = {}
+    for name in sorted(source_files(static_folder, build_dir)):
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            data = f.read()
+        stem, extension = os.path.splitext(name)
+        minify = MINIFIERS.get(extension.lower())
+        if minify is not None:
+            data = minify(data.decode('utf-8')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        built = f'{build_dir_name}/{stem}.{digest}{extension}'
+        manifest[name] = built
+        path = os.path.join(static_folder, built)
+        if not os.path.exists(path):
+            _write(path, data)
+        if extension.lower() in COMPRESSIBLE and not os.path.exists(f'{path}.gz'):
+            # mtime=0: одинаковое содержимое - одинаковый .gz
+            compressed = gzip.compress(data, 9, mtime=0)
+            if len(compressed) < len(data):
+                _write(f'{path}.gz', compressed)
+    _write(os.path.join(build_dir, MANIFEST),
+           json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8'))
+    # Файлы предыдущей сборки остаются: на них могут ссылаться страницы в кэшах
+    _remove_stale(static_folder, build_dir, set(manifest.values()) | set(previous.values()))
+    return manifest
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _remove_stale(static_folder, build_dir, keep):
+    for root, _, files in os.walk(build_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            if filename == MANIFEST or filename.endswith('.tmp'):
+                continue
+            if name not in keep and name.removesuffix('.gz') not in keep:
+                os.remove(path)
+
+
+def read_manifest(build_dir):
+    try:
+        with open(os.path.join(build_dir, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _needs_build(static_folder, build_dir):
+    """Манифеста нет или какой-то исходник новее него"""
+    try:
+        built_at = os.path.getmtime(os.path.join(build_dir, MANIFEST))
+    except OSError:
+        return True
+    return any(os.path.getmtime(os.path.join(static_folder, name)) > built_at
+               for name in source_files(static_folder, build_dir))
+
+
+# ========== ПОДКЛЮЧЕНИЕ К ПРИЛОЖЕНИЮ ==========
+
+class Assets:
+    def __init__(self, app):
+        self.static_folder = app.static_folder
+        self.build_dir_name = app.config['ASSETS_DIR']
+        self.build_dir = os.path.join(self.static_folder, self.build_dir_name)
+        self.max_age = app.config['ASSETS_MAX_AGE']
+        if app.config['ASSETS_AUTO_BUILD'] and _needs_build(self.static_folder, self.build_dir):
+            build(self.static_folder, self.build_dir_name)
+        self.manifest = read_manifest(self.build_dir)
+
+        app.url_defaults(self._url_defaults)
+        self._send_static = app.view_functions['static']
+        app.view_functions['static'] = self._serve
+
+    def rebuild(self):
+        self.manifest = build(self.static_folder, self.build_dir_name)
+        return self.manifest
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static':
+            built = self.manifest.get(values.get('filename'))
+            if built is not None:
+                values['filename'] = built
+
+    def _serve(self, filename):
+        if not filename.startswith(f'{self.build_dir_name}/'):
+            return self._send_static(filename=filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        has_gzip = os.path.isfile(os.path.join(self.static_folder, f'{filename}.gz'))
+        gzipped = has_gzip and request.accept_encodings['gzip'] > 0
+        response = send_from_directory(self.static_folder, f'{filename}.gz' if gzipped else filename,
+                                       mimetype=mimetype, max_age=self.max_age)
+        if gzipped:
+            response.content_encoding = 'gzip'
+        if has_gzip:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+def init_app(app):
+    """Сборка при необходимости (ASSETS_AUTO_BUILD), url_for по манифесту, раздача собранных файлов"""
+    return Assets(app)
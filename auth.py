@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import session, flash, redirect, url_for
+from flask import session, flash, redirect, url_for, request, current_app, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 import re
 
@@ -262,6 +262,9 @@ def authenticate_user(username, password, users_list):
 
 def login_user(user_id, username, is_admin_flag=False):
     """Вход пользователя"""
+    # Новый ID сессии при входе защищает от фиксации сессии
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
     session['user_id'] = user_id
     session['username'] = username
     session['is_admin'] = is_admin_flag
@@ -269,6 +272,14 @@ def login_user(user_id, username, is_admin_flag=False):
 def logout_user():
     """Выход пользователя"""
     session.clear()
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
+
+def revoke_user_sessions(user_id):
+    """Отзывает все серверные сессии пользователя (например, после снятия прав)"""
+    store = getattr(current_app.session_interface, 'store', None)
+    if store is not None:
+        store.delete_user(user_id)
 
 def register_user(username, password, email, users_list):
     """Регистрация нового пользователя"""
@@ -316,6 +327,17 @@ def admin_required_html(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_required_json(f):
+    """Декоратор для служебных JSON маршрутов (только админ): ошибка в JSON вместо редиректа"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session or 'username' not in session:
+            return jsonify({'success': False, 'error': 'Требуется авторизация'}), 401
+        if not session.get('is_admin'):
+            return jsonify({'success': False, 'error': 'Требуются права администратора'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
 def login_required_jsonrpc(method):
     """Декоратор для JSON-RPC методов"""
     @wraps(method)
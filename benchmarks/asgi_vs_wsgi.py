@@ -0,0 +1,194 @@
+"""Сравнение WSGI (gunicorn) и ASGI (uvicorn + asgi.py) на JSON-RPC API
+
+    python benchmarks/asgi_vs_wsgi.py --recipes 5000 --workers 2 --clients 64 --slow 32
+
+Для каждого сервера клиенты с keep-alive в течение --duration секунд вызывают
+search_recipes через POST /api; одновременно --slow медленных клиентов
+передают тело запроса по байту в секунду. Печатаются запросы в секунду,
+p50/p99 задержки и число ошибок обычных клиентов.
+
+Нужны gunicorn и uvicorn (в зависимости приложения не входят).
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from prefork_memory import ROOT, make_data
+
+SERVERS = {
+    'gunicorn-sync': lambda port, workers, threads: [
+        sys.executable, '-m', 'gunicorn', 'wsgi:app', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers), '--worker-class', 'sync', '--timeout', '120'],
+    'gunicorn-gthread': lambda port, workers, threads: [
+        sys.executable, '-m', 'gunicorn', 'wsgi:app', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers), '--worker-class', 'gthread', '--threads', str(threads),
+        '--timeout', '120'],
+    'uvicorn-asgi': lambda port, workers, threads: [
+        sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+        '--workers', str(workers), '--log-level', 'warning'],
+}
+
+QUERIES = ['суп', 'салат', 'торт', 'курица', 'паста', 'омлет']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request_bytes(port, body):
+    return (
+        f'POST /api HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n'
+        f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+    ).encode('latin-1') + body
+
+
+async def read_response(reader):
+    """Статус ответа и признак закрытия соединения сервером"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get('connection') == 'close'
+
+
+async def fast_client(port, number, deadline, latencies, errors):
+    reader = writer = None
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps({'jsonrpc': '2.0', 'method': 'search_recipes', 'id': i,
+                           'params': {'title': QUERIES[(number + i) % len(QUERIES)]}}).encode()
+        i += 1
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request_bytes(port, body))
+            await writer.drain()
+            status, close = await asyncio.wait_for(read_response(reader), 30)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            errors.append(1)
+            writer = None
+            continue
+        if status != 200:
+            errors.append(1)
+        else:
+            latencies.append(time.perf_counter() - started)
+        if close:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def slow_client(port, deadline):
+    """Клиент на медленной сети: тело запроса приходит по байту в секунду"""
+    body = json.dumps({'jsonrpc': '2.0', 'method': 'get_categories', 'id': 1}).encode()
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            data = request_bytes(port, body)
+            head, body_part = data[:-len(body)], data[-len(body):]
+            writer.write(head)
+            for position in range(len(body_part)):
+                if time.perf_counter() >= deadline:
+                    break
+                writer.write(body_part[position:position + 1])
+                await writer.drain()
+                await asyncio.sleep(1)
+            writer.close()
+        except OSError:
+            await asyncio.sleep(0.1)
+
+
+async def run_load(port, clients, slow, duration):
+    deadline = time.perf_counter() + duration
+    latencies = []
+    errors = []
+    tasks = [slow_client(port, deadline) for _ in range(slow)]
+    tasks += [fast_client(port, n, deadline, latencies, errors) for n in range(clients)]
+    await asyncio.gather(*tasks)
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+
+    return {
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+        'errors': len(errors),
+    }
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Сервер не запустился')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help='потоков на воркер gunicorn-gthread')
+    parser.add_argument('--clients', type=int, default=64, help='обычных клиентов с keep-alive')
+    parser.add_argument('--slow', type=int, default=0, help='медленных клиентов')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--servers', default=','.join(SERVERS))
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='asgi-vs-wsgi-')
+    try:
+        make_data(directory, args.recipes)
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        print(f'Рецептов: {args.recipes}, воркеров: {args.workers}, клиентов: {args.clients}, '
+              f'медленных: {args.slow}, {args.duration:.0f} с')
+        print(f"{'сервер':<18}{'запр/с':>10}{'p50, мс':>10}{'p99, мс':>10}{'ошибок':>8}")
+        for name in args.servers.split(','):
+            port = free_port()
+            server = subprocess.Popen(
+                SERVERS[name](port, args.workers, args.threads),
+                cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+            try:
+                wait_ready(port)
+                result = asyncio.run(run_load(port, args.clients, args.slow, args.duration))
+            finally:
+                os.killpg(server.pid, signal.SIGTERM)
+                server.wait()
+            print(f"{name:<18}{result['rps']:>10.0f}{result['p50_ms']:>10.1f}"
+                  f"{result['p99_ms']:>10.1f}{result['errors']:>8}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,578 @@
+"""Нагрузочный тест: воспроизведение записанного или синтетического трафика
+
+    python benchmarks/loadtest.py --duration 30 --concurrency 16 --rate 200
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --duration 60 --writers 6
+    python benchmarks/loadtest.py --dump traffic.jsonl --sessions 500
+    python benchmarks/loadtest.py --replay traffic.jsonl --concurrency 32
+
+Без --url приложение запускается в этом же процессе (Flask test client) на
+каталоге из data_generator.py во временном каталоге. С --url запросы идут на
+запущенный сервер; --writers и сценарий admin изменяют его данные.
+
+Трафик состоит из сессий посетителей:
+    browse  - главная, страницы каталога (первые чаще), рецепты
+    search  - страница поиска и набор запроса по буквам: как и search.html,
+              запрос уходит после паузы в наборе дольше 500 мс
+    login   - вход обычным пользователем и переход на главную
+    admin   - вход администратора, список рецептов и правки update_recipe
+
+Виртуальные пользователи (--concurrency) берут сессии из общей очереди и
+выполняют их по порядку, выдерживая паузы между запросами (--think 0 убирает
+паузы). --rate ограничивает общий поток запросов в секунду.
+
+Файл для --replay - JSON Lines, по строке на запрос:
+    {"session": 3, "t": 1.25, "method": "POST", "path": "/api", "json": {...}}
+t - секунды от начала сессии, необязательные поля: form (данные формы),
+name (имя в отчете). --dump сохраняет синтетический трафик в этом формате.
+
+Потерянные обновления (--writers N): N администраторов одновременно правят
+одни и те же рецепты, каждый - свое поле (title, description или steps).
+Правка трогает только свое поле, поэтому после теста в каждом поле должно
+быть последнее подтвержденное сервером значение; иначе обновление потеряно
+(например, воркеры сервера перезаписали данные друг друга).
+"""
+import argparse
+import contextlib
+import http.client
+import itertools
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Задержка перед поиском в search.html (onSearchInput)
+SEARCH_DEBOUNCE = 0.5
+
+SEARCH_WORDS = ['борщ', 'салат', 'курица', 'торт', 'суп', 'паста', 'омлет', 'котлеты', 'пицца', 'блины']
+CATEGORIES = ['Завтрак', 'Обед', 'Ужин', 'Десерт', 'Закуска', 'Салат', 'Суп', 'Основное блюдо']
+
+DEFAULT_MIX = 'browse=50,search=30,login=15,admin=5'
+
+# Поля, которые правят писатели при проверке потерянных обновлений
+WRITER_FIELDS = ('title', 'description', 'steps')
+
+
+# ========== ПОДКЛЮЧЕНИЕ К ПРИЛОЖЕНИЮ ==========
+
+class InProcessTarget:
+    """Приложение в этом процессе на синтетическом каталоге во временном каталоге"""
+
+    def __init__(self, recipes, users, seed):
+        import data_generator
+
+        self.directory = tempfile.mkdtemp(prefix='loadtest-')
+        data_generator.write_catalog(os.path.join(self.directory, 'data'), recipes, users, seed)
+        # Приложение читает data/ и instance/ относительно текущего каталога
+        os.chdir(self.directory)
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            import app
+        self.app = app.app
+
+    def client(self):
+        return FlaskClient(self.app.test_client())
+
+    def close(self):
+        os.chdir(ROOT)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class FlaskClient:
+    def __init__(self, client):
+        self._client = client
+
+    def request(self, method, path, json=None, form=None):
+        response = self._client.open(path, method=method, json=json, data=form)
+        return response.status_code, response.get_data()
+
+
+class HttpTarget:
+    """Запущенный сервер: по постоянному соединению на виртуального пользователя"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+
+    def client(self):
+        return HttpClient(self.host, self.port)
+
+    def close(self):
+        pass
+
+
+class HttpClient:
+    """Соединение с keep-alive и своими cookie (сессия Flask)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookies = {}
+        self._conn = None
+
+    def request(self, method, path, json=None, form=None):
+        headers = {'Accept-Encoding': 'identity'}
+        body = None
+        if json is not None:
+            body = _json_dumps(json)
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            body = urlencode(form).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # Сервер закрыл соединение keep-alive - один повтор на новом
+                self._conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        if response.getheader('Connection', '').lower() == 'close':
+            self._conn.close()
+            self._conn = None
+        return response.status, data
+
+
+def _json_dumps(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+# ========== ТРАФИК ==========
+
+def rpc(method, params, name=None):
+    return {'method': 'POST', 'path': '/api', 'name': name or f'rpc:{method}',
+            'json': {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1}}
+
+
+def get(path):
+    return {'method': 'GET', 'path': path}
+
+
+def typing_burst(rng, word):
+    """Запросы search.html при наборе word: (время от начала набора, набранный текст).
+    Запрос уходит, когда пауза после нажатия длиннее задержки debounce"""
+    bursts = []
+    t = 0.0
+    for n in range(1, len(word) + 1):
+        # Обычно 80-300 мс между нажатиями, иногда пауза на раздумье
+        gap = rng.uniform(0.6, 1.5) if rng.random() < 0.15 else rng.uniform(0.08, 0.3)
+        if n == len(word) or gap > SEARCH_DEBOUNCE:
+            bursts.append((t + SEARCH_DEBOUNCE, word[:n]))
+        t += gap
+    return bursts
+
+
+def search_params(title, extra):
+    params = {'fields': 'summary', 'title': title, 'ingredients': [], 'mode': 'any',
+              'category': '', 'difficulty': '', 'max_time': None}
+    params.update(extra)
+    return params
+
+
+def synthetic_session(rng, kind, recipes_count):
+    """Запросы одной сессии: [(секунды от начала сессии, запрос)]"""
+    pages = max(1, recipes_count // 12)
+    t = 0.0
+    steps = []
+
+    def add(request, think):
+        nonlocal t
+        steps.append((round(t, 3), request))
+        t += think
+
+    def recipe_id():
+        # Популярные (первые) рецепты открывают чаще
+        return min(recipes_count, int(rng.paretovariate(1.0))) if rng.random() < 0.7 \
+            else rng.randint(1, recipes_count)
+
+    if kind == 'browse':
+        add(get('/'), rng.uniform(1, 5))
+        for _ in range(rng.randint(1, 4)):
+            page = min(pages, int(rng.paretovariate(1.2)))
+            add(get(f'/recipes?page={page}'), rng.uniform(1, 4))
+            if rng.random() < 0.6:
+                add(get(f'/recipe/{recipe_id()}'), rng.uniform(3, 15))
+    elif kind == 'search':
+        add(get('/search'), rng.uniform(1, 3))
+        for _ in range(rng.randint(1, 3)):
+            extra = {}
+            if rng.random() < 0.3:
+                extra['category'] = rng.choice(CATEGORIES)
+            start = t
+            for offset, text in typing_burst(rng, rng.choice(SEARCH_WORDS)):
+                t = start + offset
+                add(rpc('search_recipes', search_params(text, extra)), 0)
+            t += rng.uniform(2, 6)
+            if rng.random() < 0.5:
+                add(get(f'/recipe/{recipe_id()}'), rng.uniform(3, 10))
+    elif kind == 'login':
+        add(get('/login'), rng.uniform(2, 6))
+        add({'method': 'POST', 'path': '/login', 'form': {'username': 'user', 'password': 'user123'}}, 0.1)
+        add(get('/'), rng.uniform(1, 3))
+    elif kind == 'admin':
+        add({'method': 'POST', 'path': '/login', 'form': {'username': 'admin', 'password': 'admin123'}}, 0.1)
+        add(get('/admin'), 0.2)
+        add(rpc('admin_list_recipes', {'offset': 0, 'limit': 50}), rng.uniform(2, 5))
+        for _ in range(rng.randint(1, 3)):
+            target = rng.randint(1, recipes_count)
+            changes = rng.choice([
+                {'cooking_time': rng.randint(5, 180)},
+                {'rating': round(rng.uniform(3, 5), 1)},
+                {'description': f'Уточненное описание рецепта, правка {rng.randint(1, 10 ** 6)}'},
+            ])
+            add(rpc('update_recipe', dict(changes, recipe_id=target)), rng.uniform(3, 10))
+    else:
+        raise ValueError(f'Неизвестный сценарий: {kind}')
+    return steps
+
+
+def synthetic_sessions(mix, recipes_count, seed):
+    """Бесконечный поток сессий в пропорциях mix"""
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = list(itertools.accumulate(mix.values()))
+    while True:
+        kind = rng.choices(kinds, cum_weights=weights)[0]
+        yield synthetic_session(random.Random(rng.random()), kind, recipes_count)
+
+
+def replay_sessions(path):
+    """Сессии из файла JSON Lines в порядке первого появления"""
+    sessions = {}
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            request = {key: record[key] for key in ('method', 'path', 'json', 'form', 'name') if key in record}
+            request.setdefault('method', 'GET')
+            sessions.setdefault(record.get('session', f'line-{number}'), []).append(
+                (float(record.get('t', 0)), request))
+    for steps in sessions.values():
+        steps.sort(key=lambda step: step[0])
+        yield steps
+
+
+def dump_sessions(path, sessions):
+    with open(path, 'w', encoding='utf-8') as f:
+        for number, steps in enumerate(sessions, 1):
+            for t, request in steps:
+                f.write(json.dumps(dict(request, session=number, t=t), ensure_ascii=False) + '\n')
+
+
+_ID_RE = re.compile(r'/\d+(?=/|$)')
+
+
+def endpoint_name(request):
+    """Имя запроса в отчете: метод JSON-RPC или путь без параметров и id"""
+    if request.get('name'):
+        return request['name']
+    if request['path'].startswith('/api') and isinstance(request.get('json'), dict):
+        return f"rpc:{request['json'].get('method')}"
+    path = _ID_RE.sub('/<id>', request['path'].split('?')[0])
+    return f"{request['method']} {path}"
+
+
+def is_error(request, status, body):
+    """Ошибка: код >= 400 (кроме 304 и редиректов) или ошибка в ответе JSON-RPC"""
+    if status >= 400:
+        return True
+    if request.get('json') is not None and status == 200:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return True
+        if not isinstance(payload, dict):
+            return False
+        return 'error' in payload or (isinstance(payload.get('result'), dict) and 'error' in payload['result'])
+    return False
+
+
+# ========== ЗАПУСК ==========
+
+class Pacer:
+    """Общий предел запросов в секунду для всех виртуальных пользователей"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.perf_counter()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, error, sample=None):
+        with self._lock:
+            self.latencies[name].append(seconds * 1000)
+            if error:
+                self.errors[name] += 1
+                self.error_samples.setdefault(name, sample)
+
+    def report(self):
+        result = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            result[name] = {
+                'count': len(values),
+                'errors': self.errors[name],
+                'error_rate': round(self.errors[name] / len(values), 4),
+                'p50_ms': round(percentile(values, 50), 2),
+                'p95_ms': round(percentile(values, 95), 2),
+                'p99_ms': round(percentile(values, 99), 2),
+                'max_ms': round(values[-1], 2),
+            }
+        return result
+
+
+def percentile(sorted_values, p):
+    """Перцентиль по ближайшему рангу"""
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def send(client, request, stats, name=None):
+    """Выполняет запрос и учитывает его в stats; возвращает (код, тело) или None"""
+    name = name or endpoint_name(request)
+    started = time.perf_counter()
+    try:
+        status, body = client.request(request['method'], request['path'],
+                                      json=request.get('json'), form=request.get('form'))
+    except Exception as e:
+        stats.add(name, time.perf_counter() - started, True, repr(e))
+        return None
+    error = is_error(request, status, body)
+    stats.add(name, time.perf_counter() - started, error, f"{status} {body[:200].decode('utf-8', 'replace')}" if error else None)
+    return status, body
+
+
+def virtual_user(target, sessions, stats, pacer, think, deadline, limit):
+    while time.perf_counter() < deadline:
+        try:
+            steps = sessions.get_nowait()
+        except queue.Empty:
+            return
+        client = target.client()
+        started = time.perf_counter()
+        for t, request in steps:
+            delay = started + t * think - time.perf_counter()
+            if delay > 0:
+                time.sleep(min(delay, max(0, deadline - time.perf_counter())))
+            if time.perf_counter() >= deadline or not limit.take():
+                return
+            pacer.wait()
+            send(client, request, stats)
+
+
+class RequestLimit:
+    """Общий лимит числа запросов (--requests)"""
+
+    def __init__(self, total):
+        self.left = total
+        self._lock = threading.Lock()
+
+    def take(self):
+        if self.left is None:
+            return True
+        with self._lock:
+            if self.left <= 0:
+                return False
+            self.left -= 1
+            return True
+
+
+class SessionQueue:
+    """Очередь сессий поверх (возможно бесконечного) итератора"""
+
+    def __init__(self, iterator):
+        self._iterator = iterator
+        self._lock = threading.Lock()
+
+    def get_nowait(self):
+        with self._lock:
+            try:
+                return next(self._iterator)
+            except StopIteration:
+                raise queue.Empty
+
+
+# ========== ПОТЕРЯННЫЕ ОБНОВЛЕНИЯ ==========
+
+def writer_value(field, writer, n):
+    if field == 'steps':
+        return f'1. Проверка записи {writer}-{n}\n2. Значение должно сохраниться'
+    return f'Проверка записи {writer}-{n}'
+
+
+def writer(target, number, recipe_id, field, stats, deadline, acknowledged):
+    """Администратор, правящий одно поле одного рецепта до deadline"""
+    client = target.client()
+    login = {'method': 'POST', 'path': '/login', 'form': {'username': 'admin', 'password': 'admin123'}}
+    if send(client, login, stats, 'writer:login') is None:
+        return
+    for n in itertools.count(1):
+        if time.perf_counter() >= deadline:
+            return
+        value = writer_value(field, number, n)
+        request = rpc('update_recipe', {'recipe_id': recipe_id, field: value})
+        result = send(client, request, stats, 'writer:update_recipe')
+        if result is None or result[0] != 200:
+            continue
+        payload = json.loads(result[1]).get('result') or {}
+        if payload.get('success'):
+            acknowledged[(recipe_id, field)] = (number, n, value)
+
+
+def check_lost_updates(target, acknowledged):
+    """Поля, в которых после теста не последнее подтвержденное значение"""
+    client = target.client()
+    lost = []
+    for (recipe_id, field), (number, n, value) in sorted(acknowledged.items()):
+        status, body = client.request('POST', '/api', json=rpc('get_recipe', {'recipe_id': recipe_id})['json'])
+        recipe = {}
+        if status == 200:
+            recipe = (json.loads(body).get('result') or {}).get('recipe') or {}
+        if recipe.get(field) != value:
+            lost.append({'recipe_id': recipe_id, 'field': field, 'writer': number,
+                         'expected': value, 'actual': recipe.get(field)})
+    return lost
+
+
+# ========== ОТЧЕТ ==========
+
+def print_report(report, elapsed, lost):
+    total = sum(row['count'] for row in report.values())
+    errors = sum(row['errors'] for row in report.values())
+    print(f"\n{'запрос':<32}{'всего':>8}{'ошибок':>9}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    for name, row in report.items():
+        print(f"{name:<32}{row['count']:>8}{row['error_rate']:>9.1%}{row['p50_ms']:>10.1f}"
+              f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    print(f'\nЗапросов: {total} за {elapsed:.1f} с ({total / elapsed:.1f}/с), ошибок: {errors}')
+    if lost is not None:
+        print(f'Потерянных обновлений: {len(lost)}')
+        for item in lost[:20]:
+            print(f"  рецепт {item['recipe_id']}, {item['field']}: ожидалось {item['expected']!r}, "
+                  f"сейчас {item['actual']!r}")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='адрес сервера; без него - приложение в этом процессе')
+    parser.add_argument('--recipes', type=int, default=10000, help='размер синтетического каталога')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--replay', help='файл трафика JSON Lines')
+    parser.add_argument('--dump', help='сохранить синтетический трафик в файл и выйти')
+    parser.add_argument('--sessions', type=int, default=1000, help='сессий для --dump')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'доли сценариев (по умолчанию {DEFAULT_MIX})')
+    parser.add_argument('--concurrency', type=int, default=8, help='виртуальных пользователей')
+    parser.add_argument('--rate', type=float, default=0, help='предел запросов в секунду (0 - без предела)')
+    parser.add_argument('--think', type=float, default=1.0, help='множитель пауз между запросами')
+    parser.add_argument('--duration', type=float, default=30, help='длительность, с')
+    parser.add_argument('--requests', type=int, help='остановиться после стольких запросов')
+    parser.add_argument('--writers', type=int, default=0, help='писателей для проверки потерянных обновлений')
+    parser.add_argument('--output', help='файл для отчета в JSON')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    if args.dump:
+        sessions = synthetic_sessions(mix, args.recipes, args.seed)
+        dump_sessions(args.dump, itertools.islice(sessions, args.sessions))
+        return
+
+    target = HttpTarget(args.url) if args.url else InProcessTarget(args.recipes, args.users, args.seed)
+    try:
+        if args.replay:
+            sessions = SessionQueue(replay_sessions(args.replay))
+        else:
+            recipes_count = args.recipes
+            if args.url:
+                status, body = target.client().request('POST', '/api', json=rpc('get_recipes_count', {})['json'])
+                recipes_count = json.loads(body)['result']['total']
+            sessions = SessionQueue(synthetic_sessions(mix, recipes_count, args.seed))
+
+        stats = Stats()
+        pacer = Pacer(args.rate)
+        limit = RequestLimit(args.requests)
+        acknowledged = {}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [
+            threading.Thread(target=virtual_user,
+                             args=(target, sessions, stats, pacer, args.think, deadline, limit))
+            for _ in range(args.concurrency)
+        ]
+        # Писатели парами и тройками правят разные поля одних и тех же рецептов
+        threads += [
+            threading.Thread(target=writer, args=(target, number, number // len(WRITER_FIELDS) + 1,
+                                                  WRITER_FIELDS[number % len(WRITER_FIELDS)],
+                                                  stats, deadline, acknowledged))
+            for number in range(args.writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        lost = check_lost_updates(target, acknowledged) if args.writers else None
+        report = stats.report()
+        print_report(report, elapsed, lost)
+        for name, sample in stats.error_samples.items():
+            print(f'  пример ошибки {name}: {sample}')
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'elapsed': round(elapsed, 3), 'endpoints': report, 'lost_updates': lost},
+                          f, ensure_ascii=False, indent=2)
+    finally:
+        target.close()
+    if lost:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
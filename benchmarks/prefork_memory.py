@@ -0,0 +1,164 @@
+"""Уникальная память (USS) воркеров при разных способах запуска
+
+    python benchmarks/prefork_memory.py --recipes 20000 --workers 4 --requests 1000 [--views]
+
+Режимы:
+    fork-then-load  - каждый воркер сам загружает данные после fork (без preload)
+    preload         - данные загружены в мастере, воркеры получают их через fork
+    preload-freeze  - то же, но сборщик мусора выключен на время загрузки,
+                      а перед fork куча заморожена (gc.freeze)
+
+Воркеры обслуживают одинаковую смесь запросов через test_client, после чего
+из /proc/<pid>/smaps_rollup берется USS (Private_Clean + Private_Dirty),
+PSS и RSS каждого воркера. Работает только в Linux.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ('fork-then-load', 'preload', 'preload-freeze')
+
+
+def make_data(directory, count):
+    """Каталог из count рецептов, размноженных из data/recipes.json"""
+    with open(os.path.join(ROOT, 'data', 'recipes.json'), encoding='utf-8') as f:
+        base = json.load(f)
+    rng = random.Random(1)
+    recipes = []
+    for i in range(count):
+        recipe = dict(base[i % len(base)])
+        recipe['id'] = i + 1
+        recipe['title'] = f"{recipe['title']} #{i + 1}"
+        recipe['ingredients'] = list(recipe['ingredients'])
+        recipe['views'] = rng.randint(0, 10000)
+        recipes.append(recipe)
+    os.makedirs(os.path.join(directory, 'data'))
+    shutil.copy(os.path.join(ROOT, 'data', 'users.json'), os.path.join(directory, 'data'))
+    with open(os.path.join(directory, 'data', 'recipes.json'), 'w', encoding='utf-8') as f:
+        json.dump(recipes, f, ensure_ascii=False)
+
+
+def memory_usage(pid):
+    """RSS, PSS и USS процесса в КБ"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty'],
+    }
+
+
+def workload(app, recipes_count, requests, seed, views=False):
+    """Смесь запросов посетителей: главная, каталог, поиск, API; с views=True
+    еще и страницы рецептов (каждый просмотр сейчас перезаписывает recipes.json)"""
+    client = app.test_client()
+    rng = random.Random(seed)
+    pages = max(1, recipes_count // 12)
+    words = ['суп', 'салат', 'торт', 'курица']
+    for i in range(requests):
+        kind = i % 4
+        if kind == 0:
+            client.get('/')
+        elif kind == 1:
+            client.get(f'/recipes?page={rng.randint(1, pages)}')
+        elif kind == 2 and views:
+            client.get(f'/recipe/{rng.randint(1, recipes_count)}')
+        elif kind == 2:
+            client.get(f'/search?q={rng.choice(words)}')
+        else:
+            client.post('/api', json={
+                'jsonrpc': '2.0', 'method': 'search_recipes', 'id': i,
+                'params': {'query': rng.choice(words)},
+            })
+
+
+def run_mode(mode, workers, recipes_count, requests, views):
+    """Выполняется в отдельном процессе: мастер + воркеры, печатает замеры в JSON"""
+    import prefork
+
+    if mode == 'preload-freeze':
+        prefork.begin_preload()
+    if mode != 'fork-then-load':
+        import app
+    if mode == 'preload-freeze':
+        prefork.freeze_heap()
+
+    children = []
+    for number in range(workers):
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            sys.stdout = open(os.devnull, 'w')
+            import app
+            workload(app.app, recipes_count, requests, seed=number, views=views)
+            os.write(ready_w, b'1')
+            signal.pause()
+            os._exit(0)
+        os.close(ready_w)
+        children.append((pid, ready_r))
+
+    for pid, ready_r in children:
+        os.read(ready_r, 1)
+        os.close(ready_r)
+    usage = [memory_usage(pid) for pid, _ in children]
+    for pid, _ in children:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    print(json.dumps({'mode': mode, 'workers': usage}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=20000, help='размер каталога')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=1000, help='запросов на воркер')
+    parser.add_argument('--views', action='store_true', help='открывать страницы рецептов')
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--run-mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        run_mode(args.run_mode, args.workers, args.recipes, args.requests, args.views)
+        return
+
+    directory = tempfile.mkdtemp(prefix='prefork-memory-')
+    try:
+        make_data(directory, args.recipes)
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        print(f'Рецептов: {args.recipes}, воркеров: {args.workers}, запросов на воркер: {args.requests}')
+        print(f"{'режим':<16}{'USS, МБ':>10}{'PSS, МБ':>10}{'RSS, МБ':>10}")
+        for mode in args.modes.split(','):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run-mode', mode,
+                 '--workers', str(args.workers), '--recipes', str(args.recipes),
+                 '--requests', str(args.requests)] + (['--views'] if args.views else []),
+                cwd=directory, env=env, check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            usage = result['workers']
+
+            def average(field):
+                return sum(u[field] for u in usage) / len(usage) / 1024
+
+            print(f"{mode:<16}{average('uss'):>10.1f}{average('pss'):>10.1f}{average('rss'):>10.1f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""Набор бенчмарков на синтетическом каталоге разного размера
+
+    python benchmarks/run.py --sizes 1k,100k,1m --output results.json
+    python benchmarks/run.py --sizes 1k,100k --baseline benchmarks/baseline.json [--threshold 0.2]
+
+Для каждого размера каталог генерируется data_generator.py во временном
+каталоге, и замеры идут в отдельном процессе с чистым интерпретатором
+(приложение загружает данные при импорте). Замеряются:
+    load.*, save.*      - чтение и запись recipes.json, построение DataStore
+    search[...]         - search_recipes для всех сочетаний фильтров
+    popular, stats      - get_popular_recipes и get_current_stats
+    page[...]           - отрисовка /, /recipes и /admin (кэш страниц очищается)
+    page-cold[...]      - то же, но очищается и кэш фрагментов шаблонов
+    login               - POST /login администратором
+    compress[...]       - сжатие тел страниц, ответа API и выгрузки уровнями gzip 1/6/9
+                          и deflate 6; в результатах еще bytes, compressed_bytes, ratio
+    page-gzip[...]      - /recipes с Accept-Encoding: gzip без кэша страниц (отрисовка
+                          и сжатие), page-gzip-cached - из кэша страниц вместе со сжатым
+                          вариантом; page-cached - из кэша без сжатия для сравнения
+
+Каждый замер повторяется, пока не истечет --budget секунд (не меньше 3 раз);
+в результатах медиана, среднее, минимум в мс и число повторов. С --baseline
+медианы сравниваются с сохраненным файлом результатов, и при замедлении
+больше --threshold скрипт завершается с кодом 1.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Значения фильтров поиска; все встречаются в сгенерированном каталоге
+SEARCH_FILTERS = {
+    'title': 'суп',
+    'ingredients': 'Яйца, Сыр',
+    'category': 'Десерт',
+    'difficulty': 'Средняя',
+    'max_time': 30,
+}
+
+MIN_RUNS = 3
+
+# (кодировка, уровень) для замеров compress[...]
+COMPRESSION_LEVELS = (('gzip', 1), ('gzip', 6), ('gzip', 9), ('deflate', 6))
+
+
+def parse_size(text):
+    """'1k' -> 1000, '1m' -> 1000000"""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def measure(fn, budget):
+    """Время вызовов fn в мс: повторы, пока не истечет budget секунд"""
+    timings = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < MIN_RUNS or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'runs': len(timings),
+    }
+
+
+def search_cases():
+    """Все сочетания фильтров; с ингредиентами - в обоих режимах (any, all)"""
+    names = list(SEARCH_FILTERS)
+    for n in range(len(names) + 1):
+        for combination in itertools.combinations(names, n):
+            params = {name: SEARCH_FILTERS[name] for name in combination}
+            modes = ('any', 'all') if 'ingredients' in params else (None,)
+            for mode in modes:
+                case = dict(params, mode=mode) if mode else params
+                label = ','.join(f'{k}={v}' if k == 'mode' else k for k, v in case.items())
+                yield f'search[{label or "-"}]', case
+
+
+def run_size(budget, only):
+    """Выполняется в отдельном процессе в каталоге с данными; печатает результаты в JSON"""
+    results = {}
+
+    def bench(name, fn):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            return
+        results[name] = measure(fn, budget)
+
+    import compression
+    import data_manager
+    from import_export import iter_export
+    from store import DataStore
+
+    recipes = data_manager.load_recipes()
+    users = data_manager.load_users()
+    bench('load.recipes_json', data_manager.load_recipes)
+    bench('load.store', lambda: DataStore(recipes, users))
+    bench('save.recipes_json', lambda: data_manager.save_recipes(recipes))
+
+    # Вывод приложения при старте не нужен
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        import app as app_module
+    results['startup.app_import'] = {'median_ms': round((time.perf_counter() - started) * 1000, 3), 'runs': 1}
+    app = app_module.app
+    handler = app_module.jsonrpc_handler
+
+    with app.test_request_context():
+        for name, params in search_cases():
+            bench(name, lambda params=params: handler.search_recipes(**params))
+        bench('popular', handler.get_popular_recipes)
+        bench('stats', app_module.get_current_stats)
+
+    client = app.test_client()
+    pages = max(1, len(recipes) // app.config.get('RECIPES_PER_PAGE', 12))
+
+    def page(path, client=client, cold=False):
+        def render():
+            app_module.page_cache.clear()
+            if cold:
+                app.jinja_env.fragment_cache.clear()
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.status_code)
+        return render
+
+    bench('page[/]', page('/'))
+    bench('page[/recipes]', page('/recipes'))
+    bench('page[/recipes?page=last]', page(f'/recipes?page={pages}'))
+    bench('page-cold[/]', page('/', cold=True))
+    bench('page-cold[/recipes]', page('/recipes', cold=True))
+    admin = app.test_client()
+    with admin.session_transaction() as session:
+        session.update(user_id=1, username='admin', is_admin=True)
+    bench('page[/admin]', page('/admin', admin))
+
+    def login():
+        response = app.test_client().post('/login', data={'username': 'admin', 'password': 'admin123'})
+        assert response.status_code == 302, response.status_code
+    bench('login', login)
+
+    # Сжатие: процессорное время против размера ответа
+    payloads = {
+        '/recipes': client.get('/recipes').data,
+        '/admin': admin.get('/admin').data,
+        'api.search': client.get('/api?method=search_recipes&params={}').data,
+        'export.ndjson[1000]': b''.join(iter_export(app_module.store.recipes[:1000], 'ndjson')),
+    }
+    for payload, data in payloads.items():
+        for encoding, level in COMPRESSION_LEVELS:
+            name = f'compress[{payload},{encoding}-{level}]'
+            bench(name, lambda data=data, encoding=encoding, level=level:
+                  compression.compress(data, encoding, level))
+            if name in results:
+                size = len(compression.compress(data, encoding, level))
+                results[name].update(bytes=len(data), compressed_bytes=size,
+                                     ratio=round(size / len(data), 4))
+
+    def cached_page(path, encoding=None, cached=True):
+        headers = {'Accept-Encoding': encoding} if encoding else {}
+        def render():
+            if not cached:
+                app_module.page_cache.clear()
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200, (path, response.status_code)
+            assert response.content_encoding == encoding, response.content_encoding
+        return render
+
+    bench('page-gzip[/recipes]', cached_page('/recipes', 'gzip', cached=False))
+    bench('page-gzip-cached[/recipes]', cached_page('/recipes', 'gzip'))
+    bench('page-cached[/recipes]', cached_page('/recipes'))
+
+    print(json.dumps(results))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Таблица сравнения медиан; возвращает число замедлений больше threshold"""
+    regressions = 0
+    print(f"\n{'размер':<10}{'замер':<64}{'база, мс':>12}{'сейчас, мс':>12}{'изм.':>9}")
+    for size, cases in results['sizes'].items():
+        base_cases = baseline.get('sizes', {}).get(size)
+        if not base_cases:
+            continue
+        for name, stats in cases.items():
+            base = base_cases.get(name)
+            if not base or stats.get('runs', 0) < MIN_RUNS or not base['median_ms']:
+                continue
+            change = stats['median_ms'] / base['median_ms'] - 1
+            mark = ''
+            if change > threshold:
+                regressions += 1
+                mark = ' !'
+            print(f"{size:<10}{name:<64}{base['median_ms']:>12.2f}{stats['median_ms']:>12.2f}"
+                  f"{change:>+8.0%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1k,100k', help='размеры каталога через запятую: 1k,100k,1m')
+    parser.add_argument('--users', type=int, default=1000, help='пользователей в каталоге')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=1.0, help='секунд на один замер')
+    parser.add_argument('--only', default='', help='префиксы замеров через запятую: search,page')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--baseline', help='файл с результатами для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.2, help='допустимое замедление медианы')
+    parser.add_argument('--run-size', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    only = [prefix for prefix in args.only.split(',') if prefix]
+
+    if args.run_size:
+        run_size(args.budget, only)
+        return
+
+    results = {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'users': args.users,
+            'budget': args.budget,
+        },
+        'sizes': {},
+    }
+    # Сэмплер профилировщика добавляет шум в замеры
+    env = dict(os.environ, PYTHONPATH=ROOT, PROFILE_SAMPLE_INTERVAL='0')
+    import data_generator
+
+    for label in args.sizes.split(','):
+        count = parse_size(label)
+        directory = tempfile.mkdtemp(prefix='benchmark-')
+        try:
+            print(f'Рецептов: {count}, пользователей: {args.users}...', flush=True)
+            data_generator.write_catalog(os.path.join(directory, 'data'), count, args.users, args.seed)
+            command = [sys.executable, os.path.abspath(__file__), '--run-size',
+                       '--budget', str(args.budget), '--only', args.only]
+            output = subprocess.run(command, cwd=directory, env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            cases = json.loads(output.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        results['sizes'][label.strip()] = cases
+        for name, stats in cases.items():
+            ratio = f"  {stats['compressed_bytes']} из {stats['bytes']} байт ({stats['ratio']:.1%})" \
+                if 'ratio' in stats else ''
+            print(f"  {name:<64}{stats['median_ms']:>12.2f} мс  (x{stats['runs']}){ratio}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'\nЗамедлений больше {args.threshold:.0%}: {regressions}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
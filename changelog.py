@@ -0,0 +1,101 @@
+"""Журнал изменений рецептов в SQLite для инкрементальной синхронизации клиентов"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+
+RECORD_SECONDS = metrics.histogram('changelog_write_seconds', 'Длительность записи в журнал изменений')
+
+
+class ChangeLog:
+    """Журнал изменений с возрастающими номерами (seq)
+
+    На каждый рецепт хранится одна запись - последнее изменение: upsert с
+    содержимым рецепта или tombstone (delete). Новое изменение рецепта удаляет
+    его прежнюю запись и получает новый номер, поэтому клиент, прочитавший
+    журнал до номера cursor, получает все изменившиеся после него рецепты,
+    а объем журнала не превышает числа рецептов, когда-либо существовавших.
+    Просмотры изменениями не считаются и в содержимое не входят.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        self._inherited = []
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS changes ('
+                ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+                ' recipe_id INTEGER NOT NULL UNIQUE,'
+                ' op TEXT NOT NULL,'
+                ' payload TEXT,'
+                ' changed_at REAL NOT NULL)'
+            )
+
+    def after_fork(self):
+        """Воркер открывает свое соединение (см. SqliteSessionStore.after_fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._inherited.append(conn)
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            self._local.conn = conn
+        return conn
+
+    def attach(self, store):
+        """Подключает журнал к хранилищу; пустой журнал заполняется текущим каталогом"""
+        self.seed(store.recipes)
+        store.change_listeners.append(self.record)
+
+    def seed(self, recipes):
+        """Начальные upsert всех рецептов, если журнал пуст"""
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute('SELECT 1 FROM changes LIMIT 1').fetchone() is None:
+                now = time.time()
+                conn.executemany(
+                    'INSERT OR IGNORE INTO changes (recipe_id, op, payload, changed_at) VALUES (?, ?, ?, ?)',
+                    ((r['id'], 'upsert', _payload(r), now) for r in recipes)
+                )
+
+    def record(self, changes):
+        """Записывает изменения одного блока store.write() одной транзакцией.
+        changes - [('upsert' | 'delete', recipe)]"""
+        if not changes:
+            return
+        now = time.time()
+        with RECORD_SECONDS.time(), self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO changes (recipe_id, op, payload, changed_at) VALUES (?, ?, ?, ?)',
+                ((recipe['id'], op, _payload(recipe) if op == 'upsert' else None, now)
+                 for op, recipe in changes)
+            )
+
+    def since(self, cursor, limit):
+        """Изменения с номером больше cursor по возрастанию номера: (записи, есть ли еще)"""
+        rows = self._connect().execute(
+            'SELECT seq, recipe_id, op, payload FROM changes WHERE seq > ? ORDER BY seq LIMIT ?',
+            (cursor, limit + 1)
+        ).fetchall()
+        return rows[:limit], len(rows) > limit
+
+    def last_seq(self):
+        row = self._connect().execute('SELECT MAX(seq) FROM changes').fetchone()
+        return row[0] or 0
+
+
+def _payload(recipe):
+    return json.dumps({k: v for k, v in recipe.items() if k != 'views'}, ensure_ascii=False)
@@ -0,0 +1,141 @@
+"""Сжатие ответов gzip/deflate по Accept-Encoding
+
+Сжимаются текстовые ответы (COMPRESS_MIMETYPES) от COMPRESS_MIN_SIZE байт:
+на меньших заголовки и служебные байты gzip съедают выигрыш. Не сжимаются
+ответы, у которых уже есть Content-Encoding (собранные статические файлы
+assets.py), файлы send_file и server-sent events (сжатие задержало бы события).
+Потоковые ответы (выгрузка каталога) сжимаются по мере выдачи частей, без
+сборки тела в памяти; их размер заранее неизвестен, поэтому порог к ним
+не применяется.
+
+Чтобы не сжимать одно и то же тело при каждом запросе, обработчик может
+положить в g.compressed_variants хранилище вариантов ({кодировка: bytes},
+методы get и []) из кэша, где уже лежит само тело: запись кэша страниц или
+ответ GET /api по ETag в кэше JSON-фрагментов. Вариант живет и сбрасывается
+вместе с исходным телом.
+
+ETag сжатого ответа становится слабым (W/"..."): варианты отличаются байтами,
+но не смыслом, а If-None-Match сравнивается слабо, поэтому 304 работают
+для любого из них.
+"""
+import time
+import zlib
+
+from flask import g, request
+
+import metrics
+
+# wbits: 31 - формат gzip, 15 - zlib (HTTP deflate)
+WBITS = {'gzip': 31, 'deflate': 15}
+
+COMPRESSION_BYTES = metrics.counter(
+    'http_compression_bytes_total', 'Байт ответов до (in) и после (out) сжатия', ['encoding', 'stage']
+)
+COMPRESSION_SECONDS = metrics.counter(
+    'http_compression_seconds_total', 'Процессорное время сжатия ответов', ['encoding']
+)
+COMPRESSION_VARIANTS = metrics.counter(
+    'http_compression_variants_total', 'Сжатые варианты из кэша (hit) и сжатые заново (miss)', ['outcome']
+)
+
+
+def negotiate(accept_encodings):
+    """gzip, deflate или None по заголовку Accept-Encoding (с учетом q)"""
+    return accept_encodings.best_match(WBITS)
+
+
+def compress(data, encoding, level=6):
+    """Сжатие тела целиком"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def iter_compressed(chunks, encoding, level=6):
+    """Сжатие потокового тела по частям; исходный итератор закрывается в конце"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            started = time.perf_counter()
+            data = compressor.compress(chunk)
+            COMPRESSION_SECONDS.inc(encoding, amount=time.perf_counter() - started)
+            COMPRESSION_BYTES.inc(encoding, 'in', amount=len(chunk))
+            if data:
+                COMPRESSION_BYTES.inc(encoding, 'out', amount=len(data))
+                yield data
+        data = compressor.flush()
+        COMPRESSION_BYTES.inc(encoding, 'out', amount=len(data))
+        yield data
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+class Compressor:
+    """after_request: сжимает подходящие ответы"""
+
+    def __init__(self, app):
+        self.level = app.config['COMPRESS_LEVEL']
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.mimetypes = frozenset(app.config['COMPRESS_MIMETYPES'])
+        if self.level:
+            app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in self.mimetypes):
+            return response
+
+        if response.is_streamed:
+            response.vary.add('Accept-Encoding')
+            encoding = negotiate(request.accept_encodings)
+            if encoding is not None:
+                response.response = iter_compressed(response.response, encoding, self.level)
+                response.headers.pop('Content-Length', None)
+                self._mark(response, encoding)
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+        compressed = self._variant(data, encoding)
+        COMPRESSION_BYTES.inc(encoding, 'in', amount=len(data))
+        COMPRESSION_BYTES.inc(encoding, 'out', amount=len(compressed))
+        response.set_data(compressed)
+        self._mark(response, encoding)
+        return response
+
+    def _variant(self, data, encoding):
+        """Сжатое тело из хранилища вариантов обработчика или сжатое сейчас"""
+        variants = g.get('compressed_variants')
+        if variants is not None:
+            compressed = variants.get(encoding)
+            if compressed is not None:
+                COMPRESSION_VARIANTS.inc('hit')
+                return compressed
+            COMPRESSION_VARIANTS.inc('miss')
+        started = time.perf_counter()
+        compressed = compress(data, encoding, self.level)
+        COMPRESSION_SECONDS.inc(encoding, amount=time.perf_counter() - started)
+        if variants is not None:
+            variants[encoding] = compressed
+        return compressed
+
+    @staticmethod
+    def _mark(response, encoding):
+        response.content_encoding = encoding
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+
+
+def init_app(app):
+    """Сжатие ответов (COMPRESS_LEVEL 0 - отключено)"""
+    return Compressor(app)
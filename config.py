@@ -11,7 +11,11 @@ class Config:
     STUDENT_GROUP = "ФБИ-33"
     
     # Настройки сессии
-    SESSION_TYPE = 'filesystem'
+    # 'memory' - LRU в памяти процесса, 'sqlite' - общее хранилище для нескольких воркеров,
+    # 'cookie' - стандартные подписанные cookie Flask
+    SESSION_TYPE = os.environ.get('SESSION_TYPE') or 'memory'
+    SESSION_MAX_ENTRIES = 10000
+    SESSION_SQLITE_PATH = os.path.join('instance', 'sessions.db')
     PERMANENT_SESSION_LIFETIME = 3600  # 1 час
     
     # Настройки валидации
@@ -20,6 +24,97 @@ class Config:
     MIN_PASSWORD_LENGTH = 6
     MAX_PASSWORD_LENGTH = 100
     
+    # JSON-RPC
+    JSONRPC_MAX_BATCH_SIZE = 20  # максимальное число вызовов в пакетном запросе
+    JSONRPC_BATCH_WORKERS = 4  # потоки для параллельного выполнения методов чтения
+    JSONRPC_MAX_BULK_ITEMS = 10000  # лимит элементов в add_recipes/update_recipes/delete_recipes
+    JSON_FRAGMENT_CACHE_BYTES = 64 * 1024 * 1024  # память под готовые JSON-фрагменты рецептов
+    
+    # HTTP-кэширование: Cache-Control по маршрутам (страницы зависят от пользователя,
+    # поэтому private; no-cache - браузер каждый раз перепроверяет ETag)
+    CACHE_CONTROL = {
+        'index': 'private, no-cache',
+        'all_recipes': 'private, no-cache',
+        'search_page': 'private, max-age=60',
+        'author_page': 'private, max-age=300',
+        'recipe_detail': 'private, no-cache',
+        'api': 'public, no-cache',
+    }
+    
+    # Кэш страниц для анонимных посетителей (0 - отключен)
+    PAGE_CACHE_MAX_ENTRIES = 1000
+    PAGE_CACHE_TTL = 60  # секунд; ограничивает отставание счетчика просмотров на страницах
+    # Каталог общего кэша страниц для нескольких процессов (None - только память)
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR')
+    
+    # Кэш фрагментов шаблонов {% cache %} (карточки рецептов, шапка, подвал)
+    TEMPLATE_FRAGMENT_CACHE_SIZE = 5000
+    # Скомпилированные шаблоны Jinja на диске (None - не сохранять)
+    JINJA_BYTECODE_CACHE_DIR = os.path.join('instance', 'jinja_cache')
+    # Прогрев шаблонов и кэшей при запуске процесса
+    TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP') == '1'
+    
+    # Статические файлы (assets.py): сборка в static/<ASSETS_DIR> с хешем в именах
+    ASSETS_DIR = 'dist'
+    ASSETS_AUTO_BUILD = os.environ.get('ASSETS_AUTO_BUILD', '1') == '1'  # собирать при запуске, если исходники изменились
+    ASSETS_MAX_AGE = 365 * 24 * 3600  # Cache-Control для собранных файлов (immutable)
+    
+    # Сжатие ответов (compression.py)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', '6'))  # 1-9, 0 - без сжатия
+    COMPRESS_MIN_SIZE = 1024  # байт; меньшие ответы не сжимаются
+    COMPRESS_MIMETYPES = ['text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+                          'application/json', 'application/x-ndjson', 'image/svg+xml']
+    
+    # Импорт рецептов из NDJSON/CSV
+    IMPORT_BATCH_SIZE = 1000  # записей в пакете проверки и добавления
+    IMPORT_WORKERS = 2  # процессы для проверки записей (0 - проверка в текущем процессе)
+    
+    # ASGI-режим (asgi.py): код Flask выполняется в пуле потоков, сетевой ввод-вывод - в цикле событий
+    ASGI_THREADS = 32
+    ASGI_STREAM_THREADS = 128  # чтение потоковых ответов (SSE, выгрузка); больше EVENTS_MAX_SUBSCRIBERS
+    ASGI_SPOOL_BYTES = 1024 * 1024  # тело запроса больше этого размера буферизуется на диске
+    
+    # Server-sent events (/api/events). Поток все время занимает соединение и поток
+    # сервера, поэтому включается только там, где их много: gunicorn с gthread
+    # (gunicorn.conf.py), asgi.py, сервер разработки. Иначе страницы опрашивают
+    # /api/current_stats раз в EVENTS_POLL_INTERVAL секунд
+    EVENTS_SSE = os.environ.get('EVENTS_SSE') == '1'
+    EVENTS_ANONYMOUS = os.environ.get('EVENTS_ANONYMOUS') == '1'  # живые счетчики и для гостей главной
+    EVENTS_POLL_INTERVAL = 60
+    EVENTS_BUFFER_SIZE = 1000  # последних событий для возобновления по Last-Event-ID
+    EVENTS_MAX_SUBSCRIBERS = int(os.environ.get('EVENTS_MAX_SUBSCRIBERS', '100'))  # подписчиков на процесс
+    EVENTS_HEARTBEAT = 15  # секунд между комментариями, поддерживающими соединение
+    
+    # Журнал изменений рецептов для get_changes_since (общий для всех воркеров)
+    CHANGELOG_PATH = os.path.join('instance', 'changes.db')
+    
+    # Метрики (/metrics). Каталог, через который воркеры складывают значения
+    # (gunicorn.conf.py задает его сам; None - только метрики текущего процесса)
+    METRICS_DIR = os.environ.get('METRICS_DIR') or None
+    METRICS_FLUSH_INTERVAL = 5  # секунд между выгрузками значений воркера
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Authorization: Bearer; без токена - только администратор
+    
+    # Профилирование запросов (админ-панель -> Профили)
+    PROFILE_DIR = os.path.join('instance', 'profiles')
+    PROFILE_KEEP = 50  # профилей на диске, старые удаляются
+    PROFILE_SLOW_MS = 1000  # запросы дольше сохраняются с профилем сэмплера
+    # Интервал сэмплера, секунд: 0.05 дает 20+ стеков на медленный запрос почти без
+    # нагрузки; 0.01 (100 Гц) - подробнее, но заметно дороже; 0 - без сэмплера
+    PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL', '0.05'))
+    
+    # Учет памяти (/admin/memory): снимков tracemalloc, хранимых в воркере
+    MEMORY_SNAPSHOTS = 5
+    
+    # Журналы (logs.py): JSON-строки в LOG_DIR, запись в фоновом потоке
+    LOG_DIR = os.environ.get('LOG_DIR') or os.path.join('instance', 'logs')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # размер файла, после которого он ротируется
+    LOG_BACKUP_COUNT = 5  # старых файлов на каждый журнал
+    LOG_QUEUE_SIZE = 10000  # записей в очереди; при переполнении новые отбрасываются
+    LOG_CONSOLE = True  # служебные сообщения еще и в stderr
+    LOG_ACCESS = True  # журнал запросов (логгер access)
+    LOG_VIEW_SAMPLE_RATE = 0.01  # доля просмотров рецептов, попадающих в аудит
+    
     # Константы для рецептов
     RECIPE_CATEGORIES = ['Завтрак', 'Обед', 'Ужин', 'Десерт', 'Закуска', 'Салат', 'Суп', 'Основное блюдо']
     RECIPE_DIFFICULTIES = ['Легкая', 'Средняя', 'Сложная']
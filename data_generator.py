@@ -0,0 +1,262 @@
+"""Детерминированный генератор синтетического каталога для бенчмарков и нагрузочных тестов
+
+    python data_generator.py --recipes 100000 --users 1000 --seed 1 --data-dir /tmp/catalog
+
+Одинаковые параметры дают одинаковые данные. Распределения приближены к
+настоящему сайту: категории и ингредиенты встречаются неравномерно (популярные
+чаще), время приготовления логнормальное, сложность зависит от времени,
+просмотры с тяжелым хвостом, у немногих авторов большая часть рецептов.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+RECIPE_CATEGORIES = ['Завтрак', 'Обед', 'Ужин', 'Десерт', 'Закуска', 'Салат', 'Суп', 'Основное блюдо']
+RECIPE_DIFFICULTIES = ['Легкая', 'Средняя', 'Сложная']
+
+# Доля категорий в каталоге
+CATEGORY_WEIGHTS = {
+    'Основное блюдо': 22, 'Ужин': 15, 'Обед': 14, 'Салат': 12,
+    'Десерт': 12, 'Суп': 10, 'Завтрак': 9, 'Закуска': 6,
+}
+
+DISHES = {
+    'Завтрак': ['Омлет', 'Сырники', 'Овсяная каша', 'Блины', 'Яичница', 'Гренки', 'Оладьи', 'Гранола'],
+    'Обед': ['Плов', 'Гуляш', 'Жаркое', 'Голубцы', 'Котлеты', 'Рагу', 'Тефтели', 'Перец фаршированный'],
+    'Ужин': ['Запеченная рыба', 'Курица в духовке', 'Паста карбонара', 'Ризотто', 'Стейк', 'Лазанья', 'Рататуй'],
+    'Десерт': ['Торт Наполеон', 'Чизкейк', 'Тирамису', 'Шарлотка', 'Панна-котта', 'Брауни', 'Медовик'],
+    'Закуска': ['Брускетта', 'Рулетики из баклажанов', 'Канапе', 'Паштет', 'Жульен', 'Хумус', 'Фаршированные яйца'],
+    'Салат': ['Салат Цезарь', 'Оливье', 'Винегрет', 'Греческий салат', 'Салат Мимоза', 'Салат из свеклы'],
+    'Суп': ['Борщ', 'Щи', 'Солянка', 'Куриный суп', 'Грибной суп', 'Уха', 'Рассольник', 'Крем-суп из тыквы'],
+    'Основное блюдо': ['Пельмени', 'Бефстроганов', 'Курица терияки', 'Свинина с овощами', 'Рыбные котлеты',
+                       'Пицца Маргарита', 'Макароны по-флотски', 'Треска в кляре'],
+}
+
+TITLE_SUFFIXES = ['', '', 'по-домашнему', 'по-деревенски', 'с травами', 'на скорую руку',
+                  'по рецепту шефа', 'по-итальянски', 'с сыром', 'праздничный вариант']
+
+# Ингредиенты по убыванию популярности: (название, единица, варианты количества)
+INGREDIENTS = [
+    ('Соль', '', ['по вкусу']), ('Перец черный', '', ['по вкусу']),
+    ('Масло растительное', 'ст.л.', [1, 2, 3]), ('Лук репчатый', 'шт', [1, 2]),
+    ('Яйца', 'шт', [1, 2, 3, 4]), ('Чеснок', 'зубчика', [2, 3, 4]),
+    ('Сахар', 'ст.л.', [1, 2, 3]), ('Мука', 'г', [100, 200, 300]),
+    ('Молоко', 'мл', [100, 200, 500]), ('Морковь', 'шт', [1, 2]),
+    ('Картофель', 'г', [300, 500, 800]), ('Масло сливочное', 'г', [30, 50, 100]),
+    ('Помидоры', 'шт', [2, 3, 4]), ('Сыр твердый', 'г', [50, 100, 150]),
+    ('Зелень', '', ['пучок', 'по вкусу']), ('Куриное филе', 'г', [300, 500]),
+    ('Сметана', 'г', [100, 200]), ('Говядина', 'г', [400, 600]),
+    ('Рис', 'г', [150, 200, 300]), ('Огурцы', 'шт', [1, 2, 3]),
+    ('Сливки', 'мл', [100, 200]), ('Свинина', 'г', [400, 500]),
+    ('Макароны', 'г', [250, 400]), ('Капуста', 'г', [300, 500]),
+    ('Перец болгарский', 'шт', [1, 2]), ('Грибы', 'г', [200, 300]),
+    ('Лимон', 'шт', [0.5, 1]), ('Мед', 'ст.л.', [1, 2]),
+    ('Творог', 'г', [200, 400]), ('Свекла', 'шт', [1, 2]),
+    ('Соевый соус', 'ст.л.', [2, 3]), ('Оливковое масло', 'ст.л.', [2, 3]),
+    ('Кефир', 'мл', [200, 500]), ('Разрыхлитель', 'ч.л.', [1, 2]),
+    ('Ванилин', 'г', [1, 2]), ('Какао', 'ст.л.', [2, 3]),
+    ('Шоколад', 'г', [100, 200]), ('Рыба белая', 'г', [400, 600]),
+    ('Лосось', 'г', [300, 400]), ('Креветки', 'г', [200, 300]),
+    ('Баклажаны', 'шт', [1, 2]), ('Кабачки', 'шт', [1, 2]),
+    ('Тыква', 'г', [400, 600]), ('Горошек зеленый', 'г', [150, 200]),
+    ('Фасоль', 'г', [200, 400]), ('Базилик', '', ['пучок']),
+    ('Моцарелла', 'г', [125, 250]), ('Пармезан', 'г', [50, 80]),
+    ('Орехи грецкие', 'г', [50, 100]), ('Изюм', 'г', [50, 100]),
+]
+
+STEPS = [
+    'Подготовьте и вымойте все ингредиенты', 'Нарежьте овощи небольшими кубиками',
+    'Разогрейте сковороду с маслом', 'Обжарьте лук до золотистого цвета',
+    'Смешайте сухие ингредиенты', 'Взбейте яйца с сахаром', 'Добавьте специи по вкусу',
+    'Тушите под крышкой на медленном огне', 'Выпекайте в разогретой духовке',
+    'Доведите до кипения и уменьшите огонь', 'Дайте блюду настояться',
+    'Украсьте свежей зеленью', 'Подавайте горячим',
+]
+
+DESCRIPTIONS = [
+    'Проверенный рецепт, который понравится всей семье',
+    'Готовится просто, а выглядит празднично',
+    'Любимое блюдо на каждый день',
+    'Сытно, вкусно и без лишних хлопот',
+    'Отличный вариант для выходных',
+    'Рецепт из старой семейной тетради',
+]
+
+USER_NAMES = ['anna', 'ivan', 'olga', 'petr', 'maria', 'sergey', 'elena', 'dmitry',
+              'irina', 'alexey', 'natalia', 'pavel', 'tatiana', 'nikolay', 'svetlana']
+
+# Начало периода дат создания, дней в периоде
+START_DATE = date(2022, 1, 1)
+DATE_SPAN = 1100
+
+
+def template_recipe(i, created_at):
+    """Рецепт-заглушка №i по шаблону (рецепты 11-100 начального каталога)"""
+    categories = RECIPE_CATEGORIES
+    difficulties = RECIPE_DIFFICULTIES
+    recipe_titles = [
+        f'Вкусный {categories[i % len(categories)]} номер {i}',
+        f'Домашний рецепт {categories[i % len(categories)]}а',
+        f'Авторский {categories[i % len(categories)]} от шеф-повара',
+        f'Быстрый {categories[i % len(categories)]} на скорую руку',
+        f'Праздничный {categories[i % len(categories)]}'
+    ]
+
+    return {
+        'id': i,
+        'title': recipe_titles[i % len(recipe_titles)],
+        'description': f'Замечательный рецепт {categories[i % len(categories)]}а, который понравится всей семье. Идеально подходит для {["завтрака", "обеда", "ужина", "десерта", "перекуса"][i % 5]}.',
+        'ingredients': [
+            f'{ing} - {amount}' for ing, amount in [
+                ('Мука', f'{i % 5 + 1} ст.л.'),
+                ('Яйца', f'{i % 3 + 1} шт'),
+                ('Молоко', f'{(i % 4 + 1) * 50} мл'),
+                ('Сахар', f'{i % 3 + 1} ст.л.'),
+                ('Соль', 'по вкусу'),
+                ('Масло', f'{i % 2 + 1} ст.л.'),
+                ('Специи', 'по вкусу')
+            ]
+        ],
+        'steps': '\n'.join([
+            f'Шаг {j+1}: {step}' for j, step in enumerate([
+                'Подготовьте все ингредиенты',
+                'Тщательно перемешайте основные компоненты',
+                'Добавьте специи по вкусу',
+                f'Готовьте в течение {i % 20 + 10} минут',
+                'Подавайте блюдо горячим',
+                'Украсьте свежей зеленью'
+            ][:i % 4 + 3])
+        ]),
+        'image_url': f'https://source.unsplash.com/300x200/?food,{categories[i % len(categories)].lower()}&sig={i}',
+        'cooking_time': i % 60 + 15,
+        'category': categories[i % len(categories)],
+        'difficulty': difficulties[i % len(difficulties)],
+        'author': 'admin',
+        'rating': 4.0 + (i % 10) / 10,
+        'views': i * 10,
+        'created_at': created_at
+    }
+
+
+def _zipf_cum_weights(count, exponent=1.1):
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def generate_users(count, seed=0, password='user123'):
+    """count пользователей: admin/admin123 и user/user123, как в начальных данных,
+    затем пользователи с общим паролем password (хеш вычисляется один раз)"""
+    rng = random.Random(f'users-{seed}')
+    shared_hash = generate_password_hash(password)
+    users = [
+        {'id': 1, 'username': 'admin', 'password_hash': generate_password_hash('admin123'),
+         'is_admin': True, 'email': 'admin@example.com', 'created_at': START_DATE.isoformat()},
+        {'id': 2, 'username': 'user', 'password_hash': shared_hash if password == 'user123'
+         else generate_password_hash('user123'),
+         'is_admin': False, 'email': 'user@example.com', 'created_at': START_DATE.isoformat()},
+    ][:count]
+    for user_id in range(3, count + 1):
+        username = f'{rng.choice(USER_NAMES)}_{user_id}'
+        users.append({
+            'id': user_id,
+            'username': username,
+            'password_hash': shared_hash,
+            'is_admin': rng.random() < 0.001,
+            'email': f'{username}@example.com',
+            'created_at': (START_DATE + timedelta(days=rng.randrange(DATE_SPAN))).isoformat(),
+        })
+    return users
+
+
+def iter_recipes(count, authors, seed=0, start_id=1):
+    """Рецепты start_id .. start_id + count - 1; authors - имена авторов по убыванию
+    активности (первые пишут больше всех)"""
+    rng = random.Random(f'recipes-{seed}')
+    categories = list(CATEGORY_WEIGHTS)
+    category_weights = list(itertools.accumulate(CATEGORY_WEIGHTS.values()))
+    ingredient_weights = _zipf_cum_weights(len(INGREDIENTS), 0.8)
+    author_weights = _zipf_cum_weights(len(authors))
+    dates = [(START_DATE + timedelta(days=d)).isoformat() for d in range(DATE_SPAN)]
+
+    for recipe_id in range(start_id, start_id + count):
+        category = rng.choices(categories, cum_weights=category_weights)[0]
+        title = rng.choice(DISHES[category])
+        suffix = rng.choice(TITLE_SUFFIXES)
+        if suffix:
+            title = f'{title} {suffix}'
+
+        # Без повторов: берем с запасом и отбрасываем совпадения
+        wanted = rng.randint(3, 12)
+        ingredients = []
+        seen = set()
+        for name, unit, amounts in rng.choices(INGREDIENTS, cum_weights=ingredient_weights, k=wanted * 2):
+            if name in seen:
+                continue
+            seen.add(name)
+            amount = rng.choice(amounts)
+            ingredients.append(f'{name} - {amount} {unit}'.rstrip())
+            if len(ingredients) == wanted:
+                break
+
+        cooking_time = max(5, min(300, int(rng.lognormvariate(3.4, 0.6)) // 5 * 5))
+        if cooking_time < 25:
+            difficulty = rng.choices(RECIPE_DIFFICULTIES, weights=(6, 3, 1))[0]
+        elif cooking_time < 60:
+            difficulty = rng.choices(RECIPE_DIFFICULTIES, weights=(3, 5, 2))[0]
+        else:
+            difficulty = rng.choices(RECIPE_DIFFICULTIES, weights=(1, 4, 5))[0]
+
+        # Шаги в естественном порядке: от подготовки к подаче
+        steps = [STEPS[n] for n in sorted(rng.sample(range(len(STEPS)), rng.randint(3, 8)))]
+        yield {
+            'id': recipe_id,
+            'title': title,
+            'description': rng.choice(DESCRIPTIONS),
+            'ingredients': ingredients,
+            'steps': '\n'.join(f'{n}. {step}' for n, step in enumerate(steps, 1)),
+            'image_url': f'https://source.unsplash.com/300x200/?food,{category.lower()}&sig={recipe_id}',
+            'cooking_time': cooking_time,
+            'category': category,
+            'difficulty': difficulty,
+            'author': rng.choices(authors, cum_weights=author_weights)[0],
+            'rating': round(max(1.0, min(5.0, rng.gauss(4.3, 0.4))), 1),
+            'views': min(1_000_000, int(rng.paretovariate(1.2) * 20)),
+            'created_at': rng.choice(dates),
+        }
+
+
+def generate_catalog(recipes_count, users_count, seed=0):
+    """(рецепты, пользователи) синтетического каталога"""
+    users = generate_users(max(users_count, 1), seed)
+    authors = [u['username'] for u in users]
+    return list(iter_recipes(recipes_count, authors, seed)), users
+
+
+def write_catalog(data_dir, recipes_count, users_count, seed=0):
+    """Записывает recipes.json и users.json в формате data_manager"""
+    recipes, users = generate_catalog(recipes_count, users_count, seed)
+    os.makedirs(data_dir, exist_ok=True)
+    for name, data in (('recipes.json', recipes), ('users.json', users)):
+        with open(os.path.join(data_dir, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default='data', help='каталог для recipes.json и users.json')
+    args = parser.parse_args()
+    started = datetime.now()
+    write_catalog(args.data_dir, args.recipes, args.users, args.seed)
+    print(f'Рецептов: {args.recipes}, пользователей: {args.users} -> {args.data_dir} '
+          f'({(datetime.now() - started).total_seconds():.1f} с)')
+
+
+if __name__ == '__main__':
+    main()
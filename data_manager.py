@@ -1,12 +1,19 @@
 import json
 import os
+import time
 from datetime import datetime
 from werkzeug.security import generate_password_hash
 
+import metrics
+from data_generator import template_recipe
+
 DATA_DIR = 'data'
 USERS_FILE = os.path.join(DATA_DIR, 'users.json')
 RECIPES_FILE = os.path.join(DATA_DIR, 'recipes.json')
 
+WRITE_SECONDS = metrics.histogram('data_file_write_seconds', 'Длительность записи файла данных', ['file'])
+WRITE_BYTES = metrics.counter('data_file_written_bytes_total', 'Записано байт в файлы данных', ['file'])
+
 def ensure_data_dir():
     """Создает директорию для данных если ее нет"""
     if not os.path.exists(DATA_DIR):
@@ -189,54 +196,8 @@ def get_initial_recipes():
     ]
     
     # Добавляем рецепты с 11 до 100
-    RECIPE_CATEGORIES = ['Завтрак', 'Обед', 'Ужин', 'Десерт', 'Закуска', 'Салат', 'Суп', 'Основное блюдо']
-    RECIPE_DIFFICULTIES = ['Легкая', 'Средняя', 'Сложная']
-    
-    for i in range(11, 101):
-        categories = RECIPE_CATEGORIES
-        difficulties = RECIPE_DIFFICULTIES
-        recipe_titles = [
-            f'Вкусный {categories[i % len(categories)]} номер {i}',
-            f'Домашний рецепт {categories[i % len(categories)]}а',
-            f'Авторский {categories[i % len(categories)]} от шеф-повара',
-            f'Быстрый {categories[i % len(categories)]} на скорую руку',
-            f'Праздничный {categories[i % len(categories)]}'
-        ]
-        
-        recipes.append({
-            'id': i,
-            'title': recipe_titles[i % len(recipe_titles)],
-            'description': f'Замечательный рецепт {categories[i % len(categories)]}а, который понравится всей семье. Идеально подходит для {["завтрака", "обеда", "ужина", "десерта", "перекуса"][i % 5]}.',
-            'ingredients': [
-                f'{ing} - {amount}' for ing, amount in [
-                    ('Мука', f'{i % 5 + 1} ст.л.'),
-                    ('Яйца', f'{i % 3 + 1} шт'),
-                    ('Молоко', f'{(i % 4 + 1) * 50} мл'),
-                    ('Сахар', f'{i % 3 + 1} ст.л.'),
-                    ('Соль', 'по вкусу'),
-                    ('Масло', f'{i % 2 + 1} ст.л.'),
-                    ('Специи', 'по вкусу')
-                ]
-            ],
-            'steps': '\n'.join([
-                f'Шаг {j+1}: {step}' for j, step in enumerate([
-                    'Подготовьте все ингредиенты',
-                    'Тщательно перемешайте основные компоненты',
-                    'Добавьте специи по вкусу',
-                    f'Готовьте в течение {i % 20 + 10} минут',
-                    'Подавайте блюдо горячим',
-                    'Украсьте свежей зеленью'
-                ][:i % 4 + 3])
-            ]),
-            'image_url': f'https://source.unsplash.com/300x200/?food,{categories[i % len(categories)].lower()}&sig={i}',
-            'cooking_time': i % 60 + 15,
-            'category': categories[i % len(categories)],
-            'difficulty': difficulties[i % len(difficulties)],
-            'author': 'admin',
-            'rating': 4.0 + (i % 10) / 10,
-            'views': i * 10,
-            'created_at': datetime.now().strftime('%Y-%m-%d')
-        })
+    created_at = datetime.now().strftime('%Y-%m-%d')
+    recipes.extend(template_recipe(i, created_at) for i in range(11, 101))
     
     return recipes
 
@@ -261,9 +222,7 @@ def load_users():
 
 def save_users(users):
     """Сохраняет пользователей в файл"""
-    ensure_data_dir()
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, ensure_ascii=False, indent=2)
+    _write_json(USERS_FILE, users)
 
 def load_recipes():
     """Загружает рецепты из файла"""
@@ -285,6 +244,17 @@ def load_recipes():
 
 def save_recipes(recipes):
     """Сохраняет рецепты в файл"""
+    _write_json(RECIPES_FILE, recipes)
+
+def _write_json(path, data):
+    """Запись через временный файл: читатели файла никогда не видят его наполовину записанным"""
     ensure_data_dir()
-    with open(RECIPES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(recipes, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+    started = time.perf_counter()
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        size = f.tell()
+    os.replace(tmp_path, path)
+    name = os.path.basename(path)
+    WRITE_SECONDS.observe(time.perf_counter() - started, name)
+    WRITE_BYTES.inc(name, amount=size)
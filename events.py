@@ -0,0 +1,192 @@
+"""Server-sent events: рассылка изменений статистики и каталога подписчикам процесса"""
+import json
+import os
+import threading
+from collections import deque
+
+
+class SubscribersLimitError(Exception):
+    """Достигнут предел подписчиков процесса"""
+
+
+class EventBroadcaster:
+    """Рассыльщик событий с кольцевым буфером последних событий
+
+    Идентификатор события - '<эпоха>-<номер>'. Эпоха своя у каждого процесса,
+    поэтому клиент, переподключившийся к другому воркеру или после перезапуска,
+    вместо повтора событий получает событие reset. Так же обрабатывается
+    Last-Event-ID, вытесненный из буфера.
+    """
+
+    def __init__(self, buffer_size=1000, max_subscribers=100, heartbeat=15):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self._reset_state()
+
+    def _reset_state(self):
+        self.epoch = os.urandom(4).hex()
+        self.subscribers = 0
+        self.published = 0
+        self._seq = 0
+        self._events = deque(maxlen=self.buffer_size)  # (номер, готовые байты события)
+        self._condition = threading.Condition()
+
+    def after_fork(self):
+        """Воркер начинает со своей эпохи и пустого буфера"""
+        self._reset_state()
+
+    def publish(self, event, data):
+        """Добавляет событие в буфер и будит подписчиков"""
+        with self._condition:
+            self._seq += 1
+            self.published += 1
+            payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+            message = f'id: {self.epoch}-{self._seq}\nevent: {event}\ndata: {payload}\n\n'
+            self._events.append((self._seq, message.encode('utf-8')))
+            self._condition.notify_all()
+
+    def stream(self, last_event_id=None, snapshot=None):
+        """Генератор байтов потока text/event-stream для одного подписчика.
+
+        snapshot() - текущее состояние (event, data), отправляется при подключении
+        без Last-Event-ID и после reset. Бросает SubscribersLimitError.
+        """
+        with self._condition:
+            if self.subscribers >= self.max_subscribers:
+                raise SubscribersLimitError()
+            self.subscribers += 1
+            cursor = self._resume_cursor(last_event_id)
+        cancelled = threading.Event()
+        generator = self._iter_stream(cursor, snapshot, initial=not last_event_id, cancelled=cancelled)
+        return _Stream(generator, self._unsubscribe, lambda: self._cancel(cancelled))
+
+    def _unsubscribe(self):
+        with self._condition:
+            self.subscribers -= 1
+
+    def _cancel(self, cancelled):
+        """Будит подписчика, ждущего событий, чтобы его поток завершился"""
+        with self._condition:
+            cancelled.set()
+            self._condition.notify_all()
+
+    def _resume_cursor(self, last_event_id):
+        """Номер последнего полученного клиентом события; None - нужен reset"""
+        if not last_event_id:
+            return self._seq
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        oldest = self._events[0][0] if self._events else self._seq + 1
+        if int(seq) + 1 < oldest:
+            return None
+        return int(seq)
+
+    def _iter_stream(self, cursor, snapshot, initial, cancelled):
+        yield f'retry: {self.heartbeat * 1000}\n\n'.encode('utf-8')
+        if cursor is None:
+            with self._condition:
+                cursor = self._seq
+            yield self._reset(snapshot)
+        elif initial and snapshot is not None:
+            yield self._direct(*snapshot())
+        while not cancelled.is_set():
+            with self._condition:
+                notified = True
+                if not self._events or self._events[-1][0] <= cursor:
+                    notified = self._condition.wait(self.heartbeat)
+                if cancelled.is_set():
+                    return
+                if self._events and self._events[0][0] > cursor + 1:
+                    # Подписчик отстал больше, чем на размер буфера
+                    pending = None
+                else:
+                    pending = [message for seq, message in self._events if seq > cursor]
+                cursor = self._seq
+            if pending is None:
+                yield self._reset(snapshot)
+            elif pending:
+                yield b''.join(pending)
+            elif not notified:
+                yield b': heartbeat\n\n'
+            # иначе разбужен отключением другого подписчика - ждать дальше
+
+    def _reset(self, snapshot):
+        """Клиент пропустил события: сообщить об этом и прислать текущее состояние"""
+        message = self._direct('reset', {'reason': 'history unavailable'})
+        if snapshot is not None:
+            message += self._direct(*snapshot())
+        return message
+
+    def _direct(self, event, data):
+        """Событие только для одного подписчика (без id: на него нельзя возобновиться)"""
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return f'event: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+class _Stream:
+    """Поток подписчика; место подписчика освобождается при close() от WSGI-сервера,
+    даже если поток не начали читать.
+
+    close() можно вызвать из другого потока, пока поток подписчика ждет событий:
+    ожидание прерывается, место освобождается сразу, а генератор, который еще
+    выполняется, бросает ValueError - его закрывают повторно после возврата next()
+    """
+
+    def __init__(self, generator, unsubscribe, cancel):
+        self._generator = generator
+        self._unsubscribe = unsubscribe
+        self._cancel = cancel
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._generator)
+
+    def close(self):
+        self._cancel()
+        unsubscribe, self._unsubscribe = self._unsubscribe, None
+        if unsubscribe is not None:
+            unsubscribe()
+        self._generator.close()
+
+
+def stats_delta(old, new):
+    """Изменившиеся значения статистики"""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def create_broadcaster(config, index):
+    """Рассыльщик, подписанный на изменения индекса: одно событие на изменение
+    вместо пересчета статистики в каждом запросе опроса"""
+    broadcaster = EventBroadcaster(
+        buffer_size=config.get('EVENTS_BUFFER_SIZE', 1000),
+        max_subscribers=config.get('EVENTS_MAX_SUBSCRIBERS', 100),
+        heartbeat=config.get('EVENTS_HEARTBEAT', 15),
+    )
+    last_stats = index.stats()
+    lock = threading.Lock()
+
+    def on_tag(tag):
+        nonlocal last_stats
+        if tag != 'stats':
+            return
+        with lock:
+            current = index.stats()
+            delta = stats_delta(last_stats, current)
+            last_stats = current
+        if delta:
+            broadcaster.publish('stats', delta)
+
+    def on_change(action, recipe):
+        if action == 'deleted':
+            data = {'id': recipe['id']}
+        else:
+            data = index.summaries.get(recipe['id']) or {'id': recipe['id']}
+        broadcaster.publish('recipe', {'action': action, 'recipe': data})
+
+    index.tag_listeners.append(on_tag)
+    index.change_listeners.append(on_change)
+    return broadcaster
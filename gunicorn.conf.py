@@ -0,0 +1,55 @@
+"""Настройки gunicorn: gunicorn -c gunicorn.conf.py wsgi:app
+
+Приложение загружается один раз в мастере (preload_app), после загрузки
+куча замораживается, воркеры получают данные и индексы через fork.
+
+Воркер всегда один, параллельность задается потоками (GUNICORN_THREADS).
+У каждого воркера было бы свое хранилище DataStore в памяти, и data/*.json
+целиком перезаписывал бы воркер, сохранявший последним, - изменения остальных
+терялись бы. Поэтому WEB_CONCURRENCY больше 1 - ошибка запуска.
+
+Сессии хранятся в SQLite (SESSION_TYPE=sqlite) и переживают перезапуск воркера.
+"""
+import os
+
+import metrics
+import prefork
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+if workers != 1:
+    raise RuntimeError(f'WEB_CONCURRENCY={workers}: каждый воркер перезаписывал бы data/*.json своими данными. '
+                       'Поддерживается один воркер, для параллельности увеличьте GUNICORN_THREADS')
+
+# gthread: соединения обслуживают потоки воркера, поэтому поток событий /api/events
+# занимает один поток, а не весь воркер. Подписчикам отдается не больше половины
+# потоков, остальные всегда свободны для запросов. С sync-воркерами (один запрос
+# на воркер) поток событий отключается, страницы опрашивают /api/current_stats
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '32'))
+if worker_class == 'gthread':
+    os.environ.setdefault('EVENTS_SSE', '1')
+    os.environ.setdefault('EVENTS_MAX_SUBSCRIBERS', str(threads // 2))
+elif worker_class in ('gevent', 'eventlet'):
+    os.environ.setdefault('EVENTS_SSE', '1')
+
+# Config читает SESSION_TYPE при загрузке приложения
+os.environ.setdefault('SESSION_TYPE', 'sqlite')
+
+# Загрузка данных в мастере вместо повторного разбора JSON в каждом воркере
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+
+if preload_app:
+    prefork.begin_preload()
+
+# Воркеры складывают метрики в общий каталог, /metrics суммирует их;
+# значения прошлого запуска удаляются до загрузки приложения
+metrics_dir = os.environ.setdefault('METRICS_DIR', os.path.join('instance', 'metrics'))
+metrics.clear_directory(metrics_dir)
+
+
+def when_ready(server):
+    # Вызывается в мастере после загрузки приложения, до запуска воркеров
+    if preload_app:
+        frozen = prefork.freeze_heap()
+        server.log.info('Куча мастера заморожена: %d объектов', frozen)
@@ -0,0 +1,40 @@
+"""HTTP-кэширование: валидаторы ETag/Last-Modified и политики Cache-Control"""
+import hashlib
+
+from flask import current_app, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+
+def make_etag(*parts):
+    """ETag из частей ключа (поколение данных, версия рецепта и т.п.)"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:24]
+
+
+def page_etag(*parts):
+    """ETag HTML-страницы: маршрут, параметры запроса, пользователь и данные.
+    None - страницу кэшировать нельзя (в сессии ждут показа flash-сообщения)"""
+    if '_flashes' in session:
+        return None
+    return make_etag(request.endpoint, request.query_string, session.get('user_id'), *parts)
+
+
+def apply_validators(response, etag, last_modified=None, weak=False, policy=None):
+    """Добавляет к ответу ETag, Last-Modified и Cache-Control маршрута"""
+    response = make_response(response)
+    if etag is not None:
+        response.set_etag(etag, weak=weak)
+        if last_modified is not None:
+            response.last_modified = last_modified
+    if policy is not None:
+        response.headers['Cache-Control'] = current_app.config['CACHE_CONTROL'][policy]
+    return response
+
+
+def not_modified(etag, last_modified=None, weak=False, policy=None):
+    """Ответ 304, если копия клиента актуальна (проверяется до формирования ответа)"""
+    if etag is None:
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    response = current_app.response_class(status=304)
+    return apply_validators(response, etag, last_modified, weak, policy)
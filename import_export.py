@@ -0,0 +1,195 @@
+"""Потоковый экспорт и импорт каталога рецептов (NDJSON и CSV)"""
+import csv
+import io
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from auth import validate_recipe_data
+from prefork import helper_processes
+
+FORMATS = ('ndjson', 'csv')
+
+MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Поля рецепта в файлах экспорта (порядок колонок CSV)
+EXPORT_FIELDS = (
+    'id', 'title', 'description', 'ingredients', 'steps', 'image_url',
+    'cooking_time', 'category', 'difficulty', 'author', 'rating', 'views', 'created_at',
+)
+
+# Размер порции данных, отдаваемой клиенту при экспорте
+CHUNK_SIZE = 64 * 1024
+
+# Сколько ошибок возвращать в отчете об импорте
+MAX_REPORTED_ERRORS = 100
+
+
+def guess_format(filename=None, mimetype=None):
+    """Формат файла по расширению или MIME-типу (None - не удалось определить)"""
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension in ('ndjson', 'jsonl'):
+            return 'ndjson'
+        if extension == 'csv':
+            return 'csv'
+    if mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return 'ndjson'
+    if mimetype in ('text/csv', 'application/csv'):
+        return 'csv'
+    return None
+
+
+# ========== Экспорт ==========
+
+def iter_export(recipes, fmt):
+    """Генератор порций экспорта; память не зависит от размера каталога"""
+    lines = _iter_ndjson_lines(recipes) if fmt == 'ndjson' else _iter_csv_lines(recipes)
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def _iter_ndjson_lines(recipes):
+    for recipe in recipes:
+        record = {field: recipe.get(field) for field in EXPORT_FIELDS}
+        yield json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _iter_csv_lines(recipes):
+    out = io.StringIO()
+    writer = csv.writer(out)
+
+    def flush():
+        line = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        return line
+
+    writer.writerow(EXPORT_FIELDS)
+    yield flush()
+    for recipe in recipes:
+        row = [recipe.get(field) for field in EXPORT_FIELDS]
+        # Ингредиенты в CSV - по одному на строку внутри ячейки
+        row[3] = '\n'.join(row[3] or [])
+        writer.writerow(row)
+        yield flush()
+
+
+# ========== Импорт ==========
+
+def iter_records(stream, fmt):
+    """Построчный разбор загружаемого файла: (номер строки, запись или текст ошибки)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'ndjson':
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, f'Некорректный JSON: {e}'
+                continue
+            if not isinstance(record, dict):
+                yield line_no, 'Ожидается объект рецепта'
+                continue
+            yield line_no, record
+    else:
+        reader = csv.DictReader(text)
+        for record in reader:
+            # Номер последней строки записи (с учетом переносов внутри ячеек)
+            yield reader.line_num, record
+
+
+def prepare_record(record, defaults):
+    """Параметры для validate_recipe_data и дополнительные поля записи"""
+    params = {}
+    for field, default in defaults.items():
+        value = record.get(field)
+        params[field] = default if value in (None, '') else value
+    if record.get('rating') not in (None, ''):
+        params['rating'] = record['rating']
+
+    extras = {}
+    author = record.get('author')
+    if isinstance(author, str) and 0 < len(author.strip()) <= 50:
+        extras['author'] = author.strip()
+    try:
+        views = int(record.get('views') or 0)
+        if views > 0:
+            extras['views'] = views
+    except (ValueError, TypeError):
+        pass
+    created_at = record.get('created_at')
+    if isinstance(created_at, str) and created_at.strip():
+        extras['created_at'] = created_at.strip()[:19]
+    return params, extras
+
+
+def validate_batch(batch, defaults):
+    """Проверка пакета записей (выполняется в процессах пула):
+    [(номер строки, params, extras, errors)]"""
+    results = []
+    for line_no, record in batch:
+        if isinstance(record, str):
+            results.append((line_no, None, None, {'record': record}))
+            continue
+        params, extras = prepare_record(record, defaults)
+        errors = validate_recipe_data(params, is_update=False)
+        results.append((line_no, params, extras, errors or None))
+    return results
+
+
+def import_records(records, commit, defaults, batch_size=1000, workers=0):
+    """Импорт потока записей: проверка в пуле процессов, применение пакетами по порядку.
+
+    commit(items) получает список (params, extras) прошедших проверку записей пакета.
+    Вперед читается не больше workers * 2 пакетов, поэтому память ограничена.
+    """
+    report = {'imported': 0, 'rejected': 0, 'errors': []}
+    records = iter(records)
+    batches = iter(lambda: list(islice(records, batch_size)), [])
+    check = partial(validate_batch, defaults=defaults)
+
+    def apply(results):
+        valid = []
+        for line_no, params, extras, errors in results:
+            if errors:
+                report['rejected'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'line': line_no, 'errors': errors})
+            else:
+                valid.append((params, extras))
+        if valid:
+            commit(valid)
+            report['imported'] += len(valid)
+
+    if workers <= 0:
+        for batch in batches:
+            apply(check(batch))
+        return report
+
+    # Процессы пула создаются при submit в этом потоке; обработчики after_fork
+    # (потоки метрик, журнала, профилировщика) в них не запускаются
+    with helper_processes(), ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(check, batch))
+            if len(pending) >= workers * 2:
+                apply(pending.popleft().result())
+        while pending:
+            apply(pending.popleft().result())
+    return report
@@ -0,0 +1,296 @@
+import bisect
+import heapq
+from collections import Counter
+from datetime import datetime, timezone
+
+from projections import make_recipe_summary
+
+# Верхняя граница для поиска по префиксу в отсортированном списке строк
+_PREFIX_END = chr(0x10FFFF)
+
+
+def _popularity(recipe):
+    # Больше просмотров - выше; при равенстве раньше идет рецепт с меньшим id
+    return (recipe.get('views', 0), -recipe['id'])
+
+
+class CatalogIndex:
+    """Индексы по рецептам и пользователям, обновляемые при каждом изменении данных"""
+
+    # Сколько самых просматриваемых рецептов отслеживается постоянно
+    POPULAR_SIZE = 12
+
+    def __init__(self, recipes, users):
+        # Обработчики изменений рецептов: callback(recipe_id)
+        self.recipe_listeners = []
+        # Обработчики изменений каталога: callback('created' | 'updated' | 'deleted', recipe)
+        self.change_listeners = []
+        # Обработчики изменения общих данных страниц: callback('stats' | 'popular')
+        self.tag_listeners = []
+        self._version_seq = 0
+        # Поколение данных меняется при любом изменении рецептов и пользователей,
+        # поколение просмотров - при каждом просмотре; используются в ETag
+        self.generation = 0
+        self.views_generation = 0
+        self.popular_version = 0
+        self.stats_version = 0
+        self.rebuild(recipes, users)
+
+    def rebuild(self, recipes, users):
+        """Полностью перестраивает индексы"""
+        # id рецепта -> рецепт и версия его содержимого (меняется при каждом изменении,
+        # кроме счетчика просмотров)
+        self.recipes_by_id = {r['id']: r for r in recipes}
+        self.versions = {r['id']: self._next_version() for r in recipes}
+
+        # автор -> количество рецептов
+        self.author_counts = Counter(r.get('author') for r in recipes)
+
+        # Общая статистика сайта (показывается на всех страницах)
+        # и отсортированные id рецептов с некорректным временем приготовления (<= 0)
+        self._stat_entries = {}
+        self.invalid_ids = []
+        self.total_cooking_time = 0
+        self.category_counts = Counter()
+        self.difficulty_counts = Counter()
+        for r in recipes:
+            self._stats_add(r)
+
+        # id рецепта -> заранее вычисленная карточка (проекция summary)
+        self.summaries = {r['id']: make_recipe_summary(r) for r in recipes}
+
+        # Отсортированные ключи (username в нижнем регистре, id) для поиска по префиксу
+        # и постраничного вывода по курсору; администраторы и остальные пользователи
+        # дополнительно в отдельных списках, чтобы фильтр по роли не пропускал записи
+        self.users_by_id = {u['id']: u for u in users}
+        self.usernames = sorted(self._user_key(u) for u in users)
+        self.admin_usernames = sorted(self._user_key(u) for u in users if u.get('is_admin', False))
+        self.regular_usernames = sorted(self._user_key(u) for u in users if not u.get('is_admin', False))
+
+        # id самых просматриваемых рецептов по убыванию популярности
+        self.popular_ids = [r['id'] for r in heapq.nlargest(self.POPULAR_SIZE, recipes, key=_popularity)]
+        self.popular_version += 1
+        self._stats_signature = self._current_stats_signature()
+        self.stats_version += 1
+        self._touch()
+
+    @staticmethod
+    def _user_key(user):
+        return (user['username'].lower(), user['id'])
+
+    def _next_version(self):
+        self._version_seq += 1
+        return self._version_seq
+
+    def _touch(self):
+        self.generation += 1
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def _recipe_changed(self, action, recipe):
+        self._touch()
+        for listener in self.recipe_listeners:
+            listener(recipe.get('id'))
+        self._check_stats()
+        for listener in self.change_listeners:
+            listener(action, recipe)
+
+    def _notify(self, tag):
+        for listener in self.tag_listeners:
+            listener(tag)
+
+    def _stats_add(self, recipe):
+        entry = (recipe.get('cooking_time', 0), recipe['category'], recipe['difficulty'])
+        self._stat_entries[recipe['id']] = entry
+        if entry[0] <= 0:
+            bisect.insort(self.invalid_ids, recipe['id'])
+        self.total_cooking_time += entry[0]
+        self.category_counts[entry[1]] += 1
+        self.difficulty_counts[entry[2]] += 1
+
+    def _stats_remove(self, recipe_id):
+        entry = self._stat_entries.pop(recipe_id, None)
+        if entry is None:
+            return
+        if entry[0] <= 0:
+            i = bisect.bisect_left(self.invalid_ids, recipe_id)
+            if i < len(self.invalid_ids) and self.invalid_ids[i] == recipe_id:
+                del self.invalid_ids[i]
+        self.total_cooking_time -= entry[0]
+        for counts, key in ((self.category_counts, entry[1]), (self.difficulty_counts, entry[2])):
+            counts[key] -= 1
+            if counts[key] <= 0:
+                del counts[key]
+
+    def _current_stats_signature(self):
+        return (len(self._stat_entries), len(self.users_by_id), self.total_cooking_time,
+                tuple(sorted(self.category_counts)), tuple(sorted(self.difficulty_counts)))
+
+    def _check_stats(self):
+        """Меняет версию статистики, если изменились показываемые значения"""
+        signature = self._current_stats_signature()
+        if signature != self._stats_signature:
+            self._stats_signature = signature
+            self.stats_version += 1
+            self._notify('stats')
+
+    def stats(self):
+        """Статистика для шаблонов за O(1)"""
+        return {
+            'recipes_count': len(self._stat_entries),
+            'users_count': len(self.users_by_id),
+            'total_cooking_time': self.total_cooking_time,
+            'categories_count': len(self.category_counts),
+        }
+
+    def _consider_popular(self, recipe):
+        """Обновляет список популярных после изменения просмотров рецепта"""
+        popular = self.popular_ids
+        if (recipe['id'] not in popular and len(popular) >= self.POPULAR_SIZE
+                and _popularity(recipe) < _popularity(self.recipes_by_id[popular[-1]])):
+            return
+        candidates = set(popular)
+        candidates.add(recipe['id'])
+        ranked = sorted(candidates, key=lambda rid: _popularity(self.recipes_by_id[rid]), reverse=True)
+        ranked = ranked[:self.POPULAR_SIZE]
+        if ranked != popular:
+            self.popular_ids = ranked
+            self.popular_version += 1
+            self._notify('popular')
+
+    # ========== Рецепты ==========
+
+    def recipe_added(self, recipe):
+        self.recipes_by_id[recipe['id']] = recipe
+        self.versions[recipe['id']] = self._next_version()
+        self.author_counts[recipe.get('author')] += 1
+        self.summaries[recipe['id']] = make_recipe_summary(recipe)
+        self._stats_add(recipe)
+        self._consider_popular(recipe)
+        self._recipe_changed('created', recipe)
+
+    def recipe_removed(self, recipe):
+        self.recipes_by_id.pop(recipe.get('id'), None)
+        self.versions.pop(recipe.get('id'), None)
+        self.summaries.pop(recipe.get('id'), None)
+        self._stats_remove(recipe.get('id'))
+        if recipe.get('id') in self.popular_ids:
+            self.popular_ids = [r['id'] for r in heapq.nlargest(
+                self.POPULAR_SIZE, self.recipes_by_id.values(), key=_popularity)]
+            self.popular_version += 1
+            self._notify('popular')
+        author = recipe.get('author')
+        self.author_counts[author] -= 1
+        if self.author_counts[author] <= 0:
+            del self.author_counts[author]
+        self._recipe_changed('deleted', recipe)
+
+    def recipe_updated(self, recipe, old_author=None):
+        if old_author is not None and old_author != recipe.get('author'):
+            self.author_counts[old_author] -= 1
+            if self.author_counts[old_author] <= 0:
+                del self.author_counts[old_author]
+            self.author_counts[recipe.get('author')] += 1
+        self.recipes_by_id[recipe['id']] = recipe
+        self.versions[recipe['id']] = self._next_version()
+        self.summaries[recipe['id']] = make_recipe_summary(recipe)
+        self._stats_remove(recipe['id'])
+        self._stats_add(recipe)
+        self._recipe_changed('updated', recipe)
+
+    def recipe_viewed(self, recipe):
+        """Учитывает просмотр рецепта (версия рецепта при этом не меняется)"""
+        self.views_generation += 1
+        if recipe.get('id') in self.recipes_by_id:
+            self._consider_popular(recipe)
+
+    def popular_recipes(self, count):
+        """Самые просматриваемые рецепты (count <= POPULAR_SIZE)"""
+        recipes = map(self.recipes_by_id.get, self.popular_ids[:count])
+        return [r for r in recipes if r is not None]
+
+    def invalid_recipes(self, offset=0, limit=None):
+        """Рецепты с некорректным временем приготовления по возрастанию id"""
+        end = None if limit is None else offset + limit
+        recipes = map(self.recipes_by_id.get, self.invalid_ids[offset:end])
+        return [r for r in recipes if r is not None]
+
+    def recipes_count(self, username):
+        """Количество рецептов автора за O(1)"""
+        return self.author_counts.get(username, 0)
+
+    # ========== Пользователи ==========
+
+    def user_added(self, user):
+        self._touch()
+        self.users_by_id[user['id']] = user
+        bisect.insort(self.usernames, self._user_key(user))
+        bisect.insort(self._role_usernames(user), self._user_key(user))
+        self._check_stats()
+
+    def user_removed(self, user):
+        self._touch()
+        self.users_by_id.pop(user['id'], None)
+        key = self._user_key(user)
+        for keys in (self.usernames, self.admin_usernames, self.regular_usernames):
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+        self._check_stats()
+
+    def user_updated(self, user):
+        """Обновляет индексы после смены роли пользователя"""
+        self._touch()
+        self.users_by_id[user['id']] = user
+        key = self._user_key(user)
+        for keys in (self.admin_usernames, self.regular_usernames):
+            i = bisect.bisect_left(keys, key)
+            listed = i < len(keys) and keys[i] == key
+            if keys is self._role_usernames(user) and not listed:
+                keys.insert(i, key)
+            elif keys is not self._role_usernames(user) and listed:
+                del keys[i]
+
+    def _role_usernames(self, user):
+        return self.admin_usernames if user.get('is_admin', False) else self.regular_usernames
+
+    def find_users(self, prefix='', role_filter=None, cursor=None, offset=0, limit=100):
+        """Поиск пользователей по префиксу имени с постраничным выводом по курсору
+
+        Возвращает (пользователи, всего найдено, курсор следующей страницы).
+        Курсор - строка "username:id" последнего пользователя на странице.
+        """
+        prefix = (prefix or '').lower()
+        keys = {'admin': self.admin_usernames, 'user': self.regular_usernames}.get(role_filter, self.usernames)
+
+        lo, hi = self._prefix_range(keys, prefix)
+        total = hi - lo
+
+        if cursor:
+            start = bisect.bisect_right(keys, self._parse_cursor(cursor), lo, hi)
+        else:
+            start = min(lo + offset, hi)
+
+        position = min(start + limit, hi)
+        page = [self.users_by_id[user_id] for _, user_id in keys[start:position]]
+
+        next_cursor = None
+        if page and position < hi:
+            next_cursor = f"{page[-1]['username'].lower()}:{page[-1]['id']}"
+
+        return page, total, next_cursor
+
+    @staticmethod
+    def _prefix_range(keys, prefix):
+        if not prefix:
+            return 0, len(keys)
+        lo = bisect.bisect_left(keys, (prefix,))
+        hi = bisect.bisect_left(keys, (prefix + _PREFIX_END,), lo)
+        return lo, hi
+
+    @staticmethod
+    def _parse_cursor(cursor):
+        try:
+            username, user_id = str(cursor).rsplit(':', 1)
+            return (username, int(user_id))
+        except ValueError:
+            raise ValueError('Некорректный курсор')
@@ -0,0 +1,176 @@
+"""Кэш готовых JSON-фрагментов рецептов (и сжатых ответов API) и сборка ответов из фрагментов"""
+import json
+import threading
+from collections import OrderedDict
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def encode_json(obj):
+    """Компактная JSON-кодировка в UTF-8"""
+    return _encoder.encode(obj).encode('utf-8')
+
+
+class JSONFragmentCache:
+    """LRU-кэш закодированных рецептов (bytes) с ограничением по памяти
+
+    Ключ - (id рецепта, проекция, версия рецепта), поэтому устаревший фрагмент
+    никогда не будет выдан; invalidate() лишь освобождает память сразу.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # ключ -> bytes
+        self._keys_by_id = {}  # id рецепта -> set(ключ)
+        self._lock = threading.Lock()
+
+    def fragment(self, key, obj):
+        """Возвращает фрагмент из кэша или кодирует obj и сохраняет результат"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        data = encode_json(obj)
+        self.put(key, data)
+        return data
+
+    def get(self, key):
+        """Готовые данные по ключу (None - нет в кэше); счетчики попаданий не меняются"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        """Сохраняет готовые данные; key[0] - id рецепта для invalidate()"""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._keys_by_id.setdefault(key[0], set()).add(key)
+                self.size += len(data)
+                while self.size > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+
+    def response_variants(self, etag):
+        """Сжатые варианты ответа с этим ETag (compression.py). ETag однозначно
+        задает тело, поэтому устаревший вариант не будет выдан, а неиспользуемые
+        вытесняются из LRU вместе с фрагментами"""
+        return ResponseVariants(self, etag)
+
+    def invalidate(self, recipe_id):
+        """Удаляет все фрагменты рецепта"""
+        with self._lock:
+            for key in list(self._keys_by_id.get(recipe_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        data = self._entries.pop(key, None)
+        if data is None:
+            return
+        self.size -= len(data)
+        keys = self._keys_by_id.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[key[0]]
+
+
+class ResponseVariants:
+    """{кодировка: сжатое тело} ответа поверх JSONFragmentCache"""
+
+    def __init__(self, cache, etag):
+        self.cache = cache
+        self.etag = etag
+
+    def get(self, encoding):
+        return self.cache.get(('response', self.etag, encoding))
+
+    def __setitem__(self, encoding, data):
+        self.cache.put(('response', self.etag, encoding), data)
+
+
+class FragmentEncoder:
+    """Собирает JSON ответа, подставляя готовые фрагменты рецептов из индекса
+
+    Фрагментом кодируются только объекты, принадлежащие индексу (сравнение по
+    идентичности): полная запись рецепта и его карточка. Счетчик просмотров
+    меняется при каждом открытии рецепта, поэтому в полный фрагмент не входит
+    и подставляется отдельно.
+    """
+
+    def __init__(self, index, cache):
+        self.index = index
+        self.cache = cache
+
+    def encode(self, payload):
+        out = []
+        self._encode(payload, out)
+        return b''.join(out)
+
+    def _encode(self, obj, out):
+        if isinstance(obj, dict):
+            if self._encode_recipe(obj, out):
+                return
+            out.append(b'{')
+            first = True
+            for key, value in obj.items():
+                if not first:
+                    out.append(b',')
+                first = False
+                out.append(encode_json(str(key)))
+                out.append(b':')
+                self._encode(value, out)
+            out.append(b'}')
+        elif isinstance(obj, (list, tuple)):
+            out.append(b'[')
+            for position, value in enumerate(obj):
+                if position:
+                    out.append(b',')
+                self._encode(value, out)
+            out.append(b']')
+        else:
+            out.append(encode_json(obj))
+
+    def _encode_recipe(self, obj, out):
+        recipe_id = obj.get('id')
+        if recipe_id is None or type(recipe_id) is not int:
+            return False
+        version = self.index.versions.get(recipe_id)
+        if version is None:
+            return False
+
+        if self.index.summaries.get(recipe_id) is obj:
+            out.append(self.cache.fragment((recipe_id, 'summary', version), obj))
+            return True
+
+        if self.index.recipes_by_id.get(recipe_id) is obj:
+            data = self.cache.fragment(
+                (recipe_id, 'full', version),
+                {k: v for k, v in obj.items() if k != 'views'}
+            )
+            if 'views' in obj:
+                views = b'{"views":' + encode_json(obj['views'])
+                data = views + b'}' if data == b'{}' else views + b',' + data[1:]
+            out.append(data)
+            return True
+
+        return False
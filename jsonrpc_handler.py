@@ -1,26 +1,117 @@
-from flask import request, jsonify, session
+from flask import g, request, session, current_app, copy_current_request_context
 from auth import login_required_jsonrpc, admin_required_jsonrpc, validate_recipe_data, JSONRPCError
+from http_cache import make_etag, not_modified, apply_validators
+from json_cache import FragmentEncoder, JSONFragmentCache
+from projections import (
+    RECIPE_FIELDS, RECIPE_SUMMARY_FIELDS, USER_FIELDS, USER_SUMMARY_FIELDS,
+    make_recipe_summary, parse_fields, project
+)
 import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
+import metrics
+
+log = logging.getLogger(__name__)
+
+METHOD_SECONDS = metrics.histogram(
+    'jsonrpc_method_duration_seconds', 'Длительность выполнения метода JSON-RPC', ['method', 'outcome']
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _batch_executor():
+    """Общий пул потоков для параллельного выполнения методов чтения в пакетах"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('JSONRPC_BATCH_WORKERS', 4),
+                    thread_name_prefix='jsonrpc-batch'
+                )
+    return _executor
+
+def batch_queue_depth():
+    """Вызовы пакетов, ожидающие свободного потока"""
+    executor = _executor
+    return executor._work_queue.qsize() if executor is not None else 0
+
+def reset_batch_executor():
+    """Забывает пул потоков родителя: после fork его потоков в процессе нет"""
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
 class JSONRPCHandler:
     """Обработчик JSON-RPC запросов для кулинарного сайта"""
     
-    def __init__(self, recipes_list, users_list):
-        self.recipes = recipes_list
-        self.users = users_list
+    # Методы без побочных эффектов: в пакете выполняются параллельно
+    READ_ONLY_METHODS = frozenset([
+        'search_recipes', 'get_categories', 'get_recipes_count',
+        'get_popular_recipes', 'get_user_info', 'validate_login',
+        'admin_list_recipes', 'admin_get_invalid_recipes', 'get_changes_since',
+    ])
+    
+    # Методы, доступные через GET /api?method=...&params=... с ETag
+    # (не зависят от пользователя и ничего не изменяют)
+    CACHEABLE_METHODS = frozenset([
+        'search_recipes', 'get_categories', 'get_recipes_count', 'get_popular_recipes',
+    ])
+    
+    # Поля нового рецепта и значения по умолчанию (как в add_recipe)
+    RECIPE_DEFAULTS = {
+        'title': '',
+        'description': '',
+        'ingredients': None,
+        'steps': '',
+        'image_url': '',
+        'cooking_time': 30,
+        'category': 'Основное блюдо',
+        'difficulty': 'Средняя',
+    }
+    
+    # Поля, по которым сортируется список рецептов в админ-панели
+    ADMIN_SORT_FIELDS = ('id', 'title', 'author', 'category', 'cooking_time',
+                         'difficulty', 'views', 'rating')
+    
+    # Поля, которые можно изменить через update_recipe
+    UPDATE_FIELDS = ('title', 'description', 'ingredients', 'steps',
+                     'image_url', 'cooking_time', 'category', 'difficulty', 'rating')
+    
+    def __init__(self, store, fragment_cache_bytes=64 * 1024 * 1024, changelog=None):
+        self.store = store
+        self.changelog = changelog
+        self.index = store.index
+        self.fragments = JSONFragmentCache(fragment_cache_bytes)
+        self.index.recipe_listeners.append(self.fragments.invalidate)
+        self.encoder = FragmentEncoder(self.index, self.fragments)
+        # Отсортированные и отфильтрованные списки id для админ-панели
+        self._admin_orders = OrderedDict()
+        self._admin_orders_lock = threading.Lock()
         self.methods = {
             'search_recipes': self.search_recipes,
             'get_recipe': self.get_recipe,
             'add_recipe': self.add_recipe,
             'update_recipe': self.update_recipe,
             'delete_recipe': self.delete_recipe,
+            'add_recipes': self.add_recipes,
+            'update_recipes': self.update_recipes,
+            'delete_recipes': self.delete_recipes,
             'get_categories': self.get_categories,
             'get_recipes_count': self.get_recipes_count,
             'get_user_info': self.get_user_info,
             'validate_login': self.validate_login,
             'get_popular_recipes': self.get_popular_recipes,
+            'get_changes_since': self.get_changes_since,
             'admin_get_all_users': self.admin_get_all_users,
+            'admin_list_recipes': self.admin_list_recipes,
+            'admin_get_invalid_recipes': self.admin_get_invalid_recipes,
             'admin_delete_user': self.admin_delete_user,
             'admin_update_user': self.admin_update_user,
             'delete_account': self.delete_account,
@@ -29,12 +120,12 @@ class JSONRPCHandler:
     def get_current_user(self):
         """Получение текущего пользователя"""
         from auth import get_current_user
-        return get_current_user(self.users)
+        return get_current_user(self.store.users)
     
     def is_admin(self):
         """Проверка прав администратора"""
         from auth import is_admin
-        return is_admin(self.users)
+        return is_admin(self.store.users)
     
     def handle_request(self):
         """Основной обработчик запроса"""
@@ -43,7 +134,40 @@ class JSONRPCHandler:
         
         data = request.get_json()
         
-        # Проверка формата JSON-RPC 2.0
+        # Пакетный запрос JSON-RPC 2.0
+        if isinstance(data, list):
+            return self._handle_batch(data)
+        
+        method_name, params, request_id = self._parse_call(data)
+        return self._json_response(self._invoke(method_name, params, request_id))
+    
+    def handle_get_request(self):
+        """GET-форма для кэшируемых методов чтения: /api?method=...&params=<JSON>&id=..."""
+        method_name = request.args.get('method')
+        if method_name not in self.CACHEABLE_METHODS:
+            raise JSONRPCError(-32601, f'Method not available via GET: {method_name}')
+        
+        try:
+            params = json.loads(request.args.get('params') or '{}')
+        except ValueError:
+            raise JSONRPCError(-32700, 'Parse error: params must be JSON')
+        if not isinstance(params, dict):
+            raise JSONRPCError(-32602, 'Invalid params')
+        request_id = request.args.get('id')
+        
+        etag = make_etag(method_name, json.dumps(params, sort_keys=True), request_id,
+                         self.index.generation, self.index.views_generation)
+        response = not_modified(etag, policy='api')
+        if response:
+            return response
+        g.compressed_variants = self.fragments.response_variants(etag)
+        return apply_validators(
+            self._json_response(self._invoke(method_name, params, request_id)),
+            etag, policy='api'
+        )
+    
+    def _parse_call(self, data):
+        """Проверка формата JSON-RPC 2.0, возвращает (метод, параметры, id)"""
         if not isinstance(data, dict):
             raise JSONRPCError(-32600, 'Invalid Request')
         
@@ -61,26 +185,102 @@ class JSONRPCHandler:
         if not isinstance(params, dict):
             raise JSONRPCError(-32602, 'Invalid params')
         
-        # Выполнение метода
         if method_name not in self.methods:
             raise JSONRPCError(-32601, f'Method not found: {method_name}')
         
+        return method_name, params, request_id
+    
+    def _invoke(self, method_name, params, request_id):
+        """Выполнение метода, возвращает объект ответа JSON-RPC"""
+        started = time.perf_counter()
+        outcome = 'ok'
         try:
             result = self.methods[method_name](**params)
-            response = {
+            return {
                 'jsonrpc': '2.0',
                 'result': result,
                 'id': request_id
             }
-            return jsonify(response)
-            
         except JSONRPCError as e:
-            return self._error_response(e.code, e.message, e.data, request_id)
+            outcome = 'error'
+            return self._error_dict(e.code, e.message, e.data, request_id)
         except Exception as e:
-            return self._error_response(-32603, f'Internal error: {str(e)}', None, request_id)
+            outcome = 'exception'
+            log.exception('Ошибка метода JSON-RPC %s', method_name)
+            return self._error_dict(-32603, f'Internal error: {str(e)}', None, request_id)
+        finally:
+            METHOD_SECONDS.observe(time.perf_counter() - started, method_name, outcome)
     
-    def _error_response(self, code, message, data, request_id):
-        return jsonify({
+    def _handle_batch(self, batch):
+        """Обработка пакета вызовов: ответы в порядке запросов, уведомления без ответа"""
+        if not batch:
+            raise JSONRPCError(-32600, 'Invalid Request: empty batch')
+        
+        max_size = current_app.config.get('JSONRPC_MAX_BATCH_SIZE', 20)
+        if len(batch) > max_size:
+            raise JSONRPCError(-32600, f'Invalid Request: batch size exceeds {max_size}')
+        
+        responses = [None] * len(batch)
+        notifications = set()
+        calls = []
+        for position, item in enumerate(batch):
+            if isinstance(item, dict) and 'id' not in item:
+                notifications.add(position)
+            try:
+                method_name, params, request_id = self._parse_call(item)
+            except JSONRPCError as e:
+                request_id = item.get('id') if isinstance(item, dict) else None
+                responses[position] = self._error_dict(e.code, e.message, e.data, request_id)
+                continue
+            calls.append((position, method_name, params, request_id))
+        
+        # Все изменения пакета сохраняются в файлы одной записью
+        with self.store.deferred_save():
+            shared = {}
+            run = []
+            for call in calls:
+                if call[1] in self.READ_ONLY_METHODS:
+                    run.append(call)
+                    continue
+                self._run_read_only(run, responses, shared)
+                run = []
+                position, method_name, params, request_id = call
+                responses[position] = self._invoke(method_name, params, request_id)
+                # Чтения после изменения должны видеть его: результаты до него не переиспользуются
+                shared = {}
+            self._run_read_only(run, responses, shared)
+        
+        result = [r for position, r in enumerate(responses)
+                  if r is not None and position not in notifications]
+        if not result:
+            return '', 204
+        return self._json_response(result)
+    
+    def _run_read_only(self, calls, responses, shared):
+        """Параллельное выполнение подряд идущих методов только для чтения.
+        Одинаковые вызовы внутри пакета выполняются один раз."""
+        keyed = []
+        for position, method_name, params, request_id in calls:
+            key = (method_name, json.dumps(params, sort_keys=True, default=str))
+            keyed.append((position, key, request_id))
+            if key in shared:
+                continue
+            if len(calls) > 1:
+                task = copy_current_request_context(self._invoke)
+                shared[key] = _batch_executor().submit(task, method_name, params, None)
+            else:
+                shared[key] = self._invoke(method_name, params, None)
+        
+        for position, key, request_id in keyed:
+            outcome = shared[key]
+            if isinstance(outcome, Future):
+                outcome = shared[key] = outcome.result()
+            response = dict(outcome)
+            response['id'] = request_id
+            responses[position] = response
+    
+    def _error_dict(self, code, message, data, request_id):
+        return {
             'jsonrpc': '2.0',
             'error': {
                 'code': code,
@@ -88,13 +288,160 @@ class JSONRPCHandler:
                 'data': data
             },
             'id': request_id
-        })
+        }
+    
+    def _error_response(self, code, message, data, request_id):
+        return self._json_response(self._error_dict(code, message, data, request_id))
+    
+    def _json_response(self, payload):
+        """Ответ JSON, собранный из закэшированных фрагментов рецептов"""
+        return current_app.response_class(self.encoder.encode(payload), mimetype='application/json')
+    
+    def _remove_author_recipes(self, writer, username):
+        """Удаляет все рецепты автора"""
+        if self.index.recipes_count(username):
+            writer.remove_recipes(lambda recipe: recipe.get('author') == username)
+    
+    def _author_name(self):
+        """Имя автора для новых рецептов"""
+        current_user = self.get_current_user()
+        return current_user['username'] if current_user else 'admin'
+    
+    def _build_recipe(self, params, new_id, author):
+        """Создание записи рецепта из проверенных параметров"""
+        ingredients = params['ingredients']
+        if isinstance(ingredients, str):
+            ingredients = [i.strip() for i in ingredients.split('\n') if i.strip()]
+        
+        return {
+            'id': new_id,
+            'title': params['title'],
+            'description': params['description'],
+            'ingredients': ingredients,
+            'steps': params['steps'],
+            'image_url': params['image_url'] if params['image_url'] else f'https://source.unsplash.com/300x200/?food,recipe&sig={new_id}',
+            'cooking_time': int(params['cooking_time']),
+            'category': params['category'],
+            'difficulty': params['difficulty'],
+            'author': author,
+            'rating': 4.0,
+            'views': 0,
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def _recipe_changes(self, params):
+        """Новые значения полей рецепта из проверенных параметров"""
+        changes = {}
+        for field in self.UPDATE_FIELDS:
+            if field in params and params[field] is not None:
+                if field == 'ingredients' and isinstance(params[field], str):
+                    changes[field] = [
+                        ing.strip() for ing in params[field].split('\n')
+                        if ing.strip()
+                    ]
+                elif field == 'cooking_time':
+                    changes[field] = int(params[field])
+                elif field == 'rating':
+                    changes[field] = float(params[field])
+                else:
+                    changes[field] = params[field]
+        return changes
+    
+    def _missing_recipes(self, items):
+        """Ошибки для (позиция, id) рецептов, которых уже нет (проверка под блокировкой писателя)"""
+        return [{'index': position, 'errors': {'recipe_id': f'Рецепт с ID {recipe_id} не найден'}}
+                for position, recipe_id in items if recipe_id not in self.index.recipes_by_id]
+    
+    def import_committer(self, author):
+        """Функция, добавляющая пакет импортируемых рецептов (см. import_export.import_records)"""
+        def commit(items):
+            with self.store.write() as writer:
+                for params, extras in items:
+                    recipe = self._build_recipe(params, writer.next_recipe_id(), extras.get('author', author))
+                    if 'rating' in params:
+                        recipe['rating'] = float(params['rating'])
+                    if 'views' in extras:
+                        recipe['views'] = extras['views']
+                    if 'created_at' in extras:
+                        recipe['created_at'] = extras['created_at']
+                    writer.add_recipe(recipe)
+        
+        return commit
+    
+    def _parse_fields(self, fields, allowed):
+        """Разбор параметра fields с ошибкой JSON-RPC при неверном значении"""
+        try:
+            return parse_fields(fields, allowed)
+        except ValueError as e:
+            raise JSONRPCError(-32602, str(e))
+    
+    def _project_recipes(self, recipes, fields):
+        """Проекция списка рецептов: полные записи, готовые карточки или выбранные поля"""
+        if fields is None:
+            return recipes
+        summaries = self.index.summaries
+        if fields == 'summary':
+            return [summaries[r['id']] for r in recipes]
+        if all(field in RECIPE_SUMMARY_FIELDS for field in fields):
+            return [project(summaries[r['id']], fields) for r in recipes]
+        projected = [project(r, fields) for r in recipes]
+        if 'ingredients_preview' in fields:
+            for recipe, record in zip(recipes, projected):
+                record['ingredients_preview'] = summaries[recipe['id']]['ingredients_preview']
+        return projected
+    
+    def _parse_page(self, offset, limit, max_limit=500):
+        """Проверка offset/limit постраничных методов"""
+        try:
+            return max(0, int(offset)), max(1, min(int(limit), max_limit))
+        except (ValueError, TypeError):
+            raise JSONRPCError(-32602, 'limit и offset должны быть числами')
+    
+    def _sorted_recipe_ids(self, sort, descending, search, category):
+        """id рецептов в порядке сортировки с учетом фильтров.
+        Результат запоминается до следующего изменения данных
+        (для сортировки по просмотрам - и до следующего просмотра)."""
+        key = (sort, descending, search, category)
+        stamp = (self.index.generation, self.index.views_generation if sort == 'views' else None)
+        with self._admin_orders_lock:
+            cached = self._admin_orders.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        recipes = self.store.recipes
+        if search:
+            recipes = [r for r in recipes if search in r['title'].lower()]
+        if category:
+            recipes = [r for r in recipes if r.get('category') == category]
+        
+        def sort_key(recipe):
+            value = recipe.get(sort)
+            if isinstance(value, str):
+                value = value.lower()
+            return (value is None, value if value is not None else 0, recipe['id'])
+        
+        ids = [r['id'] for r in sorted(recipes, key=sort_key, reverse=descending)]
+        with self._admin_orders_lock:
+            self._admin_orders[key] = (stamp, ids)
+            self._admin_orders.move_to_end(key)
+            while len(self._admin_orders) > 32:
+                self._admin_orders.popitem(last=False)
+        return ids
+    
+    def _check_bulk_items(self, items):
+        """Проверка списка элементов пакетного метода"""
+        if not isinstance(items, list) or not items:
+            raise JSONRPCError(-32602, 'Ожидается непустой список')
+        max_items = current_app.config.get('JSONRPC_MAX_BULK_ITEMS', 10000)
+        if len(items) > max_items:
+            raise JSONRPCError(-32602, f'Не более {max_items} элементов за один вызов')
     
     # ========== Методы JSON-RPC ==========
     
     def search_recipes(self, title='', ingredients=None, mode='any', 
-                      category='', difficulty='', max_time=None):
+                      category='', difficulty='', max_time=None, fields=None):
         """Поиск рецептов по различным критериям"""
+        fields = self._parse_fields(fields, RECIPE_FIELDS)
         title_filter = title.lower().strip()
         
         if isinstance(ingredients, str):
@@ -114,7 +461,7 @@ class JSONRPCHandler:
         
         filtered_recipes = []
         
-        for recipe in self.recipes:
+        for recipe in self.store.recipes:
             if title_filter and title_filter not in recipe['title'].lower():
                 continue
 
@@ -154,7 +501,7 @@ class JSONRPCHandler:
         filtered_recipes.sort(key=lambda x: x.get('views', 0), reverse=True)
         
         return {
-            'recipes': filtered_recipes[:100],
+            'recipes': self._project_recipes(filtered_recipes[:100], fields),
             'count': len(filtered_recipes),
             'filters_applied': {
                 'title': title_filter,
@@ -176,13 +523,9 @@ class JSONRPCHandler:
         except ValueError:
             return {'error': 'ID рецепта должен быть числом'}
         
-        for recipe in self.recipes:
-            if recipe['id'] == recipe_id:
-                recipe['views'] = recipe.get('views', 0) + 1
-                # Сохраняем увеличение просмотров
-                from data_manager import save_recipes
-                save_recipes(self.recipes)
-                return {'recipe': recipe}
+        recipe = self.store.record_view(recipe_id)
+        if recipe is not None:
+            return {'recipe': recipe}
         
         return {'error': f'Рецепт с ID {recipe_id} не найден'}
     
@@ -209,32 +552,11 @@ class JSONRPCHandler:
         if validation_errors:
             return {'error': 'Ошибки валидации', 'validation_errors': validation_errors}
         
-        if isinstance(ingredients, str):
-            ingredients = [i.strip() for i in ingredients.split('\n') if i.strip()]
-        
-        # Генерируем новый ID
-        new_id = max([r['id'] for r in self.recipes], default=0) + 1
-        current_user = self.get_current_user()
-        
-        new_recipe = {
-            'id': new_id,
-            'title': title,
-            'description': description,
-            'ingredients': ingredients,
-            'steps': steps,
-            'image_url': image_url if image_url else f'https://source.unsplash.com/300x200/?food,recipe&sig={new_id}',
-            'cooking_time': int(cooking_time),
-            'category': category,
-            'difficulty': difficulty,
-            'author': current_user['username'] if current_user else 'admin',
-            'rating': 4.0,
-            'views': 0,
-            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        self.recipes.append(new_recipe)
-        from data_manager import save_recipes
-        save_recipes(self.recipes)
+        author = self._author_name()
+        with self.store.write() as writer:
+            new_id = writer.next_recipe_id()
+            new_recipe = self._build_recipe(params, new_id, author)
+            writer.add_recipe(new_recipe)
         
         return {
             'success': True,
@@ -283,45 +605,15 @@ class JSONRPCHandler:
         if validation_errors:
             return {'error': 'Ошибки валидации', 'validation_errors': validation_errors}
         
-        for i, recipe in enumerate(self.recipes):
-            if recipe['id'] == recipe_id:
-                update_fields = ['title', 'description', 'ingredients', 'steps', 
-                               'image_url', 'cooking_time', 'category', 'difficulty', 'rating']
-                
-                for field in update_fields:
-                    if field in params and params[field] is not None:
-                        if field == 'ingredients' and isinstance(params[field], str):
-                            self.recipes[i][field] = [
-                                ing.strip() for ing in params[field].split('\n') 
-                                if ing.strip()
-                            ]
-                        elif field == 'cooking_time':
-                            try:
-                                time_val = int(params[field])
-                                if time_val <= 0:
-                                    return {'error': 'Время приготовления должно быть положительным числом'}
-                                self.recipes[i][field] = time_val
-                            except (ValueError, TypeError):
-                                return {'error': 'Время приготовления должно быть числом'}
-                        elif field == 'rating':
-                            try:
-                                rating_val = float(params[field])
-                                if rating_val < 0 or rating_val > 5:
-                                    return {'error': 'Рейтинг должен быть в диапазоне от 0 до 5'}
-                                self.recipes[i][field] = rating_val
-                            except (ValueError, TypeError):
-                                return {'error': 'Рейтинг должен быть числом'}
-                        else:
-                            self.recipes[i][field] = params[field]
-                
-                from data_manager import save_recipes
-                save_recipes(self.recipes)
-                
-                return {
-                    'success': True,
-                    'message': 'Рецепт успешно обновлен',
-                    'recipe': self.recipes[i]
-                }
+        with self.store.write() as writer:
+            recipe = writer.update_recipe(recipe_id, self._recipe_changes(params))
+        
+        if recipe is not None:
+            return {
+                'success': True,
+                'message': 'Рецепт успешно обновлен',
+                'recipe': recipe
+            }
         
         return {'error': f'Рецепт с ID {recipe_id} не найден'}
     
@@ -339,26 +631,156 @@ class JSONRPCHandler:
         except ValueError:
             return {'error': 'ID рецепта должен быть числом'}
         
-        initial_count = len(self.recipes)
-        
         # Удаляем рецепт
-        self.recipes = [r for r in self.recipes if r['id'] != recipe_id]
+        with self.store.write() as writer:
+            removed = writer.remove_recipes(lambda r: r['id'] == recipe_id)
+            remaining = len(writer.recipes)
         
-        if len(self.recipes) < initial_count:
-            from data_manager import save_recipes
-            save_recipes(self.recipes)
+        if removed:
             return {
                 'success': True,
                 'message': f'Рецепт с ID {recipe_id} успешно удален',
-                'remaining_recipes': len(self.recipes)
+                'remaining_recipes': remaining
             }
         else:
             return {'error': f'Рецепт с ID {recipe_id} не найден'}
     
+    @login_required_jsonrpc
+    def add_recipes(self, recipes):
+        """Пакетное добавление рецептов: все или ничего, одна запись в файл"""
+        if not self.is_admin():
+            return {'error': 'Требуются права администратора'}
+        
+        self._check_bulk_items(recipes)
+        
+        prepared = []
+        item_errors = []
+        for position, item in enumerate(recipes):
+            if not isinstance(item, dict):
+                item_errors.append({'index': position, 'errors': {'item': 'Ожидается объект рецепта'}})
+                continue
+            unknown = set(item) - set(self.RECIPE_DEFAULTS)
+            if unknown:
+                item_errors.append({'index': position, 'errors': {
+                    field: 'Неизвестное поле' for field in sorted(unknown)
+                }})
+                continue
+            params = {field: item.get(field, default) for field, default in self.RECIPE_DEFAULTS.items()}
+            errors = validate_recipe_data(params, is_update=False)
+            if errors:
+                item_errors.append({'index': position, 'errors': errors})
+            else:
+                prepared.append(params)
+        
+        if item_errors:
+            return {'error': 'Ошибки валидации', 'item_errors': item_errors}
+        
+        author = self._author_name()
+        added_ids = []
+        with self.store.write() as writer:
+            for params in prepared:
+                new_recipe = self._build_recipe(params, writer.next_recipe_id(), author)
+                writer.add_recipe(new_recipe)
+                added_ids.append(new_recipe['id'])
+        
+        return {
+            'success': True,
+            'message': f'Добавлено рецептов: {len(added_ids)}',
+            'recipe_ids': added_ids
+        }
+    
+    @login_required_jsonrpc
+    def update_recipes(self, updates):
+        """Пакетное обновление рецептов: каждый элемент - {recipe_id, поля...}"""
+        if not self.is_admin():
+            return {'error': 'Требуются права администратора'}
+        
+        self._check_bulk_items(updates)
+        
+        allowed = set(self.UPDATE_FIELDS)
+        # Проверка параметров - до блокировки писателя, чтобы не задерживать другие записи
+        prepared = []
+        item_errors = []
+        for position, item in enumerate(updates):
+            if not isinstance(item, dict):
+                item_errors.append({'index': position, 'errors': {'item': 'Ожидается объект с recipe_id'}})
+                continue
+            try:
+                recipe_id = int(item.get('recipe_id'))
+            except (ValueError, TypeError):
+                item_errors.append({'index': position, 'errors': {'recipe_id': 'ID рецепта должен быть числом'}})
+                continue
+            if recipe_id not in self.index.recipes_by_id:
+                item_errors.append({'index': position, 'errors': {'recipe_id': f'Рецепт с ID {recipe_id} не найден'}})
+                continue
+            params = {k: v for k, v in item.items() if k != 'recipe_id' and v is not None}
+            errors = {field: 'Неизвестное поле' for field in sorted(set(params) - allowed)}
+            errors.update(validate_recipe_data(params, is_update=True))
+            if errors:
+                item_errors.append({'index': position, 'errors': errors})
+            else:
+                prepared.append((position, recipe_id, self._recipe_changes(params)))
+        
+        if item_errors:
+            return {'error': 'Ошибки валидации', 'item_errors': item_errors}
+        
+        with self.store.write() as writer:
+            # Рецепт могли удалить, пока проверялись параметры
+            item_errors = self._missing_recipes((position, recipe_id) for position, recipe_id, _ in prepared)
+            if item_errors:
+                return {'error': 'Ошибки валидации', 'item_errors': item_errors}
+            for _, recipe_id, changes in prepared:
+                writer.update_recipe(recipe_id, changes)
+        
+        return {
+            'success': True,
+            'message': f'Обновлено рецептов: {len(prepared)}',
+            'recipe_ids': [recipe_id for _, recipe_id, _ in prepared]
+        }
+    
+    @login_required_jsonrpc
+    def delete_recipes(self, recipe_ids):
+        """Пакетное удаление рецептов: все или ничего, одна запись в файл"""
+        if not self.is_admin():
+            return {'error': 'Требуются права администратора'}
+        
+        self._check_bulk_items(recipe_ids)
+        
+        positions = {}
+        item_errors = []
+        for position, recipe_id in enumerate(recipe_ids):
+            try:
+                recipe_id = int(recipe_id)
+            except (ValueError, TypeError):
+                item_errors.append({'index': position, 'errors': {'recipe_id': 'ID рецепта должен быть числом'}})
+                continue
+            if recipe_id not in self.index.recipes_by_id:
+                item_errors.append({'index': position, 'errors': {'recipe_id': f'Рецепт с ID {recipe_id} не найден'}})
+                continue
+            positions.setdefault(recipe_id, position)
+        
+        if item_errors:
+            return {'error': 'Ошибки валидации', 'item_errors': item_errors}
+        
+        ids_to_delete = set(positions)
+        with self.store.write() as writer:
+            item_errors = self._missing_recipes((position, recipe_id) for recipe_id, position in positions.items())
+            if item_errors:
+                return {'error': 'Ошибки валидации', 'item_errors': item_errors}
+            writer.remove_recipes(lambda recipe: recipe['id'] in ids_to_delete)
+            remaining = len(writer.recipes)
+        
+        return {
+            'success': True,
+            'message': f'Удалено рецептов: {len(ids_to_delete)}',
+            'deleted_ids': sorted(ids_to_delete),
+            'remaining_recipes': remaining
+        }
+    
     def get_categories(self):
         """Получение списка всех категорий рецептов"""
         categories = {}
-        for recipe in self.recipes:
+        for recipe in self.store.recipes:
             cat = recipe['category']
             categories[cat] = categories.get(cat, 0) + 1
         
@@ -381,8 +803,9 @@ class JSONRPCHandler:
         difficulties_count = {}
         negative_time_count = 0
         total_cooking_time = 0
+        recipes = self.store.recipes
         
-        for recipe in self.recipes:
+        for recipe in recipes:
             cat = recipe['category']
             diff = recipe['difficulty']
             
@@ -394,16 +817,16 @@ class JSONRPCHandler:
                 negative_time_count += 1
         
         return {
-            'total': len(self.recipes),
+            'total': len(recipes),
             'categories': categories_count,
             'difficulties': difficulties_count,
             'total_cooking_time': total_cooking_time,
-            'avg_cooking_time': round(total_cooking_time / len(self.recipes), 1) if self.recipes else 0,
-            'total_views': sum(r.get('views', 0) for r in self.recipes),
-            'avg_rating': round(sum(r.get('rating', 0) for r in self.recipes) / len(self.recipes), 2) if self.recipes else 0,
+            'avg_cooking_time': round(total_cooking_time / len(recipes), 1) if recipes else 0,
+            'total_views': sum(r.get('views', 0) for r in recipes),
+            'avg_rating': round(sum(r.get('rating', 0) for r in recipes) / len(recipes), 2) if recipes else 0,
             'validation_stats': {
                 'recipes_with_negative_time': negative_time_count,
-                'total_valid_recipes': len(self.recipes) - negative_time_count
+                'total_valid_recipes': len(recipes) - negative_time_count
             }
         }
     
@@ -437,8 +860,9 @@ class JSONRPCHandler:
         
         return {'valid': True}
     
-    def get_popular_recipes(self, count=10):
+    def get_popular_recipes(self, count=10, fields=None):
         """Получение популярных рецептов"""
+        fields = self._parse_fields(fields, RECIPE_FIELDS)
         try:
             count = int(count)
             if count <= 0:
@@ -450,70 +874,139 @@ class JSONRPCHandler:
         
         # Сортируем по просмотрам и рейтингу
         popular = sorted(
-            self.recipes,
+            self.store.recipes,
             key=lambda x: (x.get('views', 0), x.get('rating', 0)),
             reverse=True
         )[:count]
         
         return {
-            'recipes': popular,
+            'recipes': self._project_recipes(popular, fields),
             'count': len(popular),
             'total_views': sum(r.get('views', 0) for r in popular)
         }
     
+    def get_changes_since(self, cursor=0, limit=500, fields=None):
+        """Изменения рецептов после cursor: upsert с рецептом или delete с id.
+        Чтобы синхронизироваться, клиент передает cursor из предыдущего ответа,
+        пока has_more истинно; cursor=0 - весь каталог"""
+        if self.changelog is None:
+            raise JSONRPCError(-32601, 'Журнал изменений отключен')
+        # Просмотры в журнал не попадают
+        fields = self._parse_fields(fields, [f for f in RECIPE_FIELDS if f != 'views'])
+        try:
+            cursor = int(cursor)
+        except (ValueError, TypeError):
+            raise JSONRPCError(-32602, 'cursor должен быть числом')
+        _, limit = self._parse_page(0, limit, max_limit=1000)
+        
+        rows, has_more = self.changelog.since(cursor, limit)
+        changes = []
+        for seq, recipe_id, op, payload in rows:
+            if op == 'upsert':
+                # Карточка строится по записи журнала: индекс этого воркера может отставать
+                recipe = json.loads(payload)
+                if fields == 'summary':
+                    recipe = make_recipe_summary(recipe)
+                elif fields is not None:
+                    preview = make_recipe_summary(recipe)['ingredients_preview']
+                    recipe = project(dict(recipe, ingredients_preview=preview), fields)
+                changes.append({'seq': seq, 'op': op, 'recipe': recipe})
+            else:
+                changes.append({'seq': seq, 'op': op, 'id': recipe_id})
+        
+        return {
+            'changes': changes,
+            'cursor': rows[-1][0] if rows else cursor,
+            'has_more': has_more
+        }
+    
+    @admin_required_jsonrpc
+    def admin_list_recipes(self, offset=0, limit=50, sort='id', order='asc', search='',
+                           category='', fields=None):
+        """Админ: постраничный список рецептов с сортировкой, поиском по названию и фильтром категории"""
+        fields = self._parse_fields(fields, RECIPE_FIELDS)
+        offset, limit = self._parse_page(offset, limit)
+        if sort not in self.ADMIN_SORT_FIELDS:
+            raise JSONRPCError(-32602, f'sort: допустимые поля: {", ".join(self.ADMIN_SORT_FIELDS)}')
+        if order not in ('asc', 'desc'):
+            raise JSONRPCError(-32602, 'order: ожидается "asc" или "desc"')
+        
+        ids = self._sorted_recipe_ids(sort, order == 'desc', (search or '').lower().strip(), category or '')
+        page = [r for r in map(self.index.recipes_by_id.get, ids[offset:offset + limit]) if r is not None]
+        
+        return {
+            'recipes': self._project_recipes(page, fields),
+            'total': len(ids),
+            'offset': offset,
+            'limit': limit
+        }
+    
+    @admin_required_jsonrpc
+    def admin_get_invalid_recipes(self, offset=0, limit=50, fields=None):
+        """Админ: рецепты с некорректным временем приготовления (из индекса)"""
+        fields = self._parse_fields(fields, RECIPE_FIELDS)
+        offset, limit = self._parse_page(offset, limit)
+        page = self.index.invalid_recipes(offset, limit)
+        
+        return {
+            'recipes': self._project_recipes(page, fields),
+            'total': len(self.index.invalid_ids),
+            'offset': offset,
+            'limit': limit
+        }
+    
     @admin_required_jsonrpc
-    def admin_get_all_users(self, limit=100, offset=0, search=None, role_filter=None):
-        """Админ: получение всех пользователей с фильтрацией"""
+    def admin_get_all_users(self, limit=100, offset=0, search=None, role_filter=None, cursor=None,
+                            fields=None):
+        """Админ: получение пользователей с поиском по префиксу имени и постраничным выводом по курсору"""
+        fields = self._parse_fields(fields, USER_FIELDS)
+        if fields == 'summary':
+            fields = USER_SUMMARY_FIELDS
         try:
-            print(f"DEBUG: Вызов admin_get_all_users, поиск: '{search}', фильтр: '{role_filter}'")
-            
-            # Применяем фильтры
-            filtered_users = self.users
-            
-            if search:
-                search_lower = search.lower()
-                filtered_users = [u for u in filtered_users if search_lower in u['username'].lower()]
-            
-            if role_filter:
-                if role_filter == 'admin':
-                    filtered_users = [u for u in filtered_users if u.get('is_admin', False)]
-                elif role_filter == 'user':
-                    filtered_users = [u for u in filtered_users if not u.get('is_admin', False)]
+            log.debug("Вызов admin_get_all_users, поиск: '%s', фильтр: '%s'", search, role_filter)
             
-            total_count = len(filtered_users)
+            try:
+                limit = max(1, min(int(limit), 1000))
+                offset = max(0, int(offset))
+            except (ValueError, TypeError):
+                raise JSONRPCError(-32602, 'limit и offset должны быть числами')
             
-            # Применяем пагинацию
-            paginated_users = filtered_users[offset:offset + limit]
+            try:
+                page, total_count, next_cursor = self.index.find_users(
+                    prefix=search, role_filter=role_filter,
+                    cursor=cursor, offset=offset, limit=limit
+                )
+            except ValueError as e:
+                raise JSONRPCError(-32602, str(e))
             
-            print(f"DEBUG: Найдено {len(paginated_users)} пользователей (всего: {total_count})")
+            log.debug('Найдено %d пользователей (всего: %d)', len(page), total_count)
             
             result = []
-            for user in paginated_users:
-                # Считаем количество рецептов пользователя
-                recipes_count = len([r for r in self.recipes if r.get('author') == user['username']])
-                
-                user_info = user.copy()
-                if 'password_hash' in user_info:
-                    user_info.pop('password_hash', None)
-                
+            for user in page:
                 result.append({
                     'id': user['id'],
                     'username': user['username'],
                     'email': user.get('email', ''),
                     'is_admin': bool(user.get('is_admin', False)),
                     'created_at': user.get('created_at', ''),
-                    'recipes_count': recipes_count
+                    'recipes_count': self.index.recipes_count(user['username'])
                 })
             
+            if fields is not None:
+                result = [project(user, fields) for user in result]
+            
             return {
                 'users': result,
                 'total': total_count,
                 'limit': limit,
-                'offset': offset
+                'offset': offset,
+                'next_cursor': next_cursor
             }
             
+        except JSONRPCError:
+            raise
         except Exception as e:
-            print(f"ERROR в admin_get_all_users: {str(e)}")
+            log.exception('Ошибка в admin_get_all_users')
             raise JSONRPCError(-32603, f'Internal server error: {str(e)}')
     
     @admin_required_jsonrpc
@@ -528,28 +1021,17 @@ class JSONRPCHandler:
         except ValueError:
             raise JSONRPCError(-32602, 'ID пользователя должен быть числом')
         
-        # Проверяем существование пользователя
-        user_exists = any(user['id'] == user_id for user in self.users)
-        if not user_exists:
-            raise JSONRPCError(-32602, 'Пользователь не найден')
-        
-        # Удаляем пользователя
-        self.users = [u for u in self.users if u['id'] != user_id]
-        
-        # Удаляем рецепты пользователя
-        user_to_delete = None
-        for user in self.users:
-            if user['id'] == user_id:
-                user_to_delete = user
-                break
-        
-        if user_to_delete:
-            self.recipes = [r for r in self.recipes if r.get('author') != user_to_delete['username']]
+        with self.store.write() as writer:
+            # Удаляем пользователя, если он существует
+            user_to_delete = writer.remove_user(user_id)
+            if not user_to_delete:
+                raise JSONRPCError(-32602, 'Пользователь не найден')
+            
+            # Удаляем рецепты пользователя
+            self._remove_author_recipes(writer, user_to_delete['username'])
         
-        # Сохраняем изменения в файлы
-        from data_manager import save_users, save_recipes
-        save_users(self.users)
-        save_recipes(self.recipes)
+        from auth import revoke_user_sessions
+        revoke_user_sessions(user_id)
         
         return {'success': True, 'deleted_user_id': user_id}
     
@@ -561,25 +1043,27 @@ class JSONRPCHandler:
         except ValueError:
             raise JSONRPCError(-32602, 'ID пользователя должен быть числом')
         
-        user_found = False
-        for i, user in enumerate(self.users):
-            if user['id'] == user_id:
-                user_found = True
-                
-                if is_admin is not None:
-                    self.users[i]['is_admin'] = bool(is_admin)
-                
-                if new_password:
-                    from werkzeug.security import generate_password_hash
-                    self.users[i]['password_hash'] = generate_password_hash(new_password)
-                
-                break
+        changes = {}
+        if is_admin is not None:
+            changes['is_admin'] = bool(is_admin)
+        if new_password:
+            # Хеш вычисляется до блокировки писателя: это самая долгая часть
+            from werkzeug.security import generate_password_hash
+            changes['password_hash'] = generate_password_hash(new_password)
         
-        if not user_found:
-            raise JSONRPCError(-32602, 'Пользователь не найден')
+        with self.store.write() as writer:
+            user = self.index.users_by_id.get(user_id)
+            if not user:
+                raise JSONRPCError(-32602, 'Пользователь не найден')
+            revoke_sessions = bool(new_password) or (
+                is_admin is not None and bool(user.get('is_admin', False)) != bool(is_admin)
+            )
+            writer.update_user(user_id, changes)
         
-        from data_manager import save_users
-        save_users(self.users)
+        # Смена роли или пароля завершает все активные сессии пользователя
+        if revoke_sessions:
+            from auth import revoke_user_sessions
+            revoke_user_sessions(user_id)
         
         return {'success': True, 'updated_user_id': user_id}
     
@@ -591,19 +1075,16 @@ class JSONRPCHandler:
         if current_user['is_admin'] and current_user['username'] == 'admin':
             raise JSONRPCError(-32602, 'Нельзя удалить администратора системы')
         
-        # Удаляем пользователя
-        self.users = [u for u in self.users if u['id'] != current_user['id']]
-        
-        # Удаляем рецепты пользователя (кроме административных)
-        self.recipes = [r for r in self.recipes if r.get('author') != current_user['username']]
-        
-        # Сохраняем изменения в файлы
-        from data_manager import save_users, save_recipes
-        save_users(self.users)
-        save_recipes(self.recipes)
+        with self.store.write() as writer:
+            # Удаляем пользователя
+            writer.remove_user(current_user['id'])
+            
+            # Удаляем рецепты пользователя (кроме административных)
+            self._remove_author_recipes(writer, current_user['username'])
         
-        # Выходим из системы
-        from auth import logout_user
+        # Выходим из системы (включая сессии на других устройствах)
+        from auth import logout_user, revoke_user_sessions
+        revoke_user_sessions(current_user['id'])
         logout_user()
         
         return {'success': True, 'message': 'Аккаунт удален'}
\ No newline at end of file
@@ -0,0 +1,335 @@
+"""Журналы приложения: JSON-строки через очередь и фоновый поток записи
+
+Обработчик в потоке запроса только кладет запись в очередь (QueueHandler);
+запись в файлы с ротацией по размеру и вывод в консоль выполняет поток
+QueueListener. Если очередь переполнена, запись отбрасывается и учитывается
+в log_records_dropped_total: журнал не задерживает запрос на дисковом вводе-выводе.
+
+Логгеры и файлы (LOG_DIR):
+    app.log    - служебные сообщения приложения и библиотек, журнал запросов
+                 (логгер access: метод, маршрут, код, длительность, request_id)
+    audit.log  - логгер audit: кто изменил рецепты и пользователей, входы и выходы;
+                 просмотры рецептов - выборочно, с долей LOG_VIEW_SAMPLE_RATE
+
+Каждая строка - JSON: ts, level, logger, message, pid, request_id и поля события.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context, request, session
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: ротация без блокировки между процессами
+    fcntl = None
+
+access_log = logging.getLogger('access')
+audit_log = logging.getLogger('audit')
+
+# Входящий X-Request-ID принимается только в таком виде, иначе создается свой
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Больше стольких однотипных изменений в одном блоке записи - сводные записи
+# со списками id (по AUDIT_IDS_PER_RECORD) вместо записи на каждое изменение
+AUDIT_DETAIL_LIMIT = 50
+AUDIT_IDS_PER_RECORD = 1000
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись журнала - одна строка JSON"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            data['request_id'] = request_id
+        data.update(getattr(record, 'fields', None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который не ждет места в очереди, а отбрасывает запись"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Сообщение, трассировка и request_id вычисляются в потоке запроса:
+        # к моменту записи аргументы могут измениться, а контекста запроса уже нет
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if getattr(record, 'request_id', None) is None and has_request_context():
+            record.request_id = g.get('request_id')
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Ротация по размеру для файла, в который пишут несколько процессов (воркеры).
+    Ротация выполняется под блокировкой файла; процесс, заметивший, что файл
+    уже сменил другой процесс, просто открывает новый"""
+
+    def _rotated(self):
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _reopen(self):
+        self.stream.close()
+        self.stream = self._open()
+
+    def shouldRollover(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        elif self._rotated():
+            self._reopen()
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        with self._file_lock():
+            if self._rotated():
+                self._reopen()
+            elif os.path.getsize(self.baseFilename) >= self.maxBytes:
+                super().doRollover()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f'{self.baseFilename}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class _LoggerFilter(logging.Filter):
+    """Пропускает записи только указанных логгеров (или все, кроме них)"""
+
+    def __init__(self, names, exclude=False):
+        super().__init__()
+        self.names = set(names)
+        self.exclude = exclude
+
+    def filter(self, record):
+        return (record.name in self.names) != self.exclude
+
+
+class _Pipeline:
+    """Очередь, обработчик для потоков запросов и поток записи"""
+
+    def __init__(self):
+        self.handler = None
+        self.listener = None
+        self.file_handlers = ()
+        self.view_sample_rate = 0.0
+
+    def start(self, config):
+        directory = config['LOG_DIR']
+        os.makedirs(directory, exist_ok=True)
+
+        def rotating(filename, names, exclude=False):
+            handler = SharedRotatingFileHandler(
+                os.path.join(directory, filename), maxBytes=config['LOG_MAX_BYTES'],
+                backupCount=config['LOG_BACKUP_COUNT'], encoding='utf-8', delay=True)
+            handler.setFormatter(JsonFormatter())
+            handler.addFilter(_LoggerFilter(names, exclude))
+            return handler
+
+        self.file_handlers = (rotating('app.log', ['audit'], exclude=True),
+                              rotating('audit.log', ['audit']))
+        handlers = list(self.file_handlers)
+        if config['LOG_CONSOLE']:
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter('%(message)s'))
+            console.setLevel(logging.INFO)
+            console.addFilter(_LoggerFilter(['access', 'audit'], exclude=True))
+            handlers.append(console)
+
+        self.handler = NonBlockingQueueHandler(queue.Queue(config['LOG_QUEUE_SIZE']))
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *handlers,
+                                                       respect_handler_level=True)
+        self.listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(config['LOG_LEVEL'])
+        self.view_sample_rate = config['LOG_VIEW_SAMPLE_RATE']
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Дописывает очередь и останавливает поток записи"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    def after_fork(self):
+        """Поток записи мастера в воркер не переходит; очередь тоже новая,
+        так как ее блокировка могла быть захвачена в момент fork"""
+        if self.listener is None:
+            return
+        self.handler.queue = queue.Queue(self.handler.queue.maxsize)
+        self.handler.dropped = 0
+        for handler in self.file_handlers:
+            # Файл откроется заново при первой записи воркера
+            handler.close()
+        self.listener = logging.handlers.QueueListener(self.handler.queue, *self.listener.handlers,
+                                                       respect_handler_level=True)
+        self.listener.start()
+
+    @property
+    def queue_depth(self):
+        return self.handler.queue.qsize() if self.handler else 0
+
+    @property
+    def dropped(self):
+        return self.handler.dropped if self.handler else 0
+
+
+PIPELINE = _Pipeline()
+after_fork = PIPELINE.after_fork
+
+
+def init_app(app):
+    """Запускает запись журналов и журнал запросов с request_id"""
+    PIPELINE.start(app.config)
+    if app.config['LOG_ACCESS']:
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+
+
+def _before_request():
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+    g.log_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('log_started', None)
+    if started is None:
+        return response
+    response.headers['X-Request-ID'] = g.request_id
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'route': request.url_rule.rule if request.url_rule else None,
+        'status': response.status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        'bytes': response.content_length,
+        'remote_addr': request.remote_addr,
+        'user': _session_value('username'),
+    }
+    if request.query_string:
+        fields['query'] = request.query_string.decode('utf-8', 'replace')
+    access_log.info('%s %s %s', request.method, request.path, response.status_code,
+                    extra={'fields': fields})
+    return response
+
+
+def _session_value(key):
+    """Значение из сессии без отметки о чтении: иначе Flask добавит Vary: Cookie
+    и к ответам, которые от сессии не зависят"""
+    current = session._get_current_object()
+    return dict.get(current, key) if isinstance(current, dict) else None
+
+
+# ========== АУДИТ ==========
+
+def audit(event, level=logging.INFO, **fields):
+    """Событие аудита; actor - пользователь текущего запроса
+    (anonymous без входа, system вне запроса, например при импорте из CLI)"""
+    actor = 'system'
+    if has_request_context():
+        actor = _session_value('username') or 'anonymous'
+    audit_log.log(level, event, extra={'fields': dict(fields, event=event, actor=actor)})
+
+
+def attach_store(store):
+    """Аудит изменений хранилища (рецепты, пользователи) и выборочно - просмотров"""
+    store.event_listeners.append(_audit_store_events)
+
+
+_STORE_EVENTS = {
+    'recipe_added': ('recipe.created', 'recipe_id'),
+    'recipe_updated': ('recipe.updated', 'recipe_id'),
+    'recipe_removed': ('recipe.deleted', 'recipe_id'),
+    'user_added': ('user.created', 'user_id'),
+    'user_updated': ('user.updated', 'user_id'),
+    'user_removed': ('user.deleted', 'user_id'),
+}
+
+
+def _audit_store_events(events):
+    """events - события StoreWriter одного блока записи или [('recipe_viewed', recipe)]"""
+    if events[0][0] == 'recipe_viewed':
+        rate = PIPELINE.view_sample_rate
+        if rate and random.random() < rate:
+            audit('recipe.viewed', recipe_id=events[0][1]['id'], sample_rate=rate)
+        return
+
+    groups = {}
+    for event in events:
+        groups.setdefault(event[0], []).append(event)
+    for kind, group in groups.items():
+        name, id_field = _STORE_EVENTS[kind]
+        if len(group) > AUDIT_DETAIL_LIMIT:
+            _audit_bulk(name, kind, group)
+            continue
+        for event in group:
+            record = event[1]
+            fields = {id_field: record['id']}
+            if kind.startswith('recipe'):
+                fields['title'] = record.get('title')
+            else:
+                fields['username'] = record.get('username')
+            if kind in ('recipe_updated', 'user_updated'):
+                # Только имена полей: значения (например, хеш пароля) в журнал не пишутся
+                fields['fields'] = event[-1]
+            audit(name, **fields)
+
+
+def _audit_bulk(name, kind, group):
+    """Импорт и пакетные методы: id всех измененных записей, частями по
+    AUDIT_IDS_PER_RECORD (id не подряд - диапазон их не восстановит)"""
+    parts = (len(group) + AUDIT_IDS_PER_RECORD - 1) // AUDIT_IDS_PER_RECORD
+    for part in range(parts):
+        chunk = group[part * AUDIT_IDS_PER_RECORD:(part + 1) * AUDIT_IDS_PER_RECORD]
+        fields = {'ids': [event[1]['id'] for event in chunk], 'count': len(chunk),
+                  'total': len(group), 'part': part + 1, 'parts': parts}
+        if kind in ('recipe_updated', 'user_updated'):
+            fields['fields'] = sorted({field for event in chunk for field in event[-1]})
+        audit(name, **fields)
@@ -0,0 +1,141 @@
+"""Учет памяти воркера: глубокие размеры структур данных и снимки tracemalloc"""
+import gc
+import linecache
+import os
+import sys
+import threading
+import tracemalloc
+import types
+from collections import OrderedDict
+
+# Объекты, которые не принадлежат структуре, даже если она на них ссылается
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType, types.CodeType, types.FrameType, threading.Lock().__class__)
+
+
+def deep_size(obj, seen=None):
+    """Размер объекта вместе со всем, на что он ссылается (без классов, модулей и функций).
+    Объекты из seen не учитываются; пройденные объекты добавляются в seen"""
+    if seen is None:
+        seen = set()
+    size = 0
+    count = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SKIP_TYPES):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+        count += 1
+        if isinstance(current, (str, bytes, int, float, bool)) or current is None:
+            continue
+        # Для экземпляров классов сюда входят и значения атрибутов
+        stack.extend(gc.get_referents(current))
+    return size, count
+
+
+def structure_sizes(structures):
+    """Размеры именованных структур [(имя, объект)].
+
+    size - структура целиком; own - без объектов, уже учтенных в структурах
+    выше по списку (например, индекс без самих рецептов, на которые он ссылается)
+    """
+    shared = set()
+    result = []
+    for name, obj in structures:
+        size, objects = deep_size(obj)
+        own, _ = deep_size(obj, shared)
+        result.append({'name': name, 'size': size, 'own': own, 'objects': objects,
+                       'length': len(obj) if hasattr(obj, '__len__') else None})
+    return result
+
+
+def process_memory():
+    """RSS и USS процесса в байтах (Linux), счетчики сборщика мусора"""
+    result = {'gc_counts': gc.get_count(), 'gc_frozen': gc.get_freeze_count()}
+    try:
+        with open(f'/proc/{os.getpid()}/smaps_rollup') as f:
+            values = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    values[parts[0].rstrip(':')] = int(parts[1]) * 1024
+        result['rss'] = values['Rss']
+        result['uss'] = values['Private_Clean'] + values['Private_Dirty']
+    except (OSError, KeyError):
+        pass
+    return result
+
+
+class TracemallocSession:
+    """Запуск и остановка tracemalloc, снимки в памяти воркера и их сравнение"""
+
+    # Кадры интерпретатора, не относящиеся к приложению
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, linecache.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    )
+
+    def __init__(self, max_snapshots=5):
+        self.max_snapshots = max_snapshots
+        self._snapshots = OrderedDict()  # номер -> снимок
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def status(self):
+        status = {'tracing': tracemalloc.is_tracing(), 'snapshots': list(self._snapshots)}
+        if status['tracing']:
+            current, peak = tracemalloc.get_traced_memory()
+            status.update(frames=tracemalloc.get_traceback_limit(), traced=current, peak=peak,
+                          overhead=tracemalloc.get_tracemalloc_memory())
+        return status
+
+    def start(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(max(1, min(int(frames), 50)))
+        return self.status()
+
+    def stop(self):
+        """Останавливает трассировку; сделанные снимки сохраняются"""
+        tracemalloc.stop()
+        return self.status()
+
+    def snapshot(self):
+        """Снимок текущих выделений; самые старые снимки вытесняются"""
+        if not tracemalloc.is_tracing():
+            raise ValueError('tracemalloc не запущен')
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        with self._lock:
+            self._seq += 1
+            self._snapshots[self._seq] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return {'id': self._seq, 'size': sum(s.size for s in snapshot.statistics('filename'))}
+
+    def diff(self, first, second, group_by='lineno', limit=20):
+        """Места выделения, больше всего изменившиеся между снимками first и second"""
+        if group_by not in ('lineno', 'filename', 'traceback'):
+            raise ValueError('group_by: lineno, filename или traceback')
+        try:
+            old, new = self._snapshots[int(first)], self._snapshots[int(second)]
+        except (KeyError, ValueError, TypeError):
+            raise ValueError('Снимок не найден')
+        stats = new.compare_to(old, group_by)
+        return {
+            'total_diff': sum(stat.size_diff for stat in stats),
+            'top': [
+                {'site': [f'{frame.filename}:{frame.lineno}' for frame in stat.traceback],
+                 'size_diff': stat.size_diff, 'size': stat.size,
+                 'count_diff': stat.count_diff, 'count': stat.count}
+                for stat in stats[:max(1, min(int(limit), 200))]
+            ],
+        }
+
+    def after_fork(self):
+        """Снимки мастера к воркеру не относятся"""
+        self._snapshots.clear()
+        self._lock = threading.Lock()
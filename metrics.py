@@ -0,0 +1,359 @@
+"""Метрики приложения в формате Prometheus с агрегацией по воркерам через файлы
+
+Модули объявляют метрики при импорте:
+
+    SAVE_SECONDS = metrics.histogram('app_save_seconds', 'Время записи', ['file'])
+    SAVE_SECONDS.observe(0.012, 'recipes')
+
+Значения хранятся в памяти процесса (одна блокировка, без аллокаций на горячем
+пути, кроме первой встречи набора меток). Если задан каталог (init_directory),
+каждый воркер раз в несколько секунд записывает свои значения в файл
+<pid>-<токен>.json, а /metrics суммирует файлы всех воркеров. Счетчики и
+гистограммы завершившихся воркеров продолжают учитываться, показатели (gauge) -
+только у живых процессов.
+"""
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+# Границы корзин гистограмм длительности по умолчанию, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Counter:
+    """Монотонно растущий счетчик"""
+
+    type = 'counter'
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = registry.lock
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Распределение значений по корзинам с суммой и количеством"""
+
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = registry.lock
+        self._values = {}  # метки -> [счетчики корзин..., +Inf, сумма]
+
+    def observe(self, value, *labels):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[position] += 1
+            counts[-1] += value
+
+    def time(self, *labels):
+        """Контекстный менеджер, измеряющий длительность блока"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            return [[list(labels), list(counts)] for labels, counts in self._values.items()]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class CallbackMetric:
+    """Значения, вычисляемые при сборе: размеры индексов, очередей, счетчики кэшей.
+    callback() возвращает число или словарь {метки (кортеж): число}.
+    aggregate - как объединять показатели воркеров: 'sum' или 'max'"""
+
+    def __init__(self, name, documentation, labelnames, callback, metric_type, aggregate='sum'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.type = metric_type
+        self.aggregate = aggregate
+        self._callback = callback
+
+    def samples(self):
+        values = self._callback()
+        if not isinstance(values, dict):
+            return [[[], values]]
+        return [[list(labels), value] for labels, value in values.items()]
+
+    def reset(self):
+        pass
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._started, *self._labels)
+
+
+class Registry:
+    """Метрики процесса и их выгрузка в файл для агрегации по воркерам"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.directory = None
+        self.flush_interval = 5
+        self._path = None
+        self._flusher = None
+
+    def register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def collect(self):
+        """Значения метрик этого процесса"""
+        result = {}
+        for name, metric in list(self.metrics.items()):
+            try:
+                samples = metric.samples()
+            except Exception:
+                # Сбой одного показателя не должен ломать весь /metrics
+                continue
+            entry = {'type': metric.type, 'help': metric.documentation,
+                     'labels': list(metric.labelnames), 'samples': samples}
+            if metric.type == 'histogram':
+                entry['buckets'] = list(metric.buckets)
+            if getattr(metric, 'aggregate', 'sum') != 'sum':
+                entry['aggregate'] = metric.aggregate
+            result[name] = entry
+        return result
+
+    # ========== Агрегация по воркерам ==========
+
+    def init_directory(self, directory, flush_interval=5):
+        """Включает запись значений процесса в каталог, общий для воркеров"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._start_process()
+
+    def after_fork(self):
+        """Воркер начинает со своих значений и своего файла. Блокировка создается
+        заново: при fork ее мог держать поток записи мастера"""
+        self.lock = threading.Lock()
+        for metric in self.metrics.values():
+            if hasattr(metric, '_lock'):
+                metric._lock = self.lock
+            metric.reset()
+        if self.directory is not None:
+            self._start_process()
+
+    def _start_process(self):
+        self._path = os.path.join(self.directory, f'{os.getpid()}-{os.urandom(4).hex()}.json')
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush(self):
+        """Атомарно записывает значения процесса в его файл"""
+        if self._path is None:
+            return
+        tmp_path = f'{self._path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getpid(), 'metrics': self.collect()}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path)
+
+    def aggregate(self):
+        """Сумма значений всех воркеров (этот процесс - по текущим значениям)"""
+        current = self.collect()
+        if self.directory is None:
+            return current
+        sources = [current]
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if not filename.endswith('.json') or path == self._path:
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _process_alive(data.get('pid'))
+            sources.append({name: entry for name, entry in data.get('metrics', {}).items()
+                            if alive or entry['type'] != 'gauge'})
+        return _merge(sources)
+
+
+def clear_directory(directory):
+    """Удаляет файлы прошлого запуска (вызывается мастером до загрузки приложения)"""
+    os.makedirs(directory, exist_ok=True)
+    for filename in os.listdir(directory):
+        if filename.endswith(('.json', '.tmp')):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError):
+        return pid is not None
+    return True
+
+
+def _merge(sources):
+    merged = {}
+    for source in sources:
+        for name, entry in source.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = dict(entry, samples={})
+            samples = target['samples']
+            for labels, value in entry['samples']:
+                key = tuple(labels)
+                if key not in samples:
+                    samples[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    samples[key] = [a + b for a, b in zip(samples[key], value)]
+                elif entry.get('aggregate') == 'max':
+                    samples[key] = max(samples[key], value)
+                else:
+                    samples[key] += value
+    for entry in merged.values():
+        entry['samples'] = sorted(entry['samples'].items(), key=lambda item: item[0])
+    return merged
+
+
+# ========== Формат Prometheus ==========
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'le="{extra}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+def render(metrics_data):
+    """Текстовый формат Prometheus (version 0.0.4)"""
+    lines = []
+    for name in sorted(metrics_data):
+        entry = metrics_data[name]
+        labelnames = entry['labels']
+        lines.append(f"# HELP {name} {_escape(entry['help'])}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        for labels, value in entry['samples']:
+            if entry['type'] != 'histogram':
+                lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_number(value)}')
+                continue
+            cumulative = 0
+            bounds = [_format_number(float(b)) for b in entry['buckets']] + ['+Inf']
+            for bound, count in zip(bounds, value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labelnames, labels, bound)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labelnames, labels)} {_format_number(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(labelnames, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(REGISTRY, name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(REGISTRY, name, documentation, labelnames, buckets))
+
+
+def gauge_callback(name, documentation, callback, labelnames=(), aggregate='sum'):
+    """Показатель, вычисляемый при сборе"""
+    return REGISTRY.register(CallbackMetric(name, documentation, labelnames, callback, 'gauge', aggregate))
+
+
+def counter_callback(name, documentation, callback, labelnames=()):
+    """Счетчик, который уже ведется в другом объекте (например, попадания кэша)"""
+    return REGISTRY.register(CallbackMetric(name, documentation, labelnames, callback, 'counter'))
+
+
+REQUEST_SECONDS = histogram(
+    'http_request_duration_seconds', 'Длительность обработки HTTP-запроса',
+    ['route', 'method', 'status']
+)
+
+
+# ========== Flask ==========
+
+def init_app(app):
+    """Длительность запросов по маршрутам и агрегация по воркерам (METRICS_DIR)"""
+    from flask import g, request
+
+    if app.config.get('METRICS_DIR'):
+        REGISTRY.init_directory(app.config['METRICS_DIR'], app.config.get('METRICS_FLUSH_INTERVAL', 5))
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Шаблон маршрута, а не путь: иначе каждый id рецепта стал бы отдельной серией
+            route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+            REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                    route, request.method, str(response.status_code))
+        return response
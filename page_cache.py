@@ -0,0 +1,200 @@
+"""Кэш готовых HTML-страниц для анонимных посетителей"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from flask import g, has_request_context, request, session
+
+
+def page_key():
+    """Ключ страницы: путь и отсортированные параметры запроса.
+    None - страницу кэшировать нельзя (не GET или непустая сессия)"""
+    if request.method != 'GET' or session:
+        return None
+    args = urlencode(sorted(request.args.items(multi=True)))
+    return f'{request.path}?{args}'
+
+
+class PageCache:
+    """LRU-кэш страниц в памяти с необязательным общим уровнем на диске
+
+    Каждая страница помечается тегами (например 'recipe:5', 'stats', 'popular').
+    invalidate(tag) удаляет только страницы с этим тегом. На диске тег - это файл,
+    время изменения которого сравнивается со временем сохранения страницы, поэтому
+    сброс виден всем процессам, использующим тот же каталог.
+
+    Вместе со страницей в памяти хранятся ее сжатые варианты (compression.py):
+    get и set передают их словарь ответу через g.compressed_variants, и сжатие
+    выполняется один раз на запись, а не на каждый запрос.
+    """
+
+    def __init__(self, max_entries=1000, ttl=60, directory=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # ключ -> (сохранено, истекает, теги, тело, {кодировка: сжатое тело})
+        self._by_tag = {}  # тег -> set(ключ)
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(os.path.join(directory, 'pages'), exist_ok=True)
+            os.makedirs(os.path.join(directory, 'tags'), exist_ok=True)
+
+    def get(self, key):
+        """Тело страницы (str) или None"""
+        if key is None or not self.max_entries:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now and not self._stale_on_disk(entry[0], entry[2]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    _expose_variants(entry)
+                    return entry[3]
+                self._remove(key)
+
+        entry = self._read_disk(key, now)
+        if entry is None:
+            self.misses += 1
+            return None
+        with self._lock:
+            self._store(key, entry)
+            self.hits += 1
+        _expose_variants(entry)
+        return entry[3]
+
+    def set(self, key, body, tags, started):
+        """Сохраняет страницу; started - время начала рендеринга
+        (изменения, сделанные во время рендеринга, делают запись устаревшей)"""
+        if key is None or not self.max_entries:
+            return
+        entry = (started, started + self.ttl, tuple(tags), body, {})
+        with self._lock:
+            self._store(key, entry)
+        _expose_variants(entry)
+        if self.directory:
+            self._write_disk(key, entry)
+
+    def invalidate(self, tag):
+        """Удаляет все страницы с тегом"""
+        with self._lock:
+            for key in list(self._by_tag.get(tag, ())):
+                self._remove(key)
+        if self.directory:
+            path = self._tag_path(tag)
+            with open(path, 'a'):
+                pass
+            os.utime(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ========== Память ==========
+
+    def _store(self, key, entry):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        for tag in entry[2]:
+            self._by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    # ========== Диск ==========
+
+    def _tag_path(self, tag):
+        return os.path.join(self.directory, 'tags', tag.replace(':', '_'))
+
+    def _page_path(self, key):
+        return os.path.join(self.directory, 'pages', hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _stale_on_disk(self, stored_at, tags):
+        """Был ли тег сброшен другим процессом после сохранения страницы"""
+        if not self.directory:
+            return False
+        for tag in tags:
+            try:
+                if os.path.getmtime(self._tag_path(tag)) >= stored_at:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def _read_disk(self, key, now):
+        if not self.directory:
+            return None
+        path = self._page_path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('key') != key:
+            return None
+        stored_at, expires_at, tags = meta['stored_at'], meta['expires_at'], tuple(meta['tags'])
+        if expires_at <= now or self._stale_on_disk(stored_at, tags):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return (stored_at, expires_at, tags, body, {})
+
+    def _write_disk(self, key, entry):
+        path = self._page_path(key)
+        meta = {'key': key, 'stored_at': entry[0], 'expires_at': entry[1], 'tags': list(entry[2])}
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(meta) + '\n')
+                f.write(entry[3])
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+def _expose_variants(entry):
+    """Сжатые варианты отданной страницы - для сжатия ответа (compression.py)"""
+    if has_request_context():
+        g.compressed_variants = entry[4]
+
+
+def recipe_tags(recipes):
+    """Теги рецептов, показанных на странице"""
+    return [f"recipe:{r['id']}" for r in recipes]
+
+
+def create_page_cache(config, index):
+    """Создает кэш страниц и подписывает его на изменения индекса"""
+    cache = PageCache(
+        max_entries=config.get('PAGE_CACHE_MAX_ENTRIES', 1000),
+        ttl=config.get('PAGE_CACHE_TTL', 60),
+        directory=config.get('PAGE_CACHE_DIR')
+    )
+    index.recipe_listeners.append(lambda recipe_id: cache.invalidate(f'recipe:{recipe_id}'))
+    index.tag_listeners.append(cache.invalidate)
+    return cache
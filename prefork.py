@@ -0,0 +1,71 @@
+"""Предзагрузка в мастер-процессе перед fork: общие страницы памяти остаются общими
+
+Данные загружаются и индексируются один раз в мастере, после чего куча
+замораживается (gc.freeze): сборщик мусора больше не обходит эти объекты
+и не пишет в их заголовки, поэтому воркеры не копируют страницы мастера
+без необходимости. Состояние, которое у каждого воркера свое (соединения
+с БД, пулы потоков, счетчики), сбрасывается обработчиками after_fork.
+
+Обработчики запускают потоки (метрики, журнал, сэмплер профилировщика),
+поэтому нужны только воркерам сервера. Вспомогательные процессы, которые
+воркер создает сам (пул проверки при импорте), создаются внутри
+helper_processes() и обработчики не вызывают.
+"""
+import gc
+import os
+import threading
+from contextlib import contextmanager
+
+_after_fork_callbacks = []
+_preloading = False
+# Поток, выполняющий fork, переходит в дочерний процесс вместе со своими данными
+_forking = threading.local()
+
+
+def after_fork(callback):
+    """Регистрирует функцию, вызываемую в дочернем процессе сразу после fork"""
+    _after_fork_callbacks.append(callback)
+    return callback
+
+
+def begin_preload():
+    """Отключает сборщик мусора на время загрузки данных в мастере,
+    чтобы до fork в куче не появлялись дыры от частичных сборок"""
+    global _preloading
+    _preloading = True
+    gc.disable()
+
+
+def freeze_heap():
+    """Переносит все объекты мастера в постоянное поколение сборщика мусора.
+    Возвращает число замороженных объектов"""
+    global _preloading
+    if not _preloading:
+        gc.collect()
+    gc.freeze()
+    _preloading = False
+    return gc.get_freeze_count()
+
+
+@contextmanager
+def helper_processes():
+    """Процессы, созданные fork в этом потоке внутри блока, - вспомогательные:
+    обработчики after_fork в них не вызываются"""
+    previous = getattr(_forking, 'helper', False)
+    _forking.helper = True
+    try:
+        yield
+    finally:
+        _forking.helper = previous
+
+
+def _run_after_fork():
+    gc.enable()
+    if getattr(_forking, 'helper', False):
+        return
+    for callback in _after_fork_callbacks:
+        callback()
+
+
+# Срабатывает при любом fork без exec: gunicorn, uWSGI (кроме helper_processes())
+os.register_at_fork(after_in_child=_run_after_fork)
@@ -0,0 +1,273 @@
+"""Профилирование запросов: cProfile по запросу администратора и выборочный
+сэмплер стеков, сохраняющий профиль каждого медленного запроса
+
+    curl -H 'X-Profile: 1' ...      (или ?_profile=1) - полный cProfile запроса
+                                     для администратора, id профиля в X-Profile-Id
+
+Сэмплер раз в PROFILE_SAMPLE_INTERVAL секунд снимает стеки потоков, которые
+сейчас обрабатывают запросы. Если запрос выполнялся дольше PROFILE_SLOW_MS,
+собранные стеки сохраняются как профиль, иначе отбрасываются. Профили хранятся
+в каталоге-кольце на PROFILE_KEEP записей, общем для воркеров.
+
+Каждый снимок стеков держит GIL и останавливает потоки с запросами, поэтому
+по умолчанию интервал 50 мс (20 Гц). Для подробных профилей коротких участков
+его можно уменьшить до 10 мс: PROFILE_SAMPLE_INTERVAL=0.01.
+"""
+import cProfile
+import json
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request, session
+
+# Сколько функций показывается в сводке профиля
+TOP_FUNCTIONS = 25
+
+_ID_RE = re.compile(r'^[0-9]+-[0-9]+-[0-9a-f]+$')
+
+
+class ProfileStore:
+    """Профили на диске: <id>.json - описание и сводка, <id>.prof/.folded - данные.
+    id начинается со времени в мс, поэтому старые профили идут первыми"""
+
+    EXTENSIONS = {'cprofile': 'prof', 'sampled': 'folded'}
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, meta, data):
+        """Сохраняет профиль и удаляет самые старые сверх keep; возвращает id"""
+        profile_id = f'{int(time.time() * 1000)}-{os.getpid()}-{os.urandom(3).hex()}'
+        meta = dict(meta, id=profile_id, created_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        self._write(f'{profile_id}.{self.EXTENSIONS[meta["kind"]]}', data)
+        self._write(f'{profile_id}.json', json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+        self._trim()
+        return profile_id
+
+    def _write(self, filename, data):
+        path = os.path.join(self.directory, filename)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _ids(self):
+        ids = [name[:-5] for name in os.listdir(self.directory) if name.endswith('.json')]
+        return sorted(ids, key=lambda profile_id: (int(profile_id.split('-')[0]), profile_id))
+
+    def _trim(self):
+        ids = self._ids()
+        for profile_id in ids[:max(0, len(ids) - self.keep)]:
+            for extension in ('json', *self.EXTENSIONS.values()):
+                try:
+                    os.remove(os.path.join(self.directory, f'{profile_id}.{extension}'))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        """Описания профилей, новые первыми"""
+        result = []
+        for profile_id in reversed(self._ids()):
+            meta = self.get(profile_id)
+            if meta is not None:
+                result.append(meta)
+        return result
+
+    def get(self, profile_id):
+        if not _ID_RE.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f'{profile_id}.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def data_path(self, meta):
+        """Путь к данным профиля и имя файла для скачивания"""
+        filename = f"{meta['id']}.{self.EXTENSIONS[meta['kind']]}"
+        return os.path.join(self.directory, filename), filename
+
+
+class StackSampler:
+    """Фоновый поток, снимающий стеки потоков с активными запросами"""
+
+    def __init__(self, interval=0.05, max_samples=20000):
+        self.interval = interval
+        self.max_samples = max_samples
+        self._active = {}  # id потока -> список стеков
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def begin(self):
+        with self._lock:
+            self._active[threading.get_ident()] = []
+
+    def end(self):
+        """Стеки, собранные за время запроса текущего потока"""
+        with self._lock:
+            return self._active.pop(threading.get_ident(), None) or []
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is None or thread_id == own or len(samples) >= self.max_samples:
+                        continue
+                    # Объекты кода, а не строки: снимок не создает новых строк
+                    stack = []
+                    while frame is not None:
+                        stack.append(frame.f_code)
+                        frame = frame.f_back
+                    stack.reverse()
+                    samples.append(tuple(stack))
+
+
+def function_label(key):
+    filename, line, name = key
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def summarize_cprofile(stats):
+    """Сводка cProfile: функции по собственному и полному времени, мс"""
+    rows = [
+        {'function': function_label(key), 'calls': nc,
+         'self_ms': round(tt * 1000, 2), 'total_ms': round(ct * 1000, 2)}
+        for key, (cc, nc, tt, ct, callers) in stats.items()
+    ]
+    return _top(rows)
+
+
+def _code_key(code):
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def summarize_samples(samples, duration_ms):
+    """Сводка по стекам: время функции - доля снимков, где она есть, от длительности
+    запроса (снимки под нагрузкой приходят реже интервала, поэтому не интервал * число)"""
+    self_counts = Counter()
+    total_counts = Counter()
+    for stack in samples:
+        if stack:
+            self_counts[stack[-1]] += 1
+        total_counts.update(set(stack))
+    share = duration_ms / len(samples) if samples else 0
+    rows = [
+        {'function': function_label(_code_key(key)), 'calls': None,
+         'self_ms': round(self_counts[key] * share, 1),
+         'total_ms': round(count * share, 1)}
+        for key, count in total_counts.items()
+    ]
+    return _top(rows)
+
+
+def _top(rows):
+    return {
+        'top_self': sorted(rows, key=lambda r: r['self_ms'], reverse=True)[:TOP_FUNCTIONS],
+        'top_total': sorted(rows, key=lambda r: r['total_ms'], reverse=True)[:TOP_FUNCTIONS],
+    }
+
+
+def folded_stacks(samples):
+    """Стеки в формате collapsed (flamegraph.pl, speedscope): 'a;b;c количество'"""
+    counts = Counter(';'.join(function_label(_code_key(code)) for code in stack) for stack in samples)
+    return ''.join(f'{stack} {count}\n' for stack, count in counts.most_common()).encode('utf-8')
+
+
+class RequestProfiler:
+    """Подключение профилирования к приложению Flask"""
+
+    TRIGGER_HEADER = 'X-Profile'
+    TRIGGER_ARG = '_profile'
+
+    def __init__(self, app):
+        config = app.config
+        self.store = ProfileStore(config['PROFILE_DIR'], config['PROFILE_KEEP'])
+        self.slow_seconds = config['PROFILE_SLOW_MS'] / 1000
+        interval = config['PROFILE_SAMPLE_INTERVAL']
+        self.sampler = StackSampler(interval) if interval else None
+        if self.sampler is not None:
+            self.sampler.start()
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def after_fork(self):
+        """Поток сэмплера мастера в воркер не переходит"""
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def _before_request(self):
+        g.profile_started = time.perf_counter()
+        triggered = (request.headers.get(self.TRIGGER_HEADER) == '1'
+                     or request.args.get(self.TRIGGER_ARG) == '1')
+        if triggered and session.get('is_admin'):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # В потоке уже работает другой профилировщик
+                return
+            g.profile = profile
+        elif self.sampler is not None:
+            self.sampler.begin()
+
+    def _after_request(self, response):
+        started = g.pop('profile_started', None)
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        meta = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+        }
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.disable()
+            profile.create_stats()
+            meta.update(kind='cprofile', **summarize_cprofile(profile.stats))
+            response.headers['X-Profile-Id'] = self._save(meta, marshal.dumps(profile.stats))
+        elif self.sampler is not None:
+            samples = self.sampler.end()
+            if duration >= self.slow_seconds and samples:
+                meta.update(kind='sampled', samples=len(samples),
+                            **summarize_samples(samples, meta['duration_ms']))
+                self._save(meta, folded_stacks(samples))
+        return response
+
+    def _save(self, meta, data):
+        try:
+            return self.store.save(meta, data)
+        except OSError:
+            # Нехватка места под профиль не должна ломать ответ
+            return ''
+
+    def _teardown_request(self, exc):
+        # Запрос завершился исключением до after_request
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.disable()
+        if self.sampler is not None:
+            self.sampler.end()
@@ -0,0 +1,51 @@
+"""Проекции записей для ответов API (sparse fieldsets)"""
+
+# Поля карточки рецепта: всё, что нужно для списков и результатов поиска
+RECIPE_SUMMARY_FIELDS = (
+    'id', 'title', 'image_url', 'cooking_time', 'category',
+    'difficulty', 'rating', 'author', 'ingredients_preview',
+)
+
+# Все поля, которые можно запросить у рецепта
+RECIPE_FIELDS = (
+    'id', 'title', 'description', 'ingredients', 'steps', 'image_url',
+    'cooking_time', 'category', 'difficulty', 'author', 'rating', 'views',
+    'created_at', 'ingredients_preview',
+)
+
+USER_SUMMARY_FIELDS = ('id', 'username', 'is_admin', 'recipes_count')
+
+USER_FIELDS = ('id', 'username', 'email', 'is_admin', 'created_at', 'recipes_count')
+
+
+def make_recipe_summary(recipe):
+    """Карточка рецепта; вычисляется один раз при изменении рецепта"""
+    ingredients = recipe.get('ingredients') or []
+    preview = ', '.join(ingredients[:3])
+    if len(ingredients) > 3:
+        preview += '...'
+    summary = {field: recipe.get(field) for field in RECIPE_SUMMARY_FIELDS if field != 'ingredients_preview'}
+    summary['ingredients_preview'] = preview
+    return summary
+
+
+def parse_fields(fields, allowed):
+    """Разбор параметра fields: None - все поля, 'summary' - карточка,
+    список или строка через запятую - только указанные поля"""
+    if fields is None or fields == '':
+        return None
+    if fields == 'summary':
+        return 'summary'
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+    if not isinstance(fields, list) or not all(isinstance(f, str) for f in fields):
+        raise ValueError('fields: ожидается "summary", список полей или строка через запятую')
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f'fields: неизвестные поля: {", ".join(unknown)}')
+    return tuple(dict.fromkeys(fields))
+
+
+def project(record, fields):
+    """Оставляет в записи только указанные поля"""
+    return {field: record.get(field) for field in fields}
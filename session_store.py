@@ -0,0 +1,266 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Сессия, данные которой хранятся на сервере, а в cookie - только ID"""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at  # срок в хранилище (для продления)
+        self.previous_sid = None
+        self.modified = False
+
+    def regenerate(self):
+        """Выдает новый ID сессии (защита от фиксации сессии при входе)"""
+        if self.previous_sid is None and not self.new:
+            self.previous_sid = self.sid
+        self.sid = generate_session_id()
+        self.modified = True
+
+
+def generate_session_id():
+    """Генерирует компактный непредсказуемый ID сессии"""
+    return secrets.token_urlsafe(16)
+
+
+class MemorySessionStore:
+    """Хранилище сессий в памяти процесса с вытеснением по LRU"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # sid -> (expires_at, user_id, payload)
+        self._by_user = {}  # user_id -> set(sid)
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        """(данные, срок действия) или None"""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._remove(sid)
+                return None
+            self._entries.move_to_end(sid)
+            return entry[2], entry[0]
+
+    def set(self, sid, payload, expires_at, user_id=None):
+        with self._lock:
+            if sid in self._entries:
+                self._remove(sid)
+            self._entries[sid] = (expires_at, user_id, payload)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(sid)
+            while len(self._entries) > self.max_entries:
+                oldest_sid = next(iter(self._entries))
+                self._remove(oldest_sid)
+
+    def touch(self, sid, expires_at):
+        """Продлевает срок действия сессии без перезаписи данных"""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is not None:
+                self._entries[sid] = (expires_at, entry[1], entry[2])
+                self._entries.move_to_end(sid)
+
+    def delete(self, sid):
+        with self._lock:
+            self._remove(sid)
+
+    def delete_user(self, user_id):
+        """Отзывает все сессии пользователя"""
+        with self._lock:
+            for sid in list(self._by_user.get(user_id, ())):
+                self._remove(sid)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, sid):
+        entry = self._entries.pop(sid, None)
+        if entry is None:
+            return
+        user_id = entry[1]
+        if user_id is not None:
+            sids = self._by_user.get(user_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._by_user[user_id]
+
+
+class SqliteSessionStore:
+    """Хранилище сессий в SQLite, общее для нескольких воркеров"""
+
+    PURGE_EVERY = 500  # удаление просроченных сессий раз в N записей
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        self._inherited = []
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                ' sid TEXT PRIMARY KEY,'
+                ' user_id INTEGER,'
+                ' payload TEXT NOT NULL,'
+                ' expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)')
+
+    def after_fork(self):
+        """Воркер открывает свое соединение: соединение SQLite нельзя использовать после fork.
+        Унаследованное соединение не закрывается - это сняло бы блокировки родителя"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._inherited.append(conn)
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        """(данные, срок действия) или None"""
+        row = self._connect().execute(
+            'SELECT payload, expires_at FROM sessions WHERE sid = ?', (sid,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] < time.time():
+            self.delete(sid)
+            return None
+        return row[0], row[1]
+
+    def set(self, sid, payload, expires_at, user_id=None):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (sid, user_id, payload, expires_at) VALUES (?, ?, ?, ?)',
+                (sid, user_id, payload, expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute('DELETE FROM sessions WHERE expires_at < ?', (time.time(),))
+
+    def touch(self, sid, expires_at):
+        """Продлевает срок действия сессии без перезаписи данных"""
+        with self._connect() as conn:
+            conn.execute('UPDATE sessions SET expires_at = ? WHERE sid = ?', (expires_at, sid))
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def delete_user(self, user_id):
+        """Отзывает все сессии пользователя"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE user_id = ?', (user_id,))
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+
+class ServerSessionInterface(SessionInterface):
+    """Интерфейс сессий Flask поверх серверного хранилища"""
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            entry = self.store.get(sid)
+            if entry is not None:
+                payload, expires_at = entry
+                try:
+                    return self.session_class(self.serializer.loads(payload), sid=sid, expires_at=expires_at)
+                except ValueError:
+                    self.store.delete(sid)
+        return self.session_class(sid=generate_session_id(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+            session.previous_sid = None
+
+        # Пустую сессию не храним, cookie удаляем
+        if not session:
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        # Скользящий срок: сессия активного пользователя продлевается, как только
+        # прошла половина срока (а не при каждом запросе - меньше записей в хранилище)
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        if session.modified:
+            self.store.set(
+                session.sid,
+                self.serializer.dumps(dict(session)),
+                now + lifetime,
+                user_id=session.get('user_id')
+            )
+        elif (self.should_set_cookie(app, session)
+              or session.expires_at is None or session.expires_at - now < lifetime / 2):
+            self.store.touch(session.sid, now + lifetime)
+        else:
+            return
+        session.expires_at = now + lifetime
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def create_session_interface(config):
+    """Создает интерфейс сессий по SESSION_TYPE (None - стандартные cookie Flask)"""
+    session_type = config.get('SESSION_TYPE')
+    if session_type == 'memory':
+        store = MemorySessionStore(config.get('SESSION_MAX_ENTRIES', 10000))
+    elif session_type == 'sqlite':
+        store = SqliteSessionStore(config['SESSION_SQLITE_PATH'])
+    elif session_type == 'cookie':
+        return None
+    else:
+        raise ValueError(f'Неизвестный тип хранилища сессий: {session_type}')
+    return ServerSessionInterface(store)
@@ -0,0 +1,522 @@
+// Виртуальная таблица: в DOM только видимые строки, данные загружаются блоками по мере прокрутки
+class VirtualTable {
+    constructor(options) {
+        this.scroller = options.scroller;
+        this.body = options.body;
+        this.columns = options.columns;
+        this.rowHeight = options.rowHeight || 57;
+        this.blockSize = options.blockSize || 100;
+        this.overscan = options.overscan || 10;
+        this.fetchBlock = options.fetchBlock;  // (offset, limit) => Promise<{rows, total}>
+        this.renderRow = options.renderRow;
+        this.onTotal = options.onTotal || (() => {});
+        this.generation = 0;
+        this.frame = null;
+        
+        this.scroller.addEventListener('scroll', () => this.scheduleRender());
+        window.addEventListener('resize', () => this.scheduleRender());
+        this.reset();
+    }
+    
+    // Сброс после смены фильтров или сортировки
+    reset() {
+        this.generation += 1;
+        this.blocks = new Map();  // номер блока -> массив строк (null - загружается)
+        this.total = null;
+        this.scroller.scrollTop = 0;
+        this.loadBlock(0);
+        this.scheduleRender();
+    }
+    
+    loadBlock(number) {
+        if (this.blocks.has(number)) {
+            return;
+        }
+        const generation = this.generation;
+        this.blocks.set(number, null);
+        this.fetchBlock(number * this.blockSize, this.blockSize)
+            .then(({rows, total}) => {
+                if (generation !== this.generation) {
+                    return;
+                }
+                this.blocks.set(number, rows);
+                if (this.total !== total) {
+                    this.total = total;
+                    this.onTotal(total);
+                }
+                this.scheduleRender();
+            })
+            .catch(error => {
+                if (generation === this.generation) {
+                    this.blocks.delete(number);
+                }
+                console.error('Ошибка загрузки данных таблицы:', error);
+                App.showNotification('Не удалось загрузить данные таблицы', 'error');
+            });
+    }
+    
+    scheduleRender() {
+        if (this.frame !== null) {
+            return;
+        }
+        this.frame = requestAnimationFrame(() => {
+            this.frame = null;
+            this.render();
+        });
+    }
+    
+    spacer(height) {
+        return height > 0
+            ? `<tr class="spacer-row" style="height: ${height}px"><td colspan="${this.columns}"></td></tr>`
+            : '';
+    }
+    
+    render() {
+        if (this.total === null) {
+            this.body.innerHTML = `<tr class="placeholder-row"><td colspan="${this.columns}">Загрузка...</td></tr>`;
+            return;
+        }
+        if (this.total === 0) {
+            this.body.innerHTML = `<tr class="placeholder-row"><td colspan="${this.columns}">Ничего не найдено</td></tr>`;
+            return;
+        }
+        
+        const firstVisible = Math.floor(this.scroller.scrollTop / this.rowHeight);
+        const first = Math.max(0, firstVisible - this.overscan);
+        const visibleCount = Math.ceil(this.scroller.clientHeight / this.rowHeight);
+        const last = Math.min(this.total, firstVisible + visibleCount + this.overscan);
+        
+        let html = this.spacer(first * this.rowHeight);
+        for (let i = first; i < last; i++) {
+            const blockNumber = Math.floor(i / this.blockSize);
+            const block = this.blocks.get(blockNumber);
+            const row = block ? block[i % this.blockSize] : undefined;
+            if (row === undefined) {
+                this.loadBlock(blockNumber);
+                html += `<tr class="placeholder-row"><td colspan="${this.columns}">…</td></tr>`;
+            } else {
+                html += this.renderRow(row);
+            }
+        }
+        html += this.spacer((this.total - last) * this.rowHeight);
+        this.body.innerHTML = html;
+    }
+}
+
+function escapeHtml(value) {
+    return String(value === null || value === undefined ? '' : value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+// Адреса маршрутов (шаблоны с id = 0) из data-атрибутов .admin-container
+const URLS = (({ urlDetail, urlEdit, urlFix, urlRemove }) => ({
+    detail: urlDetail,
+    edit: urlEdit,
+    fix: urlFix,
+    remove: urlRemove
+}))(document.querySelector('.admin-container').dataset);
+
+function recipeUrl(template, id) {
+    return template.slice(0, -1) + encodeURIComponent(id);
+}
+
+async function fetchRecipes(method, params) {
+    const data = await App.callJsonRpc(method, params);
+    if (data.error) {
+        throw new Error(data.error.message);
+    }
+    return {rows: data.result.recipes, total: data.result.total};
+}
+
+function difficultyBadge(difficulty) {
+    const classes = {'Легкая': 'easy-badge', 'Средняя': 'medium-badge'};
+    return `<span class="badge ${classes[difficulty] || 'hard-badge'}">${escapeHtml(difficulty)}</span>`;
+}
+
+function ratingStars(rating) {
+    let stars = '';
+    for (let i = 0; i < 5; i++) {
+        stars += i < Math.trunc(rating || 0) ? '<i class="fas fa-star"></i>' : '<i class="far fa-star"></i>';
+    }
+    return `
+        <div class="rating-display">
+            <div class="stars">${stars}</div>
+            <span class="rating-value">${escapeHtml(rating)}</span>
+        </div>`;
+}
+
+function actionButtons(recipe, withFix) {
+    const fixForm = withFix ? `
+        <form method="POST" action="${recipeUrl(URLS.fix, recipe.id)}" style="display: inline;">
+            <button type="submit" class="btn-action fix-btn" title="Исправить время">
+                <i class="fas fa-wrench"></i>
+            </button>
+        </form>` : '';
+    return `
+        <div class="action-buttons">
+            <a href="${recipeUrl(URLS.detail, recipe.id)}" target="_blank" class="btn-action view-btn" title="Просмотреть">
+                <i class="fas fa-eye"></i>
+            </a>
+            <a href="${recipeUrl(URLS.edit, recipe.id)}" class="btn-action edit-btn" title="Редактировать">
+                <i class="fas fa-edit"></i>
+            </a>
+            ${fixForm}
+            <form method="POST" action="${recipeUrl(URLS.remove, recipe.id)}" style="display: inline;">
+                <button type="submit" class="btn-action delete-btn" title="Удалить" data-title="${escapeHtml(recipe.title)}">
+                    <i class="fas fa-trash"></i>
+                </button>
+            </form>
+        </div>`;
+}
+
+function renderRecipeRow(recipe) {
+    const time = recipe.cooking_time <= 0
+        ? `<span class="error-text">${escapeHtml(recipe.cooking_time)} мин</span>`
+        : `${escapeHtml(recipe.cooking_time)} мин`;
+    return `
+        <tr class="recipe-row" data-id="${escapeHtml(recipe.id)}">
+            <td>${escapeHtml(recipe.id)}</td>
+            <td>
+                <a href="${recipeUrl(URLS.detail, recipe.id)}" target="_blank" class="recipe-link">${escapeHtml(recipe.title)}</a>
+                <button class="quick-view-btn" title="Быстрый просмотр изображения"
+                        data-id="${escapeHtml(recipe.id)}"
+                        data-title="${escapeHtml(recipe.title)}"
+                        data-image="${escapeHtml(recipe.image_url)}">
+                    <i class="fas fa-image"></i>
+                </button>
+            </td>
+            <td>${escapeHtml(recipe.author)}</td>
+            <td><span class="category-badge">${escapeHtml(recipe.category)}</span></td>
+            <td>${time}</td>
+            <td>${difficultyBadge(recipe.difficulty)}</td>
+            <td>${escapeHtml(recipe.views)}</td>
+            <td>${ratingStars(recipe.rating)}</td>
+            <td>${actionButtons(recipe, false)}</td>
+        </tr>`;
+}
+
+function renderInvalidRow(recipe) {
+    return `
+        <tr class="invalid-row">
+            <td>${escapeHtml(recipe.id)}</td>
+            <td>
+                <a href="${recipeUrl(URLS.detail, recipe.id)}" target="_blank" class="recipe-link">${escapeHtml(recipe.title)}</a>
+            </td>
+            <td class="error-cell">${escapeHtml(recipe.cooking_time)} мин</td>
+            <td>${escapeHtml(recipe.author)}</td>
+            <td>${escapeHtml(recipe.category)}</td>
+            <td>${actionButtons(recipe, true)}</td>
+        </tr>`;
+}
+
+function renderUserRow(user) {
+    const role = user.is_admin
+        ? '<span class="badge admin-badge">Админ</span>'
+        : '<span class="badge user-badge">Пользователь</span>';
+    return `
+        <tr>
+            <td>${escapeHtml(user.id)}</td>
+            <td>${escapeHtml(user.username)}</td>
+            <td>${escapeHtml(user.email || 'Не указан')}</td>
+            <td>${role}</td>
+            <td>${escapeHtml(user.created_at)}</td>
+        </tr>`;
+}
+
+// Счетчики рецептов и пользователей обновляются событиями сервера
+document.addEventListener('DOMContentLoaded', function() {
+    const settings = document.querySelector('.admin-container').dataset;
+    window.App.connectLiveEvents({
+        stats(stats) {
+            Object.entries(stats).forEach(([key, value]) => {
+                const element = document.querySelector(`[data-stat="${key}"]`);
+                if (element) element.textContent = value;
+            });
+        }
+    }, settings.liveEvents, Number(settings.pollInterval));
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+    const RECIPE_FIELDS = ['id', 'title', 'author', 'category', 'cooking_time',
+                           'difficulty', 'views', 'rating', 'image_url'];
+    
+    // ПРОБЛЕМНЫЕ РЕЦЕПТЫ
+    const invalidScroll = document.getElementById('invalidScroll');
+    if (invalidScroll) {
+        new VirtualTable({
+            scroller: invalidScroll,
+            body: document.getElementById('invalidBody'),
+            columns: 6,
+            blockSize: 50,
+            fetchBlock: (offset, limit) => fetchRecipes('admin_get_invalid_recipes', {
+                offset, limit, fields: ['id', 'title', 'cooking_time', 'author', 'category']
+            }),
+            renderRow: renderInvalidRow
+        });
+    }
+    
+    // ВСЕ РЕЦЕПТЫ: поиск, фильтр и сортировка выполняются на сервере
+    const searchInput = document.getElementById('recipeSearch');
+    const categoryFilter = document.getElementById('categoryFilter');
+    const resetButton = document.getElementById('resetFilters');
+    const sortHeaders = document.querySelectorAll('#recipesTable th.sortable');
+    const sortState = {sort: 'id', order: 'asc'};
+    
+    const recipesTable = new VirtualTable({
+        scroller: document.getElementById('recipesScroll'),
+        body: document.getElementById('recipesBody'),
+        columns: 9,
+        fetchBlock: (offset, limit) => fetchRecipes('admin_list_recipes', {
+            offset, limit,
+            sort: sortState.sort,
+            order: sortState.order,
+            search: searchInput.value,
+            category: categoryFilter.value,
+            fields: RECIPE_FIELDS
+        }),
+        renderRow: renderRecipeRow,
+        onTotal: total => {
+            document.getElementById('shownCount').textContent = total;
+        }
+    });
+    
+    function updateSortHeaders() {
+        sortHeaders.forEach(th => {
+            th.classList.toggle('asc', th.dataset.sort === sortState.sort && sortState.order === 'asc');
+            th.classList.toggle('desc', th.dataset.sort === sortState.sort && sortState.order === 'desc');
+        });
+    }
+    
+    sortHeaders.forEach(th => {
+        th.addEventListener('click', function() {
+            if (sortState.sort === th.dataset.sort) {
+                sortState.order = sortState.order === 'asc' ? 'desc' : 'asc';
+            } else {
+                sortState.sort = th.dataset.sort;
+                sortState.order = 'asc';
+            }
+            updateSortHeaders();
+            recipesTable.reset();
+        });
+    });
+    updateSortHeaders();
+    
+    searchInput.addEventListener('input', App.debounce(() => recipesTable.reset(), 300));
+    categoryFilter.addEventListener('change', () => recipesTable.reset());
+    
+    resetButton.addEventListener('click', function() {
+        searchInput.value = '';
+        categoryFilter.value = '';
+        recipesTable.reset();
+    });
+    
+    // ПОЛЬЗОВАТЕЛИ
+    const userSearch = document.getElementById('userSearch');
+    const usersTable = new VirtualTable({
+        scroller: document.getElementById('usersScroll'),
+        body: document.getElementById('usersBody'),
+        columns: 5,
+        fetchBlock: async (offset, limit) => {
+            const data = await App.callJsonRpc('admin_get_all_users', {
+                offset, limit,
+                search: userSearch.value,
+                fields: ['id', 'username', 'email', 'is_admin', 'created_at']
+            });
+            if (data.error) {
+                throw new Error(data.error.message);
+            }
+            return {rows: data.result.users, total: data.result.total};
+        },
+        renderRow: renderUserRow,
+        onTotal: total => {
+            document.getElementById('usersCount').textContent = total;
+        }
+    });
+    userSearch.addEventListener('input', App.debounce(() => usersTable.reset(), 300));
+    
+    // Подтверждение удаления и быстрый просмотр (делегирование: строки перерисовываются)
+    document.querySelector('.admin-sections').addEventListener('click', function(e) {
+        const deleteButton = e.target.closest('.delete-btn');
+        if (deleteButton && !confirm(`Удалить рецепт «${deleteButton.dataset.title}»?`)) {
+            e.preventDefault();
+            return;
+        }
+        
+        const quickViewButton = e.target.closest('.quick-view-btn');
+        if (quickViewButton) {
+            e.preventDefault();
+            showImagePreview(quickViewButton.dataset.id, quickViewButton.dataset.title, quickViewButton.dataset.image);
+        }
+    });
+    
+    // УВЕДОМЛЕНИЯ
+    // Проверяем, есть ли флеш-сообщения от Flask
+    const flashMessages = document.querySelectorAll('.flash-message');
+    flashMessages.forEach(msg => {
+        setTimeout(() => {
+            msg.style.opacity = '0';
+            msg.style.transform = 'translateY(-10px)';
+            setTimeout(() => msg.remove(), 300);
+        }, 5000);
+    });
+    
+    function showImagePreview(recipeId, recipeTitle, imageUrl) {
+        imageUrl = imageUrl || `https://source.unsplash.com/400x300/?food,recipe&sig=${recipeId}`;
+        
+        // Создать модальное окно
+        const modal = document.createElement('div');
+        modal.className = 'image-modal';
+        modal.innerHTML = `
+            <div class="modal-content">
+                <div class="modal-header">
+                    <h3>${escapeHtml(recipeTitle)}</h3>
+                    <button class="modal-close">&times;</button>
+                </div>
+                <div class="modal-body">
+                    <img src="${escapeHtml(imageUrl)}" alt="${escapeHtml(recipeTitle)}" onerror="this.src='https://source.unsplash.com/400x300/?food'">
+                </div>
+                <div class="modal-footer">
+                    <a href="${recipeUrl(URLS.edit, recipeId)}" class="btn-edit-image">
+                        <i class="fas fa-edit"></i> Изменить изображение
+                    </a>
+                    <button class="btn-close-modal">Закрыть</button>
+                </div>
+            </div>
+        `;
+        
+        document.body.appendChild(modal);
+        
+        // Стили для модального окна
+        const style = document.createElement('style');
+        style.textContent = `
+            .image-modal {
+                position: fixed;
+                top: 0;
+                left: 0;
+                width: 100%;
+                height: 100%;
+                background: rgba(0, 0, 0, 0.8);
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                z-index: 10000;
+                animation: fadeIn 0.3s ease;
+            }
+            
+            @keyframes fadeIn {
+                from { opacity: 0; }
+                to { opacity: 1; }
+            }
+            
+            .image-modal .modal-content {
+                background: white;
+                border-radius: 15px;
+                width: 90%;
+                max-width: 500px;
+                animation: slideUp 0.3s ease;
+            }
+            
+            @keyframes slideUp {
+                from { transform: translateY(50px); opacity: 0; }
+                to { transform: translateY(0); opacity: 1; }
+            }
+            
+            .image-modal .modal-header {
+                display: flex;
+                justify-content: space-between;
+                align-items: center;
+                padding: 20px;
+                border-bottom: 1px solid #e0e0e0;
+            }
+            
+            .image-modal .modal-header h3 {
+                margin: 0;
+                color: #333;
+            }
+            
+            .image-modal .modal-close {
+                background: none;
+                border: none;
+                font-size: 24px;
+                color: #666;
+                cursor: pointer;
+                line-height: 1;
+            }
+            
+            .image-modal .modal-body {
+                padding: 20px;
+                text-align: center;
+            }
+            
+            .image-modal .modal-body img {
+                max-width: 100%;
+                max-height: 300px;
+                border-radius: 10px;
+                box-shadow: 0 5px 15px rgba(0, 0, 0, 0.2);
+            }
+            
+            .image-modal .modal-footer {
+                padding: 20px;
+                border-top: 1px solid #e0e0e0;
+                display: flex;
+                gap: 10px;
+                justify-content: flex-end;
+            }
+            
+            .image-modal .btn-edit-image {
+                padding: 10px 20px;
+                background: #667eea;
+                color: white;
+                text-decoration: none;
+                border-radius: 8px;
+                display: flex;
+                align-items: center;
+                gap: 8px;
+                font-weight: 500;
+            }
+            
+            .image-modal .btn-close-modal {
+                padding: 10px 20px;
+                background: #6c757d;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                cursor: pointer;
+                font-weight: 500;
+            }
+        `;
+        
+        document.head.appendChild(style);
+        
+        // Обработчики закрытия
+        const closeModal = () => {
+            modal.style.animation = 'fadeOut 0.3s ease';
+            modal.style.opacity = '0';
+            setTimeout(() => {
+                modal.remove();
+                style.remove();
+            }, 300);
+        };
+        
+        modal.querySelector('.modal-close').addEventListener('click', closeModal);
+        modal.querySelector('.btn-close-modal').addEventListener('click', closeModal);
+        
+        // Закрытие при клике вне окна
+        modal.addEventListener('click', (e) => {
+            if (e.target === modal) {
+                closeModal();
+            }
+        });
+        
+        // Закрытие по ESC
+        document.addEventListener('keydown', (e) => {
+            if (e.key === 'Escape') {
+                closeModal();
+            }
+        });
+    }
+});
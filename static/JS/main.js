@@ -202,6 +202,29 @@ async function callJsonRpc(method, params = {}) {
     }
 }
 
+// Несколько вызовов одним HTTP-запросом (пакет JSON-RPC 2.0).
+// calls: [{method, params}], результат - ответы в том же порядке
+async function callJsonRpcBatch(calls) {
+    const baseId = Date.now();
+    const response = await fetch('/api', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(calls.map((call, index) => ({
+            jsonrpc: '2.0',
+            method: call.method,
+            params: call.params || {},
+            id: baseId + index
+        })))
+    });
+    
+    const results = await response.json();
+    const byId = {};
+    results.forEach(item => { byId[item.id] = item; });
+    return calls.map((call, index) => byId[baseId + index]);
+}
+
 function debounce(func, wait) {
     let timeout;
     return function executedFunction(...args) {
@@ -222,11 +245,60 @@ function formatTime(minutes) {
     const mins = minutes % 60;
     return mins > 0 ? `${hours}ч ${mins}мин` : `${hours}ч`;
 }
+// Живые счетчики. mode (live_events_mode() на сервере):
+//   sse  - поток /api/events: при подключении вся статистика, дальше только изменения;
+//          если поток недоступен (503) - опрос
+//   poll - опрос /api/current_stats раз в pollInterval секунд
+//   once - один запрос /api/current_stats
+function connectLiveEvents(handlers, mode = 'once', pollInterval = 60) {
+    const loadOnce = () => fetch('/api/current_stats')
+        .then(response => response.json())
+        .then(data => {
+            if (data.success && handlers.stats) {
+                handlers.stats({
+                    recipes_count: data.stats.recipes,
+                    users_count: data.stats.users,
+                    total_cooking_time: data.stats.cooking_time,
+                    categories_count: data.stats.categories
+                });
+            }
+        })
+        .catch(error => console.error('Ошибка загрузки статистики:', error));
+
+    const poll = () => {
+        loadOnce();
+        return setInterval(loadOnce, pollInterval * 1000);
+    };
+
+    if (mode === 'once') {
+        loadOnce();
+        return null;
+    }
+    if (mode !== 'sse' || !window.EventSource) {
+        poll();
+        return null;
+    }
+    const source = new EventSource('/api/events');
+    ['stats', 'recipe', 'reset'].forEach(type => {
+        source.addEventListener(type, event => {
+            if (handlers[type]) handlers[type](JSON.parse(event.data));
+        });
+    });
+    source.onerror = () => {
+        // Браузер переподключается сам; закрытый поток (503: поток отключен или
+        // превышено число подписчиков) не восстанавливается - переходим на опрос
+        if (source.readyState === EventSource.CLOSED) poll();
+    };
+    return source;
+}
+
 window.App = {
     callJsonRpc,
+    callJsonRpcBatch,
     showNotification,
     formatTime,
-    debounce
+    debounce,
+    connectLiveEvents
 };
 
 // Динамическая загрузка статистики
@@ -243,8 +315,11 @@ async function loadStats() {
             if (el) el.textContent = '...';
         });
 
-        // 1. Загружаем общую статистику
-        const statsResponse = await App.callJsonRpc('get_recipes_count', {});
+        // Статистика и самый популярный рецепт - одним пакетным запросом
+        const [statsResponse, popularResponse] = await App.callJsonRpcBatch([
+            { method: 'get_recipes_count' },
+            { method: 'get_popular_recipes', params: { count: 1, fields: ['title', 'views'] } }
+        ]);
         
         if (statsResponse.result) {
             const stats = statsResponse.result;
@@ -260,8 +335,7 @@ async function loadStats() {
             document.getElementById('total-views').textContent = 
                 stats.total_views.toLocaleString();
             
-            // 2. Загружаем самый популярный рецепт
-            const popularResponse = await App.callJsonRpc('get_popular_recipes', { count: 1 });
+            // Самый популярный рецепт
             if (popularResponse.result?.recipes?.length > 0) {
                 const recipe = popularResponse.result.recipes[0];
                 document.getElementById('most-popular').textContent = recipe.title;
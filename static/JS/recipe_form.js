@@ -0,0 +1,110 @@
+function showDeleteModal() {
+    document.getElementById('deleteModal').style.display = 'flex';
+}
+
+function closeDeleteModal() {
+    document.getElementById('deleteModal').style.display = 'none';
+}
+
+// Закрытие модального окна при клике вне его
+window.onclick = function(event) {
+    const modal = document.getElementById('deleteModal');
+    if (event.target === modal) {
+        closeDeleteModal();
+    }
+}
+
+// Закрытие модального окна при нажатии ESC
+document.addEventListener('keydown', function(event) {
+    if (event.key === 'Escape') {
+        closeDeleteModal();
+    }
+});
+
+// Подсчет символов для полей с ограничением
+function setupCharacterCounters() {
+    const titleInput = document.getElementById('title');
+    const descriptionInput = document.getElementById('description');
+    const stepsInput = document.getElementById('steps');
+    
+    function updateCounter(input, maxLength) {
+        const counter = document.createElement('div');
+        counter.className = 'char-counter';
+        counter.style.fontSize = '12px';
+        counter.style.color = '#888';
+        counter.style.marginTop = '5px';
+        counter.style.textAlign = 'right';
+        
+        input.parentNode.appendChild(counter);
+        
+        function update() {
+            const length = input.value.length;
+            counter.textContent = `${length}/${maxLength} символов`;
+            
+            if (length > maxLength * 0.9) {
+                counter.style.color = '#ff4757';
+                counter.style.fontWeight = '600';
+            } else if (length > maxLength * 0.7) {
+                counter.style.color = '#ffa502';
+            } else {
+                counter.style.color = '#888';
+                counter.style.fontWeight = 'normal';
+            }
+        }
+        
+        input.addEventListener('input', update);
+        update(); // Инициализация
+    }
+    
+    if (titleInput) updateCounter(titleInput, 200);
+    if (descriptionInput) updateCounter(descriptionInput, 1000);
+    if (stepsInput) updateCounter(stepsInput, 5000);
+}
+
+// Инициализация при загрузке страницы
+document.addEventListener('DOMContentLoaded', function() {
+    setupCharacterCounters();
+    
+    // Валидация времени приготовления
+    const cookingTimeInput = document.getElementById('cooking_time');
+    if (cookingTimeInput) {
+        cookingTimeInput.addEventListener('input', function() {
+            const value = parseInt(this.value);
+            if (value <= 0) {
+                this.style.borderColor = '#ff4757';
+            } else {
+                this.style.borderColor = value > 1440 ? '#ff4757' : '#e0e0e0';
+            }
+        });
+    }
+    
+    // Валидация рейтинга
+    const ratingInput = document.getElementById('rating');
+    if (ratingInput) {
+        ratingInput.addEventListener('input', function() {
+            const value = parseFloat(this.value);
+            if (value < 0 || value > 5) {
+                this.style.borderColor = '#ff4757';
+            } else {
+                this.style.borderColor = '#e0e0e0';
+            }
+        });
+    }
+    
+    // Предварительный просмотр URL изображения
+    const imageUrlInput = document.getElementById('image_url');
+    if (imageUrlInput) {
+        imageUrlInput.addEventListener('blur', function() {
+            if (this.value.trim()) {
+                const img = new Image();
+                img.onload = function() {
+                    console.log('Изображение загружено');
+                };
+                img.onerror = function() {
+                    console.log('Ошибка загрузки изображения');
+                };
+                img.src = this.value;
+            }
+        });
+    }
+});
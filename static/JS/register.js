@@ -0,0 +1,209 @@
+
+function togglePassword(fieldId) {
+    const passwordInput = document.getElementById(fieldId);
+    const toggleButton = passwordInput.parentNode.querySelector('.toggle-password i');
+    
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        toggleButton.classList.remove('fa-eye');
+        toggleButton.classList.add('fa-eye-slash');
+    } else {
+        passwordInput.type = 'password';
+        toggleButton.classList.remove('fa-eye-slash');
+        toggleButton.classList.add('fa-eye');
+    }
+}
+
+const usernameInput = document.getElementById('username');
+const usernameValidation = document.getElementById('usernameValidation');
+
+if (usernameInput) {
+    usernameInput.addEventListener('input', function() {
+        const username = this.value;
+        const isValid = /^[A-Za-z0-9_!@#$%^&*()]{3,20}$/.test(username);
+        
+        if (username.length > 0 && isValid) {
+            usernameValidation.classList.add('visible');
+        } else {
+            usernameValidation.classList.remove('visible');
+        }
+        
+        updateProgress();
+    });
+}
+
+const passwordInput = document.getElementById('password');
+const confirmPasswordInput = document.getElementById('confirm_password');
+const confirmValidation = document.getElementById('confirmValidation');
+const passwordStrength = document.getElementById('passwordStrength');
+const strengthBars = passwordStrength.querySelectorAll('.strength-bar');
+
+function calculatePasswordStrength(password) {
+    let strength = 0;
+    
+    if (password.length >= 6) strength++;
+    if (/[A-Z]/.test(password)) strength++;
+    if (/[0-9]/.test(password)) strength++;
+    if (/[!@#$%^&*()]/.test(password)) strength++;
+    
+    return Math.min(strength, 4);
+}
+
+function updatePasswordStrength() {
+    const password = passwordInput.value;
+    const strength = calculatePasswordStrength(password);
+    
+    strengthBars.forEach((bar, index) => {
+        bar.className = 'strength-bar';
+        if (index < strength) {
+            if (strength === 1) bar.classList.add('weak');
+            else if (strength === 2) bar.classList.add('fair');
+            else if (strength === 3) bar.classList.add('good');
+            else if (strength === 4) bar.classList.add('strong');
+        }
+    });
+}
+
+if (passwordInput) {
+    passwordInput.addEventListener('input', function() {
+        updatePasswordStrength();
+        checkPasswordMatch();
+        updateProgress();
+    });
+}
+
+function checkPasswordMatch() {
+    const password = passwordInput.value;
+    const confirmPassword = confirmPasswordInput.value;
+    
+    if (confirmPassword.length > 0 && password === confirmPassword) {
+        confirmValidation.classList.add('visible');
+        confirmPasswordInput.style.borderColor = '#2ecc71';
+    } else {
+        confirmValidation.classList.remove('visible');
+        if (confirmPassword.length > 0) {
+            confirmPasswordInput.style.borderColor = '#ff4757';
+        } else {
+            confirmPasswordInput.style.borderColor = '#e0e0e0';
+        }
+    }
+}
+
+if (confirmPasswordInput) {
+    confirmPasswordInput.addEventListener('input', function() {
+        checkPasswordMatch();
+        updateProgress();
+    });
+}
+
+function updateProgress() {
+    const steps = document.querySelectorAll('.step');
+    const progressFill = document.getElementById('progressFill');
+    const submitBtn = document.getElementById('submitBtn');
+    
+    let completedSteps = 0;
+
+    const username = usernameInput.value;
+    if (username.length >= 3 && /^[A-Za-z0-9_!@#$%^&*()]+$/.test(username)) {
+        steps[0].classList.add('completed');
+        steps[1].classList.add('active');
+        completedSteps++;
+    } else {
+        steps[0].classList.remove('completed');
+        steps[1].classList.remove('active');
+    }
+
+    const password = passwordInput.value;
+    const confirmPassword = confirmPasswordInput.value;
+    if (password.length >= 6 && password === confirmPassword && confirmPassword.length > 0) {
+        steps[1].classList.add('completed');
+        steps[2].classList.add('active');
+        completedSteps++;
+    } else {
+        steps[1].classList.remove('completed');
+        steps[2].classList.remove('active');
+    }
+    
+    const termsCheckbox = document.getElementById('termsCheckbox');
+    if (termsCheckbox && termsCheckbox.checked) {
+        steps[2].classList.add('completed');
+        completedSteps++;
+    } else {
+        steps[2].classList.remove('completed');
+    }
+
+    const progress = (completedSteps / 3) * 100;
+    progressFill.style.width = `${progress}%`;
+    
+    if (completedSteps === 3) {
+        submitBtn.disabled = false;
+    } else {
+        submitBtn.disabled = true;
+    }
+}
+
+const termsCheckbox = document.getElementById('termsCheckbox');
+if (termsCheckbox) {
+    termsCheckbox.addEventListener('change', updateProgress);
+}
+
+document.getElementById('registerForm').addEventListener('submit', function(e) {
+    const username = usernameInput.value;
+    const password = passwordInput.value;
+    const confirmPassword = confirmPasswordInput.value;
+    const termsChecked = termsCheckbox.checked;
+    
+    if (!/^[A-Za-z0-9_!@#$%^&*()]{3,20}$/.test(username)) {
+        e.preventDefault();
+        alert('Имя пользователя должно содержать 3-20 символов (латинские буквы, цифры и символы: _!@#$%^&*())');
+        usernameInput.focus();
+        return false;
+    }
+    
+    if (password.length < 6) {
+        e.preventDefault();
+        alert('Пароль должен содержать минимум 6 символов');
+        passwordInput.focus();
+        return false;
+    }
+    
+    if (!/^[A-Za-z0-9_!@#$%^&*()]+$/.test(password)) {
+        e.preventDefault();
+        alert('Пароль может содержать только латинские буквы, цифры и символы: _!@#$%^&*()');
+        passwordInput.focus();
+        return false;
+    }
+
+    if (password !== confirmPassword) {
+        e.preventDefault();
+        alert('Пароли не совпадают');
+        confirmPasswordInput.focus();
+        return false;
+    }
+
+    if (!termsChecked) {
+        e.preventDefault();
+        alert('Необходимо принять условия использования');
+        return false;
+    }
+    
+    return true;
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+    setTimeout(() => {
+        usernameInput.focus();
+    }, 300);
+
+    const elements = document.querySelectorAll('.register-form-container > *');
+    elements.forEach((el, index) => {
+        el.style.opacity = '0';
+        el.style.transform = 'translateY(20px)';
+        
+        setTimeout(() => {
+            el.style.transition = 'opacity 0.5s ease, transform 0.5s ease';
+            el.style.opacity = '1';
+            el.style.transform = 'translateY(0)';
+        }, 100 + (index * 100));
+    });
+});
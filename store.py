@@ -0,0 +1,231 @@
+"""Общее хранилище рецептов и пользователей: снимки для чтения, один писатель"""
+import threading
+from contextlib import contextmanager
+
+import data_manager
+from indexes import CatalogIndex
+
+
+class DataStore:
+    """Рецепты и пользователи приложения
+
+    store.recipes и store.users - неизменяемые снимки (кортежи): читатель берет
+    текущий снимок без блокировок, и он не меняется, пока читатель с ним работает.
+    Записи рецептов и пользователей внутри снимка тоже не меняются: писатель
+    заменяет их измененными копиями. Исключение - счетчик просмотров, который
+    увеличивается на месте (record_view) и не влияет на версию рецепта.
+
+    Изменения выполняются только внутри store.write(), по одному писателю за раз.
+    Новый снимок публикуется при выходе из блока, после чего обновляется индекс
+    и файлы данных; при исключении изменения блока отбрасываются целиком.
+    """
+
+    def __init__(self, recipes, users):
+        self.recipes = tuple(recipes)
+        self.users = tuple(users)
+        self.index = CatalogIndex(self.recipes, self.users)
+        # id рецептов только растут, поэтому id удаленного рецепта не достанется новому
+        self.last_recipe_id = max((r['id'] for r in self.recipes), default=0)
+        self._write_lock = threading.RLock()
+        self._writer = None
+        # Обработчики опубликованных изменений рецептов (под блокировкой писателя,
+        # в порядке публикации): callback([('upsert' | 'delete', recipe)])
+        self.change_listeners = []
+        # Обработчики всех событий блока записи (рецепты и пользователи, для аудита):
+        # callback([(вид события, запись, ...)]); record_view передает [('recipe_viewed', recipe)]
+        self.event_listeners = []
+        # Запись в файлы: изменения, дождавшиеся своей очереди, сохраняются одной записью
+        self._save_lock = threading.Lock()
+        self._dirty_lock = threading.Lock()
+        self._dirty = set()
+        self._deferred = threading.local()
+
+    def get_recipe(self, recipe_id):
+        return self.index.recipes_by_id.get(recipe_id)
+
+    def get_user(self, user_id):
+        return self.index.users_by_id.get(user_id)
+
+    @contextmanager
+    def write(self):
+        """Блок изменений; вложенные блоки используют черновик внешнего"""
+        with self._write_lock:
+            if self._writer is not None:
+                yield self._writer
+                return
+            writer = self._writer = StoreWriter(self)
+            try:
+                yield writer
+            finally:
+                self._writer = None
+            changed = writer.publish()
+        self._save(*changed)
+
+    def record_view(self, recipe_id):
+        """Засчитывает просмотр рецепта; возвращает рецепт или None"""
+        with self._write_lock:
+            recipe = self.index.recipes_by_id.get(recipe_id)
+            if recipe is None:
+                return None
+            recipe['views'] = recipe.get('views', 0) + 1
+            self.index.recipe_viewed(recipe)
+            for listener in self.event_listeners:
+                listener([('recipe_viewed', recipe)])
+        self._save('recipes')
+        return recipe
+
+    # ========== Сохранение ==========
+
+    @contextmanager
+    def deferred_save(self):
+        """Откладывает запись файлов до выхода из блока: сколько бы ни было изменений
+        внутри, каждый файл записывается не более одного раза"""
+        if getattr(self._deferred, 'kinds', None) is not None:
+            yield
+            return
+        self._deferred.kinds = set()
+        try:
+            yield
+        finally:
+            kinds, self._deferred.kinds = self._deferred.kinds, None
+            if kinds:
+                self._save(*kinds)
+
+    def _save(self, *kinds):
+        """Записывает в файлы последний опубликованный снимок"""
+        pending = getattr(self._deferred, 'kinds', None)
+        if pending is not None:
+            pending.update(kinds)
+            return
+        with self._dirty_lock:
+            self._dirty.update(kinds)
+        with self._save_lock:
+            with self._dirty_lock:
+                kinds, self._dirty = self._dirty, set()
+            if 'users' in kinds:
+                data_manager.save_users(self.users)
+            if 'recipes' in kinds:
+                data_manager.save_recipes(self.recipes)
+
+
+class StoreWriter:
+    """Черновик изменений внутри DataStore.write()
+
+    recipes и users - копии текущих снимков, создаются при первом обращении.
+    Индекс обновляется только после публикации снимка.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._recipes = None
+        self._users = None
+        self._recipe_positions = None
+        self._events = []
+
+    @property
+    def recipes(self):
+        if self._recipes is None:
+            self._recipes = list(self._store.recipes)
+        return self._recipes
+
+    @property
+    def users(self):
+        if self._users is None:
+            self._users = list(self._store.users)
+        return self._users
+
+    # ========== Рецепты ==========
+
+    def next_recipe_id(self):
+        return self._store.last_recipe_id + 1
+
+    def add_recipe(self, recipe):
+        self.recipes.append(recipe)
+        self._store.last_recipe_id = max(self._store.last_recipe_id, recipe['id'])
+        if self._recipe_positions is not None:
+            self._recipe_positions[recipe['id']] = len(self._recipes) - 1
+        self._events.append(('recipe_added', recipe))
+
+    def update_recipe(self, recipe_id, changes):
+        """Заменяет рецепт копией с новыми значениями полей; возвращает копию или None"""
+        if self._recipe_positions is None:
+            self._recipe_positions = {r['id']: i for i, r in enumerate(self.recipes)}
+        position = self._recipe_positions.get(recipe_id)
+        if position is None:
+            return None
+        old = self._recipes[position]
+        recipe = dict(old)
+        recipe.update(changes)
+        self._recipes[position] = recipe
+        self._events.append(('recipe_updated', recipe, old.get('author'), sorted(changes)))
+        return recipe
+
+    def remove_recipes(self, predicate):
+        """Удаляет рецепты, для которых predicate(recipe) истинно; возвращает удаленные"""
+        kept = []
+        removed = []
+        for recipe in self.recipes:
+            (removed if predicate(recipe) else kept).append(recipe)
+        if removed:
+            self._recipes = kept
+            self._recipe_positions = None
+            self._events.extend(('recipe_removed', recipe) for recipe in removed)
+        return removed
+
+    # ========== Пользователи ==========
+
+    def next_user_id(self):
+        return max((u['id'] for u in self.users), default=0) + 1
+
+    def add_user(self, user):
+        self.users.append(user)
+        self._events.append(('user_added', user))
+
+    def update_user(self, user_id, changes):
+        """Заменяет пользователя копией с новыми значениями полей; возвращает копию или None"""
+        for position, old in enumerate(self.users):
+            if old['id'] == user_id:
+                user = dict(old)
+                user.update(changes)
+                self._users[position] = user
+                self._events.append(('user_updated', user, sorted(changes)))
+                return user
+        return None
+
+    def remove_user(self, user_id):
+        """Удаляет пользователя; возвращает удаленную запись или None"""
+        for position, user in enumerate(self.users):
+            if user['id'] == user_id:
+                del self._users[position]
+                self._events.append(('user_removed', user))
+                return user
+        return None
+
+    def publish(self):
+        """Публикует новые снимки и обновляет индекс; возвращает измененные виды данных"""
+        if not self._events:
+            return ()
+        store = self._store
+        changed = {'recipes' if event[0].startswith('recipe') else 'users' for event in self._events}
+        if 'recipes' in changed:
+            store.recipes = tuple(self._recipes)
+        if 'users' in changed:
+            store.users = tuple(self._users)
+
+        index = store.index
+        for event in self._events:
+            kind = event[0]
+            if kind == 'recipe_updated':
+                index.recipe_updated(event[1], old_author=event[2])
+            else:
+                getattr(index, kind)(event[1])
+
+        for listener in store.event_listeners:
+            listener(self._events)
+
+        changes = [('delete' if event[0] == 'recipe_removed' else 'upsert', event[1])
+                   for event in self._events if event[0].startswith('recipe')]
+        if changes:
+            for listener in store.change_listeners:
+                listener(changes)
+        return tuple(changed)
@@ -0,0 +1,156 @@
+"""Кэширование шаблонов: байт-код на диске, фрагменты {% cache 'имя', зависимость, ... %}"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import nodes, FileSystemBytecodeCache, Undefined
+from jinja2.ext import Extension
+
+_SIMPLE_TYPES = (str, int, float, bool, type(None))
+
+
+class FragmentLRU:
+    """Ограниченный LRU-кэш отрендеренных фрагментов"""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FragmentCacheExtension(Extension):
+    """Тег {% cache %}: первый аргумент - имя фрагмента, остальные - зависимости.
+
+    Зависимости превращаются в ключ функцией environment.fragment_cache_key;
+    если она вернула None, фрагмент рендерится без кэша.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(
+            fragment_cache=FragmentLRU(),
+            fragment_cache_key=simple_key,
+        )
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render_cached', [nodes.List(parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, parts, caller):
+        key = self.environment.fragment_cache_key(parts)
+        if key is None or not self.environment.fragment_cache.max_entries:
+            return caller()
+        cache = self.environment.fragment_cache
+        value = cache.get(key)
+        if value is None:
+            value = caller()
+            cache.set(key, value)
+        return value
+
+
+def simple_key(parts):
+    """Ключ из простых значений; None, если встретилось что-то другое"""
+    key = []
+    for part in parts:
+        if isinstance(part, Undefined):
+            part = None
+        if not isinstance(part, _SIMPLE_TYPES):
+            return None
+        key.append(part)
+    return tuple(key)
+
+
+def catalog_key(index):
+    """Функция ключа, понимающая рецепты и пользователей из индекса:
+    рецепт - (id, версия), пользователь - (id, имя, роль)"""
+    def make_key(parts):
+        key = []
+        for part in parts:
+            if isinstance(part, Undefined):
+                part = None
+            if isinstance(part, _SIMPLE_TYPES):
+                key.append(part)
+                continue
+            if isinstance(part, dict):
+                part_id = part.get('id')
+                if index.recipes_by_id.get(part_id) is part:
+                    key.append(('recipe', part_id, index.versions[part_id]))
+                    continue
+                if index.users_by_id.get(part_id) is part:
+                    key.append(('user', part_id, part['username'], part.get('is_admin', False)))
+                    continue
+            return None
+        return tuple(key)
+    return make_key
+
+
+def init_fragment_cache(app, index):
+    """Подключает тег {% cache %} к шаблонам приложения"""
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache.max_entries = app.config.get('TEMPLATE_FRAGMENT_CACHE_SIZE', 5000)
+    app.jinja_env.fragment_cache_key = catalog_key(index)
+
+
+def init_bytecode_cache(app):
+    """Сохраняет скомпилированные шаблоны на диск: новые процессы не компилируют их заново"""
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+
+def warm_up(app, urls=('/', '/recipes', '/search', '/author')):
+    """Компилирует все шаблоны и рендерит публичные страницы до приема запросов,
+    заполняя кэши фрагментов и страниц. Возвращает время этапов в мс."""
+    started = time.perf_counter()
+    templates = app.jinja_env.list_templates(extensions=['html'])
+    for name in templates:
+        app.jinja_env.get_template(name)
+    compiled = time.perf_counter()
+
+    client = app.test_client()
+    for url in urls:
+        client.get(url)
+    rendered = time.perf_counter()
+
+    return {
+        'templates': len(templates),
+        'compile_ms': round((compiled - started) * 1000, 1),
+        'pages': len(urls),
+        'render_ms': round((rendered - compiled) * 1000, 1),
+    }
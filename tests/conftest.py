@@ -0,0 +1,38 @@
+"""Общие фикстуры: приложение, работающее с копией data/ во временном каталоге"""
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    # Приложение читает и пишет data/ и instance/ относительно текущего каталога,
+    # а импортируется один раз на процесс - каталог общий для всех тестов
+    directory = tmp_path_factory.mktemp('app')
+    shutil.copytree(os.path.join(ROOT, 'data'), directory / 'data')
+    previous = os.getcwd()
+    os.chdir(directory)
+    try:
+        from app import app
+        app.config['TESTING'] = True
+        yield app
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(user_id=1, username='admin', is_admin=True)
+    return client
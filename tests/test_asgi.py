@@ -0,0 +1,90 @@
+"""ASGI-мост: отключение клиента закрывает потоковый ответ"""
+import asyncio
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def asgi(app):
+    import asgi
+    return asgi
+
+
+def scope(path):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'root_path': '',
+            'http_version': '1.1', 'scheme': 'http', 'headers': [],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 12345)}
+
+
+async def request(bridge, path, disconnect_after):
+    """Запрос к мосту; клиент отключается после disconnect_after сообщений тела ответа"""
+    sent = []
+    received = asyncio.Event()
+    messages = asyncio.Queue()
+    messages.put_nowait({'type': 'http.request', 'body': b'', 'more_body': False})
+
+    async def send(message):
+        sent.append(message)
+        if len([m for m in sent if m['type'] == 'http.response.body']) >= disconnect_after:
+            received.set()
+
+    async def disconnect_later():
+        await received.wait()
+        messages.put_nowait({'type': 'http.disconnect'})
+
+    watcher = asyncio.ensure_future(disconnect_later())
+    await asyncio.wait_for(bridge(scope(path), messages.get, send), timeout=5)
+    watcher.cancel()
+    return sent
+
+
+def test_disconnect_closes_event_stream(app, asgi):
+    from app import broadcaster
+    app.config['EVENTS_SSE'] = True
+    bridge = asgi.WSGIBridge(app, threads=2, stream_threads=2)
+    before = broadcaster.subscribers
+    try:
+        # Первая порция - retry, дальше поток ждет событий (до EVENTS_HEARTBEAT секунд)
+        sent = asyncio.run(request(bridge, '/api/events', disconnect_after=2))
+    finally:
+        app.config['EVENTS_SSE'] = False
+        bridge.executor.shutdown()
+        bridge.stream_executor.shutdown()
+    assert sent[0]['status'] == 200
+    assert broadcaster.subscribers == before
+
+
+def test_disconnect_while_waiting_for_chunk(asgi):
+    release = threading.Event()
+    closed = threading.Event()
+
+    class Body:
+        def __init__(self):
+            self.chunks = iter([b'first', b'second'])
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            chunk = next(self.chunks)
+            if chunk == b'second':
+                release.wait(30)
+            return chunk
+
+        def close(self):
+            release.set()
+            closed.set()
+
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return Body()
+
+    bridge = asgi.WSGIBridge(wsgi_app, threads=1, stream_threads=1)
+    try:
+        sent = asyncio.run(request(bridge, '/', disconnect_after=1))
+    finally:
+        bridge.executor.shutdown()
+        bridge.stream_executor.shutdown()
+    assert closed.is_set()
+    assert [m.get('body') for m in sent if m['type'] == 'http.response.body'] == [b'first']
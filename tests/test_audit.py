@@ -0,0 +1,32 @@
+"""Аудит изменений хранилища: пакетные изменения сохраняют id каждой записи"""
+import logs
+
+
+def audited(monkeypatch, events):
+    records = []
+    monkeypatch.setattr(logs, 'audit', lambda event, **fields: records.append((event, fields)))
+    logs._audit_store_events(events)
+    return records
+
+
+def test_bulk_delete_keeps_every_id(monkeypatch):
+    ids = list(range(1, 5000, 2))  # не подряд
+    records = audited(monkeypatch, [('recipe_removed', {'id': recipe_id}) for recipe_id in ids])
+    assert {event for event, _ in records} == {'recipe.deleted'}
+    assert len(records) == -(-len(ids) // logs.AUDIT_IDS_PER_RECORD)
+    assert [recipe_id for _, fields in records for recipe_id in fields['ids']] == ids
+    assert all(fields['total'] == len(ids) for _, fields in records)
+
+
+def test_bulk_update_lists_changed_fields(monkeypatch):
+    events = [('recipe_updated', {'id': i}, 'admin', ['title'] if i % 2 else ['cooking_time'])
+              for i in range(logs.AUDIT_DETAIL_LIMIT + 1)]
+    (event, fields), = audited(monkeypatch, events)
+    assert event == 'recipe.updated'
+    assert fields['ids'] == list(range(logs.AUDIT_DETAIL_LIMIT + 1))
+    assert fields['fields'] == ['cooking_time', 'title']
+
+
+def test_small_group_is_detailed(monkeypatch):
+    records = audited(monkeypatch, [('recipe_added', {'id': 7, 'title': 'Борщ'})])
+    assert records == [('recipe.created', {'recipe_id': 7, 'title': 'Борщ'})]
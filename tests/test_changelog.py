@@ -0,0 +1,48 @@
+"""get_changes_since: повторно измененный рецепт переходит в конец журнала"""
+
+
+def rpc(client, method, **params):
+    response = client.post('/api', json={'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1})
+    body = response.get_json()
+    assert 'error' not in body, body
+    return body['result']
+
+
+def changes_since(client, cursor, limit=500):
+    changes = []
+    while True:
+        result = rpc(client, 'get_changes_since', cursor=cursor, limit=limit)
+        changes.extend(result['changes'])
+        cursor = result['cursor']
+        if not result['has_more']:
+            return changes, cursor
+
+
+def test_updated_again_moves_to_end(admin_client):
+    from app import store
+    first, second, third = [recipe['id'] for recipe in store.recipes[:3]]
+    _, cursor = changes_since(admin_client, 0, limit=1000)
+
+    rpc(admin_client, 'update_recipe', recipe_id=first, cooking_time=11)
+    rpc(admin_client, 'update_recipe', recipe_id=second, cooking_time=12)
+    rpc(admin_client, 'update_recipe', recipe_id=first, cooking_time=13)
+    rpc(admin_client, 'delete_recipe', recipe_id=third)
+
+    changes, new_cursor = changes_since(admin_client, cursor)
+    assert [(change['op'], change.get('id') or change['recipe']['id']) for change in changes] == [
+        ('upsert', second), ('upsert', first), ('delete', third)
+    ]
+    assert changes[1]['recipe']['cooking_time'] == 13
+    seqs = [change['seq'] for change in changes]
+    assert seqs == sorted(seqs) and seqs[0] > cursor and new_cursor == seqs[-1]
+
+    # Клиент, прочитавший первое изменение, получает повторное изменение того же рецепта
+    changes, _ = changes_since(admin_client, seqs[0])
+    assert [change['seq'] for change in changes] == seqs[1:]
+
+
+def test_paging_returns_each_recipe_once(admin_client):
+    changes, cursor = changes_since(admin_client, 0, limit=7)
+    ids = [change.get('id') or change['recipe']['id'] for change in changes]
+    assert len(ids) == len(set(ids))
+    assert rpc(admin_client, 'get_changes_since', cursor=cursor)['changes'] == []
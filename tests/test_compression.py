@@ -0,0 +1,60 @@
+"""Сжатие ответов: gzip/deflate по Accept-Encoding, Vary и ETag"""
+import gzip
+import zlib
+
+
+def variant_hits():
+    import compression
+    return dict((tuple(labels), value) for labels, value in compression.COMPRESSION_VARIANTS.samples()).get(('hit',), 0)
+
+
+def test_gzip_page(client):
+    plain = client.get('/recipes')
+    response = client.get('/recipes', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert int(response.headers['Content-Length']) == len(response.data)
+
+
+def test_identity_response_varies_too(client):
+    response = client.get('/recipes')
+    assert 'Content-Encoding' not in response.headers
+    # Общий кэш не должен отдать этот ответ клиенту, просившему gzip, и наоборот
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_deflate_by_quality(client):
+    response = client.get('/recipes', headers={'Accept-Encoding': 'gzip;q=0.5, deflate'})
+    assert response.headers['Content-Encoding'] == 'deflate'
+    assert zlib.decompress(response.data) == client.get('/recipes').data
+
+
+def test_compressed_etag_is_weak_and_revalidates(client):
+    response = client.get('/recipes', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    cached = client.get('/recipes', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert cached.status_code == 304
+
+
+def test_cached_page_reuses_compressed_variant(client):
+    first = client.get('/recipes', headers={'Accept-Encoding': 'gzip'}).data
+    hits = variant_hits()
+    second = client.get('/recipes', headers={'Accept-Encoding': 'gzip'}).data
+    assert variant_hits() == hits + 1
+    assert second == first
+
+
+def test_small_response_not_compressed(client):
+    response = client.get('/api/ping', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' not in response.headers.get('Vary', '')
+
+
+def test_streamed_export(admin_client):
+    plain = admin_client.get('/admin/export/recipes.ndjson').data
+    response = admin_client.get('/admin/export/recipes.ndjson', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data) == plain
@@ -0,0 +1,45 @@
+"""ETag и 304 на кэшируемых страницах"""
+import pytest
+
+
+def rpc(client, method, **params):
+    return client.post('/api', json={'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1}).get_json()
+
+
+@pytest.fixture
+def recipe_id():
+    from app import store
+    return store.recipes[0]['id']
+
+
+@pytest.mark.parametrize('path', ['/', '/recipes', '/search?title=', '/recipe/{id}'])
+def test_not_modified(client, path, recipe_id):
+    path = path.format(id=recipe_id)
+    response = client.get(path)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'].startswith('private')
+
+    cached = client.get(path, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+
+def test_recipe_etag_is_weak(client, recipe_id):
+    assert client.get(f'/recipe/{recipe_id}').headers['ETag'].startswith('W/')
+
+
+def test_change_invalidates_etag(client, admin_client, recipe_id):
+    etag = client.get(f'/recipe/{recipe_id}').headers['ETag']
+    rpc(admin_client, 'update_recipe', recipe_id=recipe_id, title='Новое название для ETag')
+    response = client.get(f'/recipe/{recipe_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'Новое название для ETag' in response.get_data(as_text=True)
+
+
+def test_etag_depends_on_user(client, admin_client):
+    assert client.get('/').headers['ETag'] != admin_client.get('/').headers['ETag']
+    anonymous = client.get('/').headers['ETag']
+    assert admin_client.get('/', headers={'If-None-Match': anonymous}).status_code == 200
@@ -0,0 +1,59 @@
+"""Индекс пользователей: постраничный вывод с фильтром по роли"""
+import pytest
+
+from indexes import CatalogIndex
+
+
+@pytest.fixture
+def index():
+    # Администраторы вперемешку с пользователями и в конце списка
+    users = [{'id': n, 'username': f'user{n:02d}', 'is_admin': n % 3 == 0 or n > 18}
+             for n in range(1, 21)]
+    return CatalogIndex([], users)
+
+
+def names(page):
+    return [user['username'] for user in page]
+
+
+def regular(index):
+    return sorted(user['username'] for user in index.users_by_id.values() if not user['is_admin'])
+
+
+def test_offset_pages_skip_no_users(index):
+    expected = regular(index)
+    pages = []
+    for offset in range(0, len(expected), 4):
+        page, total, _ = index.find_users(role_filter='user', offset=offset, limit=4)
+        assert total == len(expected)
+        pages.extend(names(page))
+    assert pages == expected
+
+
+def test_cursor_pages_end_without_empty_page(index):
+    expected = regular(index)
+    pages, cursor, requests = [], None, 0
+    while True:
+        page, _, cursor = index.find_users(role_filter='user', cursor=cursor, limit=4)
+        requests += 1
+        assert page
+        pages.extend(names(page))
+        if cursor is None:
+            break
+    assert pages == expected
+    assert requests == -(-len(expected) // 4)
+
+
+def test_role_change_moves_user(index):
+    user = dict(index.users_by_id[1], is_admin=True)
+    index.user_updated(user)
+    assert 'user01' not in names(index.find_users(role_filter='user')[0])
+    assert 'user01' in names(index.find_users(role_filter='admin')[0])
+    index.user_removed(user)
+    assert 'user01' not in names(index.find_users()[0])
+
+
+def test_prefix_and_offset_past_end(index):
+    page, total, cursor = index.find_users(prefix='USER1', role_filter='user', offset=100)
+    assert (page, cursor) == ([], None)
+    assert total == len([name for name in regular(index) if name.startswith('user1')])
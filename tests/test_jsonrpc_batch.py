@@ -0,0 +1,29 @@
+"""Пакетные запросы JSON-RPC: чтения после изменения в том же пакете"""
+
+
+def call(method, call_id, **params):
+    return {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': call_id}
+
+
+def test_read_after_write_in_batch(admin_client):
+    response = admin_client.post('/api', json=[
+        call('get_recipes_count', 1),
+        call('add_recipe', 2, title='Пакетный тест', description='Рецепт из пакетного запроса',
+             ingredients=['Вода'], steps='Вскипятить воду', cooking_time=5),
+        call('get_recipes_count', 3),
+    ])
+    assert response.status_code == 200
+    results = {item['id']: item for item in response.get_json()}
+    assert 'error' not in results[2], results[2]
+    before = results[1]['result']['total']
+    assert results[3]['result']['total'] == before + 1
+
+    single = admin_client.post('/api', json=call('get_recipes_count', 4)).get_json()
+    assert single['result']['total'] == before + 1
+
+
+def test_identical_reads_share_result(admin_client):
+    response = admin_client.post('/api', json=[call('get_recipes_count', 1), call('get_recipes_count', 2)])
+    first, second = response.get_json()
+    assert first['result'] == second['result']
+    assert (first['id'], second['id']) == (1, 2)
@@ -0,0 +1,69 @@
+"""Пакетные методы рецептов: проверка параметров вне блокировки писателя"""
+import threading
+
+import pytest
+
+
+def call(method, **params):
+    return {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1}
+
+
+@pytest.fixture
+def recipe_ids(admin_client):
+    recipes = [{'title': f'Пакетный {n}', 'description': 'Рецепт для пакетных методов',
+                'ingredients': ['Вода'], 'steps': 'Вскипятить воду', 'cooking_time': 5}
+               for n in range(3)]
+    result = admin_client.post('/api', json=call('add_recipes', recipes=recipes)).get_json()['result']
+    return result['recipe_ids']
+
+
+def test_update_is_all_or_nothing(admin_client, recipe_ids):
+    from app import store
+    result = admin_client.post('/api', json=call('update_recipes', updates=[
+        {'recipe_id': recipe_ids[0], 'cooking_time': 10},
+        {'recipe_id': recipe_ids[1], 'unknown': 1},
+    ])).get_json()['result']
+    assert [error['index'] for error in result['item_errors']] == [1]
+    assert store.index.recipes_by_id[recipe_ids[0]]['cooking_time'] == 5
+
+
+def test_validation_does_not_hold_write_lock(admin_client, recipe_ids, monkeypatch):
+    import jsonrpc_handler
+    from app import store
+    validate = jsonrpc_handler.validate_recipe_data
+    deleted = threading.Event()
+
+    def delete_concurrently():
+        with store.write() as writer:
+            writer.remove_recipes(lambda recipe: recipe['id'] == recipe_ids[1])
+        deleted.set()
+
+    def validate_while_deleting(params, is_update):
+        if not deleted.is_set():
+            worker = threading.Thread(target=delete_concurrently)
+            worker.start()
+            worker.join(2)
+        return validate(params, is_update=is_update)
+
+    monkeypatch.setattr(jsonrpc_handler, 'validate_recipe_data', validate_while_deleting)
+    result = admin_client.post('/api', json=call('update_recipes', updates=[
+        {'recipe_id': recipe_id, 'cooking_time': 20} for recipe_id in recipe_ids
+    ])).get_json()['result']
+    # Другой писатель не ждал проверки; удаленный за это время рецепт - ошибка, без частичных изменений
+    assert deleted.is_set()
+    assert result['item_errors'] == [
+        {'index': 1, 'errors': {'recipe_id': f'Рецепт с ID {recipe_ids[1]} не найден'}}
+    ]
+    assert store.index.recipes_by_id[recipe_ids[0]]['cooking_time'] == 5
+
+
+def test_delete_recipes(admin_client, recipe_ids):
+    from app import store
+    missing = max(store.index.recipes_by_id) + 1
+    result = admin_client.post('/api', json=call('delete_recipes', recipe_ids=[recipe_ids[0], missing])).get_json()
+    assert result['result']['item_errors'][0]['index'] == 1
+    assert recipe_ids[0] in store.index.recipes_by_id
+
+    result = admin_client.post('/api', json=call('delete_recipes', recipe_ids=recipe_ids + [recipe_ids[0]])).get_json()
+    assert result['result']['deleted_ids'] == sorted(recipe_ids)
+    assert not set(recipe_ids) & set(store.index.recipes_by_id)
@@ -0,0 +1,34 @@
+"""Доступ к /metrics: токен или сессия администратора, иначе 403"""
+import pytest
+
+
+@pytest.fixture
+def token(app):
+    previous = app.config['METRICS_TOKEN']
+    app.config['METRICS_TOKEN'] = 'secret'
+    yield 'secret'
+    app.config['METRICS_TOKEN'] = previous
+
+
+def test_denied_without_token_even_from_localhost(client):
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 403
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '::1'}).status_code == 403
+
+
+def test_admin_session(admin_client):
+    response = admin_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-store'
+    assert b'# TYPE' in response.data
+
+
+def test_bearer_token(client, token):
+    assert client.get('/metrics', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get('/metrics').status_code == 403
+
+
+def test_non_admin_session(client):
+    with client.session_transaction() as session:
+        session.update(user_id=2, username='user', is_admin=False)
+    assert client.get('/metrics').status_code == 403
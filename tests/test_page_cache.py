@@ -0,0 +1,30 @@
+"""Кэш страниц для анонимных посетителей"""
+
+
+def rpc(client, method, **params):
+    return client.post('/api', json={'jsonrpc': '2.0', 'method': method, 'params': params, 'id': 1}).get_json()
+
+
+def test_anonymous_pages_are_cached(client):
+    from app import page_cache
+    first = client.get('/recipes')
+    hits = page_cache.hits
+    second = client.get('/recipes')
+    assert page_cache.hits == hits + 1
+    assert second.data == first.data
+
+
+def test_logged_in_users_bypass_cache(admin_client):
+    from app import page_cache
+    admin_client.get('/recipes')
+    hits = page_cache.hits
+    admin_client.get('/recipes')
+    assert page_cache.hits == hits
+
+
+def test_recipe_update_invalidates_page(client, admin_client):
+    from app import store
+    recipe_id = store.recipes[1]['id']
+    client.get(f'/recipe/{recipe_id}')
+    rpc(admin_client, 'update_recipe', recipe_id=recipe_id, title='Название после сброса кэша')
+    assert 'Название после сброса кэша' in client.get(f'/recipe/{recipe_id}').get_data(as_text=True)
@@ -0,0 +1,54 @@
+"""Серверные сессии: отзыв всех сессий пользователя"""
+import time
+
+import pytest
+
+from session_store import MemorySessionStore, SqliteSessionStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemorySessionStore()
+    return SqliteSessionStore(str(tmp_path / 'sessions.db'))
+
+
+def test_delete_user_removes_only_that_user(store):
+    expires_at = time.time() + 60
+    store.set('a1', '{}', expires_at, user_id=1)
+    store.set('a2', '{}', expires_at, user_id=1)
+    store.set('b1', '{}', expires_at, user_id=2)
+    store.set('guest', '{}', expires_at)
+    store.delete_user(1)
+    assert store.get('a1') is None and store.get('a2') is None
+    assert store.get('b1') is not None and store.get('guest') is not None
+
+
+def session_id(app, client):
+    return client.get_cookie(app.config['SESSION_COOKIE_NAME']).value
+
+
+def login(app, user_id, username):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(user_id=user_id, username=username, is_admin=False)
+    return client
+
+
+def test_password_change_revokes_sessions(app, admin_client):
+    devices = [login(app, 2, 'user') for _ in range(2)]
+    store = app.session_interface.store
+    sids = [session_id(app, client) for client in devices]
+    assert all(store.get(sid) is not None for sid in sids)
+
+    response = admin_client.post('/api', json={
+        'jsonrpc': '2.0', 'method': 'admin_update_user', 'id': 1,
+        'params': {'user_id': 2, 'new_password': 'changed-password'},
+    }).get_json()
+    assert response['result']['success']
+
+    assert all(store.get(sid) is None for sid in sids)
+    assert store.get(session_id(app, admin_client)) is not None
+    # Старый cookie больше не дает входа
+    with devices[0].session_transaction() as session:
+        assert 'user_id' not in session